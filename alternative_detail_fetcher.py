@@ -5,150 +5,151 @@
 """
 
 import sys
+from typing import Optional, Tuple
+
 import requests
-import json
-import time
-import random
 from loguru import logger
 
 sys.path.insert(0, '.')
 
+from app.tasks.hedged_fetcher import HedgedFetcher
 from app.tasks.xiaohongshu_scraper import gen_sign, HEADERS_BASE
 
-def get_note_detail_v2(note_id: str, cookie: str) -> dict:
+DETAIL_URL_V1 = "https://edith.xiaohongshu.com/api/sns/web/v1/feed"
+DETAIL_URL_V2 = "https://edith.xiaohongshu.com/api/sns/web/v2/note/feed"
+
+def _signed_request(method: str, url: str, payload: dict, cookie: str) -> Tuple[int, dict]:
     """
-    方法2：使用不同的API端点
+    发送一次带签名的请求，返回 (状态码, data)；失败时 data 为空
     """
-    detail_url = "https://edith.xiaohongshu.com/api/sns/web/v2/note/feed"
+    sign_headers = gen_sign(url, payload, cookie)
+    
+    # 确保所有 header 值都是字符串
+    for key, value in sign_headers.items():
+        if not isinstance(value, str):
+            sign_headers[key] = str(value)
     
+    headers = {**HEADERS_BASE, **sign_headers, "cookie": cookie}
+    
+    if method == "GET":
+        response = requests.get(url, params=payload, headers=headers, timeout=15)
+    else:
+        response = requests.post(url, json=payload, headers=headers, timeout=15)
+    
+    if response.status_code == 200:
+        data = response.json()
+        if data.get("success", True):
+            return 200, data.get("data", {})
+    return response.status_code, {}
+
+def fetch_detail_v1(note_id: str, cookie: str) -> Tuple[int, dict]:
+    """
+    方法1：原始POST方式（单次请求，不含重试与等待）
+    """
+    payload = {
+        "source_note_id": note_id,
+        "image_formats": ["jpg", "webp", "avif"],
+        "extra": {"need_body_topic": "1"}
+    }
+    return _signed_request("POST", DETAIL_URL_V1, payload, cookie)
+
+def fetch_detail_v2(note_id: str, cookie: str) -> Tuple[int, dict]:
+    """
+    方法2：使用不同的API端点
+    """
     payload = {
         "note_id": note_id,
         "cursor_score": "",
         "num": 30,
         "image_formats": ["jpg", "webp", "avif"]
     }
-    
-    try:
-        sign_headers = gen_sign(detail_url, payload, cookie)
-        
-        # 确保所有 header 值都是字符串
-        for key, value in sign_headers.items():
-            if not isinstance(value, str):
-                sign_headers[key] = str(value)
-        
-        headers = {**HEADERS_BASE, **sign_headers, "cookie": cookie}
-        
-        response = requests.post(detail_url, json=payload, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("success", True):
-                return data.get("data", {})
-        
-        logger.debug("V2 API 失败: {}", response.status_code)
-        
-    except Exception as e:
-        logger.debug("V2 API 异常: {}", str(e)[:100])
-    
-    return {}
+    return _signed_request("POST", DETAIL_URL_V2, payload, cookie)
 
-def get_note_detail_v3(note_id: str, cookie: str) -> dict:
+def fetch_detail_v3(note_id: str, cookie: str) -> Tuple[int, dict]:
     """
     方法3：使用GET请求方式
     """
-    detail_url = f"https://edith.xiaohongshu.com/api/sns/web/v1/feed"
-    
     params = {
         "source_note_id": note_id,
         "image_formats": "jpg,webp,avif"
     }
-    
+    return _signed_request("GET", DETAIL_URL_V1, params, cookie)
+
+def get_note_detail_v2(note_id: str, cookie: str) -> dict:
     try:
-        sign_headers = gen_sign(detail_url, params, cookie)
-        
-        # 确保所有 header 值都是字符串
-        for key, value in sign_headers.items():
-            if not isinstance(value, str):
-                sign_headers[key] = str(value)
-        
-        headers = {**HEADERS_BASE, **sign_headers, "cookie": cookie}
-        
-        response = requests.get(detail_url, params=params, headers=headers, timeout=15)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("success", True):
-                return data.get("data", {})
-        
-        logger.debug("V3 API 失败: {}", response.status_code)
-        
+        status, data = fetch_detail_v2(note_id, cookie)
+        if not data:
+            logger.debug("V2 API 失败: {}", status)
+        return data
+    except Exception as e:
+        logger.debug("V2 API 异常: {}", str(e)[:100])
+        return {}
+
+def get_note_detail_v3(note_id: str, cookie: str) -> dict:
+    try:
+        status, data = fetch_detail_v3(note_id, cookie)
+        if not data:
+            logger.debug("V3 API 失败: {}", status)
+        return data
     except Exception as e:
         logger.debug("V3 API 异常: {}", str(e)[:100])
-    
-    return {}
+        return {}
+
+_resolver: Optional[HedgedFetcher] = None
+
+def get_detail_resolver() -> HedgedFetcher:
+    """
+    进程内共享的详情解析器：各策略的成功率 / 延迟统计在多条笔记之间累积
+    """
+    global _resolver
+    if _resolver is None:
+        _resolver = HedgedFetcher([
+            ("v1_post", fetch_detail_v1),
+            ("v2_feed", fetch_detail_v2),
+            ("v1_get", fetch_detail_v3),
+        ])
+    return _resolver
 
 def get_note_detail_comprehensive(note_id: str, cookie: str) -> dict:
     """
-    综合方法：依次尝试多种API方式
+    综合方法：优先尝试历史表现最好的API，超过自适应延迟仍未返回时并行请求下一个
+    连续被限制（406/404）的API会暂停使用一段时间
     """
     logger.info("尝试获取笔记 {} 的详情...", note_id)
     
-    # 方法1：原始POST方式
-    try:
-        from simple_xhs_scraper import get_note_detail
-        result = get_note_detail(note_id, cookie)
-        if result:
-            logger.success("方法1成功获取详情")
-            return result
-    except Exception as e:
-        logger.debug("方法1失败: {}", str(e)[:100])
-    
-    # 添加延迟
-    time.sleep(random.uniform(2, 4))
-    
-    # 方法2：V2 API
-    result = get_note_detail_v2(note_id, cookie)
-    if result:
-        logger.success("方法2成功获取详情")
-        return result
-    
-    # 添加延迟
-    time.sleep(random.uniform(2, 4))
-    
-    # 方法3：GET方式
-    result = get_note_detail_v3(note_id, cookie)
+    name, result = get_detail_resolver().fetch(note_id, cookie)
     if result:
-        logger.success("方法3成功获取详情")
+        logger.success("{} 成功获取详情", name)
         return result
     
     logger.warning("所有方法都无法获取笔记 {} 的详情", note_id)
     return {}
 
-def test_detail_fetcher():
+def test_detail_fetcher(limit: int = 1):
     """测试详情获取功能"""
     
-    # 从数据库获取一个笔记ID进行测试
+    # 从数据库获取笔记ID进行测试
     sys.path.insert(0, '.')
     from app.config import SessionLocal
     from app.models import XHSNote
     
+    # 读取Cookie
+    try:
+        with open("app/tasks/cookies/xhs_cookies.txt", 'r') as f:
+            cookie = f.read().strip()
+    except OSError:
+        logger.error("无法读取Cookie文件")
+        return
+    
     with SessionLocal() as db:
-        note = db.query(XHSNote).first()
-        if not note:
-            logger.error("数据库中没有笔记数据")
-            return
-        
-        note_id = str(note.note_id)
+        note_ids = [str(n) for (n,) in db.query(XHSNote.note_id).limit(limit)]
+    if not note_ids:
+        logger.error("数据库中没有笔记数据")
+        return
+    
+    for note_id in note_ids:
         logger.info("测试笔记ID: {}", note_id)
         
-        # 读取Cookie
-        try:
-            with open("app/tasks/cookies/xhs_cookies.txt", 'r') as f:
-                cookie = f.read().strip()
-        except:
-            logger.error("无法读取Cookie文件")
-            return
-        
         # 测试获取详情
         result = get_note_detail_comprehensive(note_id, cookie)
         
@@ -164,6 +165,14 @@ def test_detail_fetcher():
                 logger.info("详情数据结构: {}", list(result.keys()))
         else:
             logger.error("无法获取详情数据")
+    
+    get_detail_resolver().log_metrics()
 
 if __name__ == "__main__":
-    test_detail_fetcher() 
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="多策略获取小红书笔记详情")
+    parser.add_argument("--notes", type=int, default=1, help="测试的笔记数")
+    args = parser.parse_args()
+    
+    test_detail_fetcher(args.notes)
@@ -21,6 +21,79 @@ class Settings(BaseSettings):
     # 其他通用配置
     timezone: str = "Asia/Shanghai"
 
+    # 小红书 search_id 缓存
+    xhs_search_id_cache_file: str = "app/tasks/cache/xhs_search_ids.json"
+    xhs_search_id_ttl: int = 6 * 3600  # 秒；超过 TTL 后重新启动浏览器获取
+
+    # 小红书签名进程池
+    node_bin: str = "node"
+    xhs_sign_pool_size: int = 2
+    xhs_sign_timeout: float = 10.0  # 秒；单批签名的响应超时
+
+    # 小红书单账号配额（异步抓取引擎）
+    xhs_account_concurrency: int = 2
+    xhs_account_rate: float = 0.5  # 每秒请求数
+
+    # 小红书 Cookie 账号池（app/tasks/cookie_pool.py）
+    xhs_cookie_pool_file: str = "app/tasks/cache/xhs_cookie_pool.json"
+    xhs_cookie_window: float = 60.0  # 秒；单账号请求计数窗口
+    xhs_cookie_window_limit: int = 30  # 单账号每个窗口最多请求数，0 表示不限
+    xhs_cookie_cooldown: float = 60.0  # 秒；461 / 406 后首次隔离时长，之后逐次翻倍
+    xhs_cookie_max_cooldown: float = 3600.0  # 秒；隔离时长上限
+
+    # HTML 解析后端（app/tasks/html_parsers.py）：bs4 / lxml / selectolax
+    html_parser_backend: str = "lxml"
+
+    # 51Job 列表页并发抓取（app/tasks/job51_scraper.py）
+    job51_concurrency: int = 4
+    job51_rate: float = 1.0  # 初始请求速率（次/秒），按 AIMD 自适应调整
+    job51_max_rate: float = 8.0
+
+    # 51Job search-pc 接口直连（app/tasks/job51_api.py）
+    job51_api_base_url: str = "https://we.51job.com"
+    job51_api_timeout: float = 10.0
+    job51_api_interval: float = 0.5  # 秒；翻页间隔
+    job51_cookie_file: str = "app/tasks/cache/job51_cookies.json"
+    job51_cookie_ttl: int = 12 * 3600  # 秒；超过 TTL 后重新用浏览器获取 Cookie
+
+    # 智联详情页并发抓取（app/tasks/detail_pipeline.py）
+    zhilian_detail_workers: int = 3  # 详情标签页 / 浏览器数；详情浏览器始终无头
+    zhilian_list_headless: bool = False  # 列表页浏览器是否无头（selenium 后端；playwright 后端由 playwright_headless 决定）
+
+    # 浏览器创建（app/tasks/browser_factory.py）
+    browser_profile: str = "fast"  # fast：屏蔽图片/字体/媒体/统计脚本 + eager 加载；full：加载全部资源
+    browser_window_size: str = "1366,768"
+    chromedriver_path: str = ""  # 为空时进程内调用一次 ChromeDriverManager 并缓存
+    browser_backend: str = "selenium"  # selenium：每个会话一个 Chrome；playwright：共享 Chromium，每个会话一个隔离上下文
+    playwright_headless: bool = True
+    playwright_timeout: float = 30.0  # 秒；Playwright 导航 / 元素操作默认超时
+
+    # 浏览器导航礼貌间隔（app/tasks/rate_control.py PolitenessDelay）
+    politeness_interval: float = 3.0  # 秒；同一站点两次页面导航的最小间隔
+    politeness_jitter: float = 2.0  # 秒；额外随机间隔上限
+
+    # Selenium 浏览器池
+    browser_pool_size: int = 2
+    browser_max_pages: int = 50  # 单个实例处理多少页面后回收重建
+
+    # 采集任务调度（app/scheduler.py）
+    scheduler_browser_workers: int = 1  # 浏览器类任务并发数，1 表示串行
+    scheduler_http_workers: int = 4
+    scheduler_misfire_grace: int = 3600  # 秒；错过触发时间后仍补跑的宽限期
+    scheduler_xhs_keyword: str = "苏州工业园区"
+    scheduler_xhs_pages: int = 5
+
+    # 统一文档入库（app/tasks/document_sink.py）
+    document_sync: bool = True  # 采集写库后同步写入 documents 表
+    document_backfill_chunk: int = 2000  # 回填时每批读取的源表行数
+
+    # 文档向量化（app/tasks/embedding_worker.py）
+    embedding_model: str = ""  # sentence-transformers 模型名 / 本地路径（须 768 维）；为空时不调度向量化任务
+    embedding_batch_size: int = 64
+    embedding_max_chars: int = 2000  # 标题 + 正文截断长度
+    embedding_index: str = "hnsw"  # hnsw / ivfflat
+    embedding_index_work_mem: str = "1GB"  # 建索引时的 maintenance_work_mem；HNSW 图放不进内存时构建会慢很多
+
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
     )
@@ -58,13 +131,28 @@ engine = create_engine(
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+# 表创建之后才加入模型的列：(表, 列, 类型)，均带索引
+_ADDED_COLUMNS = (
+    ("documents", "embedding_model", "VARCHAR(128)"),
+)
+
+
 def init_db() -> None:
     """在应用启动时调用；自动建表。"""
 
     # 延迟导入，避免循环引用
     from app import models  # noqa: WPS433  # pylint: disable=C0415
 
+    # documents.embedding 为 pgvector 类型，建表前需要扩展
+    if models.Vector.__module__.startswith("pgvector"):
+        with engine.begin() as conn:
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS vector")
     models.Base.metadata.create_all(bind=engine)  # type: ignore[attr-defined]
+    # create_all 不会给已存在的表加列，建表之后新增的列在这里补上
+    with engine.begin() as conn:
+        for table, column, ddl in _ADDED_COLUMNS:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {ddl}")
+            conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} ON {table} ({column})")
 
 
 def get_db_session():
@@ -1,7 +1,7 @@
 from datetime import datetime
 
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, func, Boolean
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, Text, func, Boolean, UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB
 try:
     from pgvector.sqlalchemy import Vector  # type: ignore
@@ -51,7 +51,8 @@ class Document(Base):
     publish_at = Column(DateTime(timezone=True))
     raw_json = Column(JSONB)
     embedding = Column(Vector(768), nullable=True)
-    processed = Column(Boolean, default=False)
+    embedding_model = Column(String(128), nullable=True, index=True)  # 生成 embedding 的编码器名，与配置不一致时重新编码
+    processed = Column(Boolean, default=False, index=True)
     created_at = Column(
         DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -82,6 +83,26 @@ class DocEntity(Base):
         return f"<DocEntity id={self.id} type={self.ent_type} text={self.ent_text!r}>"
 
 
+class DocAnalysis(Base):
+    """文档 / 笔记的企业信息分析结果（每条来源一行，内容变化后重新分析时覆盖）"""
+
+    __tablename__ = "doc_analyses"
+    __table_args__ = (UniqueConstraint("source_type", "source_id", name="uq_doc_analysis"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source_type = Column(String(16), nullable=False)  # document | xhs_note
+    source_id = Column(Integer, nullable=False)  # documents.id / xhs_notes.id
+    category = Column(String(32))
+    confidence = Column(Float)
+    enterprise_keywords = Column(JSONB)  # [[前缀, 关键词], ...]
+    location_keywords = Column(JSONB)
+    content_hash = Column(String(32))  # 分析输入的 md5，变化时才重新打分
+    analyzed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):  # noqa: D401
+        return f"<DocAnalysis {self.source_type}#{self.source_id} {self.category} {self.confidence}>"
+
+
 class JobPosting(Base):
     """51Job 招聘信息表"""
 
@@ -102,6 +123,42 @@ class JobPosting(Base):
         return f"<JobPosting id={self.id} title={self.title!r} company={self.company_name!r}>"
 
 
+# ------------------------------------------------------------
+# 智联招聘职位表
+# ------------------------------------------------------------
+
+
+class ZhilianJob(Base):
+    """智联招聘职位信息表"""
+
+    __tablename__ = "zhilian_jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(64), unique=True, nullable=False, index=True)  # 职位ID
+    job_title = Column(String(256), nullable=False)  # 职位名称
+    company_name = Column(String(256), nullable=False)  # 公司名称
+    company_size = Column(String(64))  # 公司规模
+    company_type = Column(String(64))  # 公司类型
+    salary = Column(String(64))  # 薪资范围
+    work_city = Column(String(64))  # 工作城市
+    work_experience = Column(String(64))  # 工作经验要求
+    education = Column(String(64))  # 学历要求
+    job_type = Column(String(32))  # 工作类型（全职/兼职等）
+    job_description = Column(Text)  # 职位描述
+    job_requirements = Column(Text)  # 职位要求
+    welfare = Column(Text)  # 福利待遇
+    publish_time = Column(DateTime(timezone=True))  # 发布时间
+    update_time = Column(DateTime(timezone=True))  # 更新时间
+    job_url = Column(String(512))  # 职位详情链接
+
+    # 原始JSON数据
+    raw_json = Column(JSONB)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):  # noqa: D401
+        return f"<ZhilianJob id={self.id} job_id={self.job_id} title={self.job_title!r}>"
+
+
 # ------------------------------------------------------------
 # 小红书笔记表
 # ------------------------------------------------------------
@@ -129,3 +186,30 @@ class XHSNote(Base):
 
     def __repr__(self):  # noqa: D401
         return f"<XHSNote id={self.id} note_id={self.note_id} title={self.title!r}>"
+
+
+# ------------------------------------------------------------
+# 增量抓取水位表
+# ------------------------------------------------------------
+
+
+class CrawlState(Base):
+    """每个 (来源, 关键词, 地区) 的抓取水位，用于增量抓取时提前停止翻页"""
+
+    __tablename__ = "crawl_states"
+    __table_args__ = (UniqueConstraint("source", "keyword", "area", name="uq_crawl_state"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source = Column(String(32), nullable=False)  # job51 | xhs | zhilian ...
+    keyword = Column(String(128), nullable=False, default="")
+    area = Column(String(64), nullable=False, default="")
+    newest_item_id = Column(String(512))  # 最近一次抓到的最新条目（URL / note_id / job_id）
+    newest_item_time = Column(DateTime(timezone=True))  # 已见过的最新条目发布时间
+    last_run_at = Column(DateTime(timezone=True))
+    last_full_run_at = Column(DateTime(timezone=True))
+    last_run_pages = Column(Integer, default=0)
+    last_run_new_items = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):  # noqa: D401
+        return f"<CrawlState {self.source}/{self.keyword!r}/{self.area!r} newest={self.newest_item_id!r}>"
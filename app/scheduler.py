@@ -0,0 +1,245 @@
+"""采集任务调度器（APScheduler）。
+
+所有采集器注册为 APScheduler 任务，任务定义持久化到 Postgres（``apscheduler_jobs`` 表），
+进程重启后沿用上次的下次执行时间：
+
+- ``browser`` 执行器：可能启动 Chrome 的采集器（51Job 接口版的 Cookie 刷新、智联、小红书
+  search_id 缓存未命中时的浏览器搜索），默认单线程串行，避免多个任务同时争抢浏览器 / 远程调试端口；
+- ``http`` 执行器：纯 HTTP / 数据库任务（51Job requests 版、内容分析、向量化），可并行；
+- 全局 ``max_instances=1`` + ``coalesce``：上一轮未结束时不会重叠启动，积压的多次触发合并为一次；
+  错过触发时间（进程停机等）在 ``misfire_grace_time`` 内仍会补跑。
+
+用法：
+    python run.py                       # 启动调度器（阻塞）
+    python -m app.scheduler --list      # 查看已注册任务与下次执行时间（只读，不同步任务定义）
+    python -m app.scheduler --run-now job51_http   # 立即同步执行一次某个任务
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, JobExecutionEvent
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from loguru import logger
+
+from app.config import engine, settings
+
+# ---------------------------------------------------------------------------
+# 任务函数
+# ---------------------------------------------------------------------------
+# 任务以「模块:函数」文本形式存入 job store，因此必须是模块级函数；
+# 采集器在函数内延迟导入，调度器启动时不会加载 selenium / DrissionPage 等重依赖。
+
+
+def collect_job51(pages: int = 5) -> None:
+    from app.tasks import job51_scraper
+
+    job51_scraper.run(pages)
+
+
+def collect_job51_api(max_pages: int | None = None) -> None:
+    from app.tasks import job51_api
+
+    job51_api.run(max_pages)
+
+
+def collect_xhs_notes(keyword: str, pages: int | None = None) -> None:
+    from app.tasks.xiaohongshu_scraper import fetch_notes
+
+    fetch_notes(keyword, pages)
+
+
+def collect_zhilian(keyword: str = "人工智能", city: str = "苏州", max_pages: int = 10) -> None:
+    from app.tasks.zhilian_scraper import ZhilianScraper
+
+    ZhilianScraper().scrape_jobs(keyword, city, max_pages)
+
+
+def analyze_content() -> None:
+    # 分析器在项目根目录的 content_analysis.py 中（调度器从项目根目录启动）
+    from content_analysis import persist_analysis
+
+    persist_analysis()
+
+
+def embed_documents() -> None:
+    from app.tasks.embedding_worker import run
+
+    run()
+
+
+# ---------------------------------------------------------------------------
+# 任务注册表
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class CollectorJob:
+    """一个采集任务的调度定义。"""
+
+    id: str
+    func: Callable[..., Any]
+    executor: str  # "browser" | "http"
+    trigger: str  # "cron" | "interval"
+    trigger_args: Dict[str, Any]
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    def build_trigger(self):
+        trigger_cls = CronTrigger if self.trigger == "cron" else IntervalTrigger
+        return trigger_cls(timezone=settings.timezone, **self.trigger_args)
+
+
+def collector_jobs() -> List[CollectorJob]:
+    jobs = [
+        CollectorJob(
+            "job51_http", collect_job51, "http",
+            "interval", {"hours": 6},
+        ),
+        # 直连接口，仅在 Cookie 失效时启动浏览器，因此仍放在 browser 执行器中串行
+        CollectorJob(
+            "job51_api", collect_job51_api, "browser",
+            "cron", {"hour": "8,20", "minute": 0},
+        ),
+        # search_id 缓存未命中时会启动 Selenium，因此与其他浏览器任务串行
+        CollectorJob(
+            "xhs_notes", collect_xhs_notes, "browser",
+            "interval", {"hours": 2},
+            {"keyword": settings.scheduler_xhs_keyword, "pages": settings.scheduler_xhs_pages},
+        ),
+        CollectorJob(
+            "zhilian", collect_zhilian, "browser",
+            "cron", {"hour": 2, "minute": 30},
+        ),
+        # 增量分析新入库 / 内容变化的文档（含小红书笔记），每轮只处理新增部分
+        CollectorJob(
+            "analyze_content", analyze_content, "http",
+            "interval", {"hours": 1},
+        ),
+    ]
+    # 为新入库 / 文本变化 / 编码器变化的文档计算向量；未配置模型（或为测试用的 hashing）时不调度，
+    # 已持久化的任务会在 register_jobs 中移除
+    if settings.embedding_model not in ("", "hashing"):
+        jobs.append(CollectorJob(
+            "embed_documents", embed_documents, "http",
+            "interval", {"hours": 1},
+        ))
+    return jobs
+
+
+# ---------------------------------------------------------------------------
+# 调度器
+# ---------------------------------------------------------------------------
+
+
+def _on_event(event: JobExecutionEvent) -> None:
+    if event.code == EVENT_JOB_MISSED:
+        logger.warning("任务 {} 错过触发时间 {}（超过宽限期），本次跳过", event.job_id, event.scheduled_run_time)
+    elif event.exception is not None:
+        logger.opt(exception=event.exception).error("任务 {} 执行失败", event.job_id)
+    else:
+        logger.info("任务 {} 执行完成", event.job_id)
+
+
+def create_scheduler() -> BackgroundScheduler:
+    """创建配置好执行器与 Postgres job store 的调度器（尚未注册任务）。"""
+    scheduler = BackgroundScheduler(
+        jobstores={"default": SQLAlchemyJobStore(engine=engine, tablename="apscheduler_jobs")},
+        executors={
+            "browser": ThreadPoolExecutor(settings.scheduler_browser_workers),
+            "http": ThreadPoolExecutor(settings.scheduler_http_workers),
+        },
+        job_defaults={
+            "coalesce": True,
+            "max_instances": 1,
+            "misfire_grace_time": settings.scheduler_misfire_grace,
+        },
+        timezone=settings.timezone,
+    )
+    scheduler.add_listener(_on_event, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED)
+    return scheduler
+
+
+def register_jobs(scheduler: BackgroundScheduler) -> None:
+    """把任务定义同步到 job store（调度器需已启动，可处于暂停状态）。
+
+    新任务直接添加；已持久化的任务只更新函数 / 参数 / 执行器，触发规则未变时保留原有的下次执行时间，
+    因此重启进程不会把间隔任务的计时清零。
+    """
+    for job in collector_jobs():
+        trigger = job.build_trigger()
+        existing = scheduler.get_job(job.id)
+        if existing is None:
+            scheduler.add_job(
+                job.func, trigger, id=job.id, name=job.id, executor=job.executor, kwargs=job.kwargs,
+            )
+            continue
+        scheduler.modify_job(job.id, func=job.func, kwargs=job.kwargs, executor=job.executor)
+        if str(existing.trigger) != str(trigger):
+            scheduler.reschedule_job(job.id, trigger=trigger)
+
+    known = {job.id for job in collector_jobs()}
+    for stale in scheduler.get_jobs():
+        if stale.id not in known:
+            logger.info("移除已下线的任务 {}", stale.id)
+            stale.remove()
+
+
+def list_jobs(scheduler: BackgroundScheduler) -> None:
+    """只读列出 job store 中的任务；不调用 ``register_jobs``，不会新增 / 修改 / 移除任务。"""
+    defined = {job.id for job in collector_jobs()}
+    stored = scheduler.get_jobs()
+    for job in stored:
+        note = "" if job.id in defined else "（已下线，下次启动时移除）"
+        logger.info("{:<16} {:<8} 下次执行: {}{}", job.id, job.executor, job.next_run_time, note)
+    for job_id in sorted(defined - {job.id for job in stored}):
+        logger.info("{:<16} {:<8} 尚未注册（下次启动调度器时添加）", job_id, "-")
+
+
+def run_now(job_id: str) -> None:
+    """在当前进程同步执行一次任务（调试用）。"""
+    jobs = {job.id: job for job in collector_jobs()}
+    if job_id not in jobs:
+        raise SystemExit(f"未知任务: {job_id}，可选: {', '.join(jobs)}")
+    job = jobs[job_id]
+    logger.info("立即执行任务 {}", job_id)
+    job.func(**job.kwargs)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="采集任务调度器")
+    parser.add_argument("--list", action="store_true", help="列出已注册任务及下次执行时间")
+    parser.add_argument("--run-now", metavar="JOB_ID", help="立即同步执行一次指定任务")
+    args = parser.parse_args(argv)
+
+    if args.run_now:
+        run_now(args.run_now)
+        return
+
+    scheduler = create_scheduler()
+    scheduler.start(paused=True)
+    if args.list:
+        list_jobs(scheduler)
+        scheduler.shutdown(wait=False)
+        return
+    register_jobs(scheduler)
+
+    logger.info("调度器启动，注册 {} 个任务", len(scheduler.get_jobs()))
+    scheduler.resume()
+    try:
+        while True:
+            time.sleep(1)
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("正在停止调度器，等待运行中的任务结束…")
+        scheduler.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""统一的浏览器创建入口。
+
+各爬虫原先各自拼 ``Options``，每次启动都调用 ``ChromeDriverManager().install()``（会联网检查版本），
+并加载页面上全部图片、字体、媒体和统计脚本。这里统一为两个档位：
+
+- ``fast``（默认）：``eager`` 页面加载策略（DOMContentLoaded 即返回），通过 CDP
+  ``Network.setBlockedURLs`` 屏蔽图片 / 字体 / 音视频 / 第三方统计脚本，窗口尺寸取 ``settings.browser_window_size``；
+- ``full``：与旧行为一致，加载全部资源，用于需要截图或排查页面问题的场景。
+
+chromedriver 路径进程内只解析一次：优先使用 ``settings.chromedriver_path``，否则调用一次
+``ChromeDriverManager().install()`` 并缓存结果；两者都不可用时交给 Selenium Manager。
+
+Selenium 用 ``create_chrome``，DrissionPage 用 ``create_chromium_page``；已有的页面 / 新开的标签页用
+``block_resources`` 单独应用屏蔽规则（屏蔽规则按标签页生效）。
+
+``create_browser`` 按 ``settings.browser_backend`` 返回 WebDriver 兼容的会话：``selenium`` 即 ``create_chrome``，
+``playwright`` 为共享 Chromium 中的一个隔离上下文（见 ``playwright_backend``）。
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from loguru import logger
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from app.config import settings
+
+try:
+    from webdriver_manager.chrome import ChromeDriverManager  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    ChromeDriverManager = None  # type: ignore
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+)
+
+# Network.setBlockedURLs 的通配规则（* 匹配任意字符）
+BLOCKED_RESOURCE_PATTERNS = (
+    # 图片
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp",
+    # 字体
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    # 音视频
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.flv",
+)
+BLOCKED_TRACKER_PATTERNS = (
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*hm.baidu.com*", "*cnzz.com*", "*51.la*", "*growingio.com*", "*sensorsdata*",
+    "*zhugeio.com*", "*umeng.com*", "*mmstat.com*",
+)
+BLOCKED_URL_PATTERNS = BLOCKED_RESOURCE_PATTERNS + BLOCKED_TRACKER_PATTERNS
+
+PROFILES = ("fast", "full")
+
+
+# ---------------------------------------------------------------------------
+# chromedriver
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=1)
+def chromedriver_path() -> Optional[str]:
+    """解析一次 chromedriver 路径；返回 None 时由 Selenium Manager 自动查找。"""
+    if settings.chromedriver_path:
+        return settings.chromedriver_path
+    if ChromeDriverManager is None:
+        return None
+    try:
+        path = ChromeDriverManager().install()
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("ChromeDriverManager 获取驱动失败，改用 Selenium Manager: {}", exc)
+        return None
+    logger.debug("chromedriver: {}", path)
+    return path
+
+
+def chrome_service() -> Service:
+    path = chromedriver_path()
+    return Service(path) if path else Service()
+
+
+# ---------------------------------------------------------------------------
+# Selenium
+# ---------------------------------------------------------------------------
+
+def chrome_options(
+    profile: str | None = None,
+    *,
+    headless: bool = True,
+    user_agent: str | None = DEFAULT_USER_AGENT,
+    window_size: str | None = None,
+    extra_args: Iterable[str] = (),
+    prefs: Dict[str, Any] | None = None,
+    hide_automation: bool = False,
+    performance_log: bool = False,
+) -> Options:
+    profile = profile or settings.browser_profile
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    for arg in ("--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--mute-audio"):
+        options.add_argument(arg)
+    options.add_argument(f"--window-size={window_size or settings.browser_window_size}")
+    if user_agent:
+        options.add_argument(f"--user-agent={user_agent}")
+    for arg in extra_args:
+        options.add_argument(arg)
+
+    all_prefs = dict(prefs or {})
+    if profile == "fast":
+        options.page_load_strategy = "eager"
+        # CDP 规则在浏览器启动后才生效，首个请求之前用偏好设置兜底屏蔽图片
+        all_prefs.setdefault("profile.managed_default_content_settings.images", 2)
+    if all_prefs:
+        options.add_experimental_option("prefs", all_prefs)
+
+    if hide_automation:
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        options.add_experimental_option("useAutomationExtension", False)
+    if performance_log:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def block_resources(target: Any, patterns: Sequence[str] = BLOCKED_URL_PATTERNS) -> None:
+    """对 Selenium driver 或 DrissionPage 页面 / 标签页应用 ``Network.setBlockedURLs``。"""
+    try:
+        if hasattr(target, "run_cdp"):  # DrissionPage
+            target.run_cdp("Network.enable")
+            target.run_cdp("Network.setBlockedURLs", urls=list(patterns))
+        else:
+            target.execute_cdp_cmd("Network.enable", {})
+            target.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("设置资源屏蔽失败: {}", exc)
+
+
+def create_chrome(
+    profile: str | None = None,
+    *,
+    headless: bool = True,
+    debugger_address: str | None = None,
+    **option_kwargs: Any,
+) -> webdriver.Chrome:
+    """按档位创建 Selenium Chrome；``debugger_address`` 非空时附加到已开启远程调试的 Chrome。"""
+    profile = profile or settings.browser_profile
+    if profile not in PROFILES:
+        raise ValueError(f"未知浏览器档位: {profile}，可选: {', '.join(PROFILES)}")
+    if debugger_address:
+        options = Options()
+        options.add_experimental_option("debuggerAddress", debugger_address)
+        if profile == "fast":
+            options.page_load_strategy = "eager"
+    else:
+        options = chrome_options(profile, headless=headless, **option_kwargs)
+    driver = webdriver.Chrome(service=chrome_service(), options=options)
+    if profile == "fast":
+        block_resources(driver)
+    return driver
+
+
+BACKENDS = ("selenium", "playwright")
+
+
+def create_browser(
+    profile: str | None = None,
+    *,
+    backend: str | None = None,
+    account: str | None = None,
+    headless: bool = True,
+    **option_kwargs: Any,
+):
+    """按后端创建 WebDriver 兼容的浏览器会话，用完调用 ``quit()``。
+
+    ``playwright`` 后端下档位与是否无头由进程内共享的浏览器决定（``settings.browser_profile`` /
+    ``settings.playwright_headless``），``account`` 仅用于区分 Cookie 账号的上下文，
+    Chrome 专有参数（``prefs``、``extra_args``、``performance_log`` 等）被忽略。
+    """
+    backend = backend or settings.browser_backend
+    if backend == "playwright":
+        from app.tasks.playwright_backend import get_runtime
+
+        return get_runtime().new_driver(account, user_agent=option_kwargs.get("user_agent") or DEFAULT_USER_AGENT)
+    if backend != "selenium":
+        raise ValueError(f"未知浏览器后端: {backend}，可选: {', '.join(BACKENDS)}")
+    return create_chrome(profile, headless=headless, **option_kwargs)
+
+
+# ---------------------------------------------------------------------------
+# DrissionPage
+# ---------------------------------------------------------------------------
+
+def chromium_options(
+    profile: str | None = None,
+    *,
+    headless: bool = False,
+    user_agent: str | None = None,
+    window_size: str | None = None,
+):
+    from DrissionPage import ChromiumOptions
+
+    profile = profile or settings.browser_profile
+    options = ChromiumOptions()
+    if headless:
+        options.headless(True)
+    if user_agent:
+        options.set_user_agent(user_agent)
+    options.set_argument(f"--window-size={window_size or settings.browser_window_size}")
+    if profile == "fast":
+        options.set_load_mode("eager")
+        options.no_imgs(True)
+        options.mute(True)
+    return options
+
+
+def create_chromium_page(profile: str | None = None, **option_kwargs: Any):
+    """按档位创建 DrissionPage ``ChromiumPage``；新开的标签页需再调用 ``block_resources``。"""
+    from DrissionPage import ChromiumPage
+
+    profile = profile or settings.browser_profile
+    page = ChromiumPage(chromium_options(profile, **option_kwargs))
+    if profile == "fast":
+        block_resources(page)
+    return page
@@ -0,0 +1,172 @@
+"""浏览器内的接口响应拦截。
+
+原先从浏览器取接口数据有两种做法，都很重：
+
+- 拉取整份 ``performance`` 日志并逐条 ``json.loads``，再按 URL 过滤；
+- 把 ``window.__INITIAL_STATE__`` 等整棵状态树经 WebDriver 序列化回 Python 再递归查找。
+
+``ResponseInterceptor`` 通过 CDP ``Page.addScriptToEvaluateOnNewDocument`` 在每个文档的页面脚本之前
+包装 ``fetch`` 与 ``XMLHttpRequest``：URL 匹配任一正则的响应在浏览器内解析为 JSON 后放入
+``window.__pecCapture``（有上限的缓冲），其余请求不做任何处理。Python 侧只取回匹配的 JSON::
+
+    interceptor = ResponseInterceptor(driver, [r"/api/job/search-pc"])
+    interceptor.clear()
+    driver.get(url)
+    resp = interceptor.wait_for(timeout=10)
+    if resp:
+        jobs = resp.body["resultbody"]["job"]["items"]
+
+同时支持 Selenium driver 与 DrissionPage 页面 / 标签页。正则在浏览器中以 JS ``RegExp`` 编译，
+请使用两者通用的写法。非 JSON 响应（HTML、图片等）不会被记录。
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+from loguru import logger
+
+from app.tasks.browser_wait import run_js, wait_until
+
+DEFAULT_LIMIT = 50
+
+# 参数：正则字符串列表、缓冲上限。重复执行只会追加新的正则，不会重复包装
+_HOOK_JS = """
+(function (patterns, limit) {
+    var state = window.__pecCapture;
+    if (!state) {
+        state = window.__pecCapture = {sources: [], regexps: [], items: [], limit: limit};
+        var match = function (url) {
+            return !!url && state.regexps.some(function (r) { return r.test(url); });
+        };
+        var push = function (url, status, body) {
+            state.items.push({url: url, status: status, body: body});
+            if (state.items.length > state.limit) state.items.shift();
+        };
+        var record = function (url, status, text) {
+            try { push(url, status, JSON.parse(text)); } catch (e) { /* 非 JSON 响应 */ }
+        };
+        var origFetch = window.fetch;
+        if (origFetch) {
+            window.fetch = function () {
+                var promise = origFetch.apply(this, arguments);
+                promise.then(function (resp) {
+                    if (match(resp.url)) {
+                        resp.clone().text().then(function (text) { record(resp.url, resp.status, text); },
+                                                 function () {});
+                    }
+                }, function () {});
+                return promise;
+            };
+        }
+        var origOpen = XMLHttpRequest.prototype.open;
+        var origSend = XMLHttpRequest.prototype.send;
+        XMLHttpRequest.prototype.open = function (method, url) {
+            this.__pecUrl = url;
+            return origOpen.apply(this, arguments);
+        };
+        XMLHttpRequest.prototype.send = function () {
+            var xhr = this;
+            xhr.addEventListener('loadend', function () {
+                var url = xhr.responseURL || String(xhr.__pecUrl || '');
+                if (!match(url)) return;
+                if (xhr.responseType === 'json') {
+                    if (xhr.response !== null) push(url, xhr.status, xhr.response);
+                } else if (xhr.responseType === '' || xhr.responseType === 'text') {
+                    record(url, xhr.status, xhr.responseText);
+                }
+            });
+            return origSend.apply(this, arguments);
+        };
+    }
+    patterns.forEach(function (p) {
+        if (state.sources.indexOf(p) < 0) {
+            state.sources.push(p);
+            state.regexps.push(new RegExp(p));
+        }
+    });
+})(%s, %d);
+"""
+
+# 参数：正则字符串（空字符串表示全部）。取出并移除匹配的记录，其余保留
+_TAKE_JS = """
+var state = window.__pecCapture;
+if (!state) return [];
+var regexp = arguments[0] ? new RegExp(arguments[0]) : null;
+var taken = [], kept = [];
+state.items.forEach(function (item) {
+    (!regexp || regexp.test(item.url) ? taken : kept).push(item);
+});
+state.items = kept;
+return taken;
+"""
+
+
+@dataclass
+class CapturedResponse:
+    url: str
+    status: int
+    body: Any
+
+
+def _add_init_script(target: Any, source: str) -> None:
+    if hasattr(target, "run_cdp"):  # DrissionPage
+        target.run_cdp("Page.addScriptToEvaluateOnNewDocument", source=source)
+    else:
+        target.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": source})
+
+
+class ResponseInterceptor:
+    """拦截 URL 匹配 ``patterns`` 的 fetch / XHR JSON 响应。
+
+    Args:
+        target: Selenium driver 或 DrissionPage 页面 / 标签页。
+        patterns: URL 正则列表。
+        limit: 浏览器内最多保留的响应条数，超出时丢弃最早的。
+    """
+
+    def __init__(self, target: Any, patterns: Sequence[str], limit: int = DEFAULT_LIMIT):
+        if not patterns:
+            raise ValueError("至少需要一个 URL 正则")
+        for pattern in patterns:
+            re.compile(pattern)  # 尽早暴露写错的正则
+        self.target = target
+        self.patterns = list(patterns)
+        self.limit = limit
+        self.install()
+
+    def install(self) -> None:
+        """注册到之后的每个文档，并立即应用到当前页面。"""
+        source = _HOOK_JS % (json.dumps(self.patterns), self.limit)
+        try:
+            _add_init_script(self.target, source)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("注册响应拦截脚本失败，仅对当前页面生效: {}", exc)
+        try:
+            run_js(self.target, source)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("当前页面注入拦截脚本失败: {}", exc)
+
+    def take(self, pattern: str | None = None) -> List[CapturedResponse]:
+        """取出已拦截的响应（按到达顺序）；``pattern`` 非空时只取 URL 匹配的，其余留在缓冲中。"""
+        try:
+            items = run_js(self.target, _TAKE_JS, pattern or "") or []
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("读取拦截结果失败: {}", exc)
+            return []
+        return [CapturedResponse(item.get("url"), item.get("status"), item.get("body")) for item in items]
+
+    def clear(self) -> None:
+        """丢弃已拦截的响应，通常在触发新请求之前调用。"""
+        self.take()
+
+    def wait_for(self, pattern: str | None = None, timeout: float = 10.0) -> Optional[CapturedResponse]:
+        """等待第一条匹配的响应；超时返回 None。同批到达的其他匹配响应会一并取出并丢弃。"""
+        taken = wait_until(lambda: self.take(pattern), timeout)
+        if not taken:
+            logger.debug("{:.1f}s 内未拦截到匹配 {} 的响应", timeout, pattern or self.patterns)
+            return None
+        return taken[0]
@@ -0,0 +1,281 @@
+"""常驻浏览器池。
+
+每抓一条详情就 ``webdriver.Chrome()`` + 打开首页 + 逐个 ``add_cookie`` + ``quit``，
+启动开销远大于页面本身。``BrowserPool`` 维护 N 个预热好（已注入 Cookie）的浏览器实例：
+
+- ``with pool.browser() as driver:`` 借出一个实例，用完自动归还；
+- 单个实例处理满 ``max_pages`` 个页面后回收重建，避免 Chrome 内存持续增长；
+- 借用期间抛出会话失效类异常或归还时健康检查失败，视为崩溃，立即替换为新实例；
+- 每个槽位记录页面数、失败数、崩溃 / 回收次数与累计占用时长，``pool.metrics()`` 可查看。
+
+``factory`` / ``primer`` 可注入，测试时可以传入假的 driver 对象。
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from loguru import logger
+from selenium.common.exceptions import WebDriverException
+
+from app.config import settings
+
+# 出现这些错误信息说明浏览器进程已经不可用，需要替换
+CRASH_MARKERS = (
+    "invalid session id",
+    "chrome not reachable",
+    "disconnected",
+    "session deleted",
+    "target window already closed",
+    "no such window",
+    "tab crashed",
+)
+
+
+@dataclass
+class BrowserStats:
+    """单个槽位的统计（跨实例替换累计）。"""
+
+    slot: int
+    generation: int = 0  # 该槽位已创建过的实例数
+    pages: int = 0  # 当前实例已处理页面数
+    total_pages: int = 0
+    failures: int = 0
+    crashes: int = 0
+    recycles: int = 0
+    busy_seconds: float = 0.0
+    started_at: float = field(default_factory=time.time)
+
+
+@dataclass(eq=False)
+class PooledBrowser:
+    driver: Any
+    stats: BrowserStats
+
+
+def parse_cookie_string(cookie: str) -> Dict[str, str]:
+    """``a=1; b=2`` 形式的 Cookie 字符串 → dict。"""
+    cookies: Dict[str, str] = {}
+    for pair in cookie.split(";"):
+        if "=" in pair:
+            name, value = pair.split("=", 1)
+            cookies[name.strip()] = value.strip()
+    return cookies
+
+
+def cookie_primer(cookie: str, home_url: str, domain: str) -> Callable[[Any], None]:
+    """返回一个预热函数：打开首页并注入 Cookie，每个实例只在创建时执行一次。"""
+    pairs = parse_cookie_string(cookie)
+
+    def prime(driver) -> None:
+        driver.get(home_url)
+        for name, value in pairs.items():
+            try:
+                driver.add_cookie({"name": name, "value": value, "domain": domain})
+            except WebDriverException as exc:
+                logger.debug("设置Cookie失败: {} - {}", name, exc)
+
+    return prime
+
+
+def is_crash(exc: BaseException) -> bool:
+    msg = str(exc).lower()
+    return isinstance(exc, WebDriverException) and any(m in msg for m in CRASH_MARKERS)
+
+
+class BrowserPool:
+    """线程安全的浏览器池。
+
+    Args:
+        factory: 创建 driver 的函数，失败时可返回 None 或抛异常。
+        size: 实例数。
+        max_pages: 单个实例处理多少页面后回收重建，0 表示不回收。
+        primer: 实例创建后执行一次的预热函数（如注入 Cookie）。
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        size: int | None = None,
+        *,
+        max_pages: int | None = None,
+        primer: Callable[[Any], None] | None = None,
+    ):
+        self.factory = factory
+        self.size = size or settings.browser_pool_size
+        self.max_pages = settings.browser_max_pages if max_pages is None else max_pages
+        self.primer = primer
+        self._idle: "queue.Queue[PooledBrowser]" = queue.Queue()
+        self._all: List[PooledBrowser] = []
+        self._vacant: List[BrowserStats] = []  # 重建失败、等待补位的槽位
+        self._lock = threading.Lock()
+        self._closed = False
+        self._started = False
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+
+    def _spawn(self, stats: BrowserStats) -> PooledBrowser | None:
+        try:
+            driver = self.factory()
+        except Exception as exc:  # noqa: BLE001
+            logger.error("浏览器 #{} 创建失败: {}", stats.slot, exc)
+            return None
+        if driver is None:
+            return None
+        if self.primer is not None:
+            try:
+                self.primer(driver)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("浏览器 #{} 预热失败: {}", stats.slot, exc)
+                self._quit(driver)
+                return None
+        stats.generation += 1
+        stats.pages = 0
+        stats.started_at = time.time()
+        logger.debug("浏览器 #{} 就绪（第 {} 代）", stats.slot, stats.generation)
+        return PooledBrowser(driver, stats)
+
+    @staticmethod
+    def _quit(driver) -> None:
+        try:
+            driver.quit()
+        except Exception:  # noqa: BLE001
+            pass
+
+    def start(self) -> "BrowserPool":
+        """创建并预热全部实例；全部失败时抛出 RuntimeError。"""
+        if self._started:
+            return self
+        self._vacant = [BrowserStats(slot=slot) for slot in range(self.size)]
+        self._refill()
+        if not self._all:
+            raise RuntimeError("浏览器池启动失败：没有可用的浏览器实例")
+        self._started = True
+        logger.info("浏览器池已启动：{}/{} 个实例", len(self._all), self.size)
+        return self
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            browsers, self._all = self._all, []
+        for pb in browsers:
+            self._quit(pb.driver)
+        logger.info("浏览器池已关闭")
+
+    def __enter__(self) -> "BrowserPool":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # 借出 / 归还
+    # ------------------------------------------------------------------
+
+    def _healthy(self, driver) -> bool:
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:  # noqa: BLE001
+            return False
+
+    def _refill(self) -> None:
+        """为空缺的槽位重新创建实例。"""
+        with self._lock:
+            vacant, self._vacant = self._vacant, []
+        for stats in vacant:
+            new = self._spawn(stats)
+            with self._lock:
+                if new is None:
+                    self._vacant.append(stats)
+                    continue
+                if self._closed:
+                    self._quit(new.driver)
+                    continue
+                self._all.append(new)
+            self._idle.put(new)
+
+    def _replace(self, pb: PooledBrowser, reason: str) -> None:
+        """关闭旧实例并在同一槽位上重建；重建失败时该槽位空缺，下次借出时再补。"""
+        self._quit(pb.driver)
+        logger.info("浏览器 #{} {}，重建中…", pb.stats.slot, reason)
+        with self._lock:
+            if pb in self._all:
+                self._all.remove(pb)
+            self._vacant.append(pb.stats)
+        self._refill()
+
+    def _release(self, pb: PooledBrowser, error: BaseException | None) -> None:
+        if self._closed:
+            self._quit(pb.driver)
+            return
+        if error is not None and (is_crash(error) or not self._healthy(pb.driver)):
+            pb.stats.crashes += 1
+            self._replace(pb, "已崩溃")
+        elif self.max_pages and pb.stats.pages >= self.max_pages:
+            pb.stats.recycles += 1
+            self._replace(pb, f"已处理 {pb.stats.pages} 个页面，回收")
+        else:
+            self._idle.put(pb)
+
+    @contextmanager
+    def browser(self, timeout: float | None = None) -> Iterator[Any]:
+        """借出一个浏览器实例；``timeout`` 秒内无空闲实例时抛出 ``queue.Empty``。"""
+        self.start()
+        t0 = time.perf_counter()
+        deadline = None if timeout is None else t0 + timeout
+        while True:
+            try:
+                pb = self._idle.get(timeout=1.0)
+                break
+            except queue.Empty:
+                if self._vacant:
+                    self._refill()
+                    if not self._all:
+                        raise RuntimeError("浏览器池没有可用实例（全部重建失败）")
+                if deadline is not None and time.perf_counter() >= deadline:
+                    raise
+        t1 = time.perf_counter()
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += t1 - t0
+        error: Optional[BaseException] = None
+        try:
+            yield pb.driver
+        except BaseException as exc:
+            error = exc
+            pb.stats.failures += 1
+            raise
+        finally:
+            pb.stats.pages += 1
+            pb.stats.total_pages += 1
+            pb.stats.busy_seconds += time.perf_counter() - t1
+            self._release(pb, error)
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [asdict(pb.stats) for pb in sorted(self._all, key=lambda b: b.stats.slot)]
+
+    def log_metrics(self) -> None:
+        for m in self.metrics():
+            avg = m["busy_seconds"] / m["total_pages"] if m["total_pages"] else 0.0
+            logger.info(
+                "浏览器 #{}: 页面 {}，失败 {}，崩溃 {}，回收 {}，第 {} 代，平均 {:.2f}s/页",
+                m["slot"], m["total_pages"], m["failures"], m["crashes"], m["recycles"],
+                m["generation"], avg,
+            )
+        if self.checkouts:
+            logger.info("借出 {} 次，平均等待 {:.2f}s", self.checkouts, self.wait_seconds / self.checkouts)
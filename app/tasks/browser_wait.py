@@ -0,0 +1,76 @@
+"""基于真实信号的浏览器等待。
+
+浏览器流程里原先到处是盲等：元素已经出现后再 ``sleep(random.uniform(2, 4))``、搜索后固定 ``sleep(3)``、
+按 1 秒步长轮询全局变量。这里的等待在信号出现的那一刻返回，超时才算失败：
+
+- ``wait_until``：Python 谓词轮询（默认 100 ms 步长）；
+- ``wait_for_js``：页面内 JS 表达式返回真值；
+- ``wait_for_dom_quiet``：``MutationObserver`` 记录最后一次 DOM 变更，静默达到 ``quiet`` 秒即返回
+  （用于滚动加载、SPA 渲染完成）。
+
+等待接口响应请用 ``browser_intercept.ResponseInterceptor``。
+
+同时支持 Selenium driver（``execute_script``）与 DrissionPage 页面 / 标签页（``run_js``）。
+请求之间的礼貌间隔是另一回事，见 ``rate_control.PolitenessDelay``。
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+DEFAULT_POLL = 0.1
+
+# 安装一次 MutationObserver，返回距最后一次 DOM 变更的毫秒数
+_DOM_QUIET_JS = """
+if (!window.__pecMutation) {
+    window.__pecMutation = {last: Date.now()};
+    new MutationObserver(function () { window.__pecMutation.last = Date.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+}
+return Date.now() - window.__pecMutation.last;
+"""
+
+
+def run_js(target: Any, script: str, *args: Any) -> Any:
+    if hasattr(target, "run_js"):  # DrissionPage
+        return target.run_js(script, *args)
+    return target.execute_script(script, *args)
+
+
+def wait_until(predicate: Callable[[], T], timeout: float, poll: float = DEFAULT_POLL) -> Optional[T]:
+    """轮询 ``predicate`` 直到返回真值并返回该值；超时返回 None。谓词抛出的异常视为假。"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            value = predicate()
+        except Exception as exc:  # noqa: BLE001
+            logger.trace("等待谓词异常: {}", exc)
+            value = None
+        if value:
+            return value
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(poll)
+
+
+def wait_for_js(target: Any, script: str, timeout: float = 10.0, poll: float = DEFAULT_POLL) -> Any:
+    """等待 JS（函数体，需 ``return``）返回真值，返回该值；超时返回 None。"""
+    return wait_until(lambda: run_js(target, script), timeout, poll)
+
+
+def wait_for_selector(target: Any, selector: str, timeout: float = 10.0) -> bool:
+    """等待 CSS 选择器（可用逗号写多个）匹配到元素。"""
+    script = f"return !!document.querySelector({json.dumps(selector)});"
+    return bool(wait_for_js(target, script, timeout))
+
+
+def wait_for_dom_quiet(target: Any, quiet: float = 0.5, timeout: float = 5.0) -> bool:
+    """等待 DOM 连续 ``quiet`` 秒没有变更；超时返回 False。"""
+    quiet_ms = quiet * 1000
+    return wait_until(lambda: (run_js(target, _DOM_QUIET_JS) or 0) >= quiet_ms, timeout) is not None
@@ -0,0 +1,155 @@
+"""PostgreSQL 批量 upsert 工具。
+
+逐行 ``db.merge`` / 先查后插 + 每行 ``commit`` 会为每条记录付出多次数据库往返。
+``BulkUpserter`` 把行字典分批写成多行 VALUES 的 ``INSERT ... ON CONFLICT (...) DO UPDATE``，
+每批只提交一次，并通过 ``RETURNING (xmax = 0)`` 区分新插入与更新的行数。
+某批写入失败时会回滚并二分重试，只丢弃真正出错的行，其余行照常入库。
+
+用法::
+
+    writer = BulkUpserter(XHSNote, conflict_cols=["note_id"], update_cols=["like_count"])
+    with SessionLocal() as db:
+        stats = writer.upsert(db, rows)
+    logger.info("新增 {} 条，更新 {} 条", stats.inserted, stats.updated)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence
+
+from loguru import logger
+from sqlalchemy import literal_column
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert
+
+
+@dataclass
+class UpsertStats:
+    """一次 upsert 的统计。"""
+
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0  # 冲突但未更新（DO NOTHING 或 WHERE 条件不满足）
+    failed: int = 0  # 写入出错被丢弃的行
+    batches: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.updated + self.skipped
+
+    def __iadd__(self, other: "UpsertStats") -> "UpsertStats":
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.skipped += other.skipped
+        self.failed += other.failed
+        self.batches += other.batches
+        return self
+
+
+def iter_batches(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """把任意可迭代的行切成固定大小的批次（流式，不会一次性物化全部数据）。"""
+    batch: List[Dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BulkUpserter:
+    """基于 ``INSERT ... ON CONFLICT`` 的批量写入器。
+
+    Args:
+        model: SQLAlchemy 模型类。
+        conflict_cols: 冲突判定列（需有唯一索引），如 ``["note_id"]``。
+        update_cols: 冲突时刷新的列；为空则 ``DO NOTHING``。
+        batch_size: 每条 INSERT 语句包含的行数，每批提交一次。
+        extra_set: ``excluded -> {列: 表达式}``，冲突时额外 SET 的列（如按内容是否变化重置标记）。
+        update_where: ``excluded -> 条件``，只在条件成立时更新，否则计入 ``skipped``。
+    """
+
+    def __init__(
+        self,
+        model,
+        conflict_cols: Sequence[str],
+        update_cols: Sequence[str] | None = None,
+        batch_size: int = 1000,
+        *,
+        extra_set: Callable[[Any], Dict[str, Any]] | None = None,
+        update_where: Callable[[Any], Any] | None = None,
+    ):
+        self.model = model
+        self.table = model.__table__
+        self.conflict_cols = list(conflict_cols)
+        self.update_cols = list(update_cols or [])
+        self.batch_size = batch_size
+        self.extra_set = extra_set
+        self.update_where = update_where
+
+    def _dedupe(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """同一条 INSERT 中冲突键重复会报错（cannot affect row a second time），保留最后一条。"""
+        unique: Dict[tuple, Dict[str, Any]] = {}
+        for row in batch:
+            unique[tuple(row.get(c) for c in self.conflict_cols)] = row
+        return list(unique.values())
+
+    def _statement(self):
+        stmt = insert(self.table)
+        if self.update_cols:
+            set_ = {c: stmt.excluded[c] for c in self.update_cols}
+            if self.extra_set is not None:
+                set_.update(self.extra_set(stmt.excluded))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=self.conflict_cols,
+                set_=set_,
+                where=self.update_where(stmt.excluded) if self.update_where is not None else None,
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=self.conflict_cols)
+        # xmax = 0 表示本次新插入的行；被更新的行 xmax 为当前事务号
+        return stmt.returning(literal_column("(xmax = 0)").label("inserted"))
+
+    def _write_batch(self, db, batch: List[Dict[str, Any]]) -> UpsertStats:
+        batch = self._dedupe(batch)
+        # executemany 要求每行的键一致，缺失的列补 None；
+        # SQLAlchemy 会把同一语句的多组参数合并成多行 VALUES（insertmanyvalues）发送
+        columns = sorted({k for row in batch for k in row})
+        params = [{c: row.get(c) for c in columns} for row in batch]
+        flags = [row.inserted for row in db.execute(self._statement(), params)]
+        db.commit()
+        inserted = sum(1 for f in flags if f)
+        return UpsertStats(
+            inserted=inserted,
+            updated=len(flags) - inserted,
+            skipped=len(batch) - len(flags),
+            batches=1,
+        )
+
+    def _write_isolated(self, db, batch: List[Dict[str, Any]]) -> UpsertStats:
+        """写入一批；失败时回滚并二分重试，把错误隔离到单行。"""
+        try:
+            return self._write_batch(db, batch)
+        except SQLAlchemyError as exc:
+            db.rollback()
+            if len(batch) == 1:
+                key = {c: batch[0].get(c) for c in self.conflict_cols}
+                logger.warning("{} 写入失败，丢弃 {}: {}", self.table.name, key, exc)
+                return UpsertStats(failed=1)
+            mid = len(batch) // 2
+            stats = self._write_isolated(db, batch[:mid])
+            stats += self._write_isolated(db, batch[mid:])
+            return stats
+
+    def upsert(self, db, rows: Iterable[Dict[str, Any]]) -> UpsertStats:
+        """分批写入，返回累计统计。"""
+        stats = UpsertStats()
+        for batch in iter_batches(rows, self.batch_size):
+            stats += self._write_isolated(db, batch)
+        logger.debug(
+            "{} upsert: 新增 {} / 更新 {} / 跳过 {} / 失败 {}（{} 批）",
+            self.table.name, stats.inserted, stats.updated, stats.skipped, stats.failed, stats.batches,
+        )
+        return stats
@@ -0,0 +1,313 @@
+"""小红书 Cookie 账号池：健康度评分 + 自动隔离。
+
+原先 ``cycle_cookies`` 只是打乱后轮询，``simple_xhs_scraper`` / ``update_note_content_batch``
+干脆只读一行 Cookie；某个账号遇到 461（签名校验失败）或 406（限流）时，只能让当前请求失败，
+下一轮仍然会分到这个账号。``CookiePool`` 为每个账号记录：
+
+- 成功率（指数滑动平均 ``score``，新账号从 1.0 起步）、累计成功 / 失败数；
+- 最近一次 4xx 状态码及时间；
+- 当前窗口（``window`` 秒）内的请求数，达到 ``window_limit`` 后该窗口内不再分配；
+- 隔离状态：遇到 461 / 406 立即隔离，冷却时长 ``base_cooldown * 2 ** (strikes - 1)``，上限 ``max_cooldown``；
+  冷却结束后重新参与分配，再次触发时冷却翻倍，一次成功请求后清零。
+
+``acquire()`` 总是返回可用账号中 ``score`` 最高、本窗口请求最少的一个；全部不可用时等到最早解除的账号。
+状态按账号标识（``account_key``，不含完整 Cookie 的摘要）落盘，隔离在进程重启后仍然有效。
+
+用法::
+
+    pool = default_cookie_pool(load_cookies())
+    cookie = pool.acquire(timeout=60)
+    resp = session.post(url, headers={"cookie": cookie, ...})
+    pool.report(cookie, resp.status_code)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from app.config import settings
+
+PROJECT_ROOT = pathlib.Path(__file__).parents[2]
+
+# 触发隔离的状态码
+QUARANTINE_STATUSES = {461: "签名校验失败", 406: "请求被限流"}
+
+# Cookie 中能唯一标识账号的字段，按优先级排列
+ACCOUNT_COOKIE_KEYS = ("a1", "web_session", "webId")
+
+SCORE_ALPHA = 0.2  # 成功率滑动平均的权重
+SAVE_EVERY = 20  # 每累计多少次上报落盘一次（隔离 / 解除时立即落盘）
+
+
+def account_key(cookie: str) -> str:
+    """根据 Cookie 推导账号标识，避免把整串 Cookie 写入状态文件。"""
+    parts: Dict[str, str] = {}
+    for item in cookie.split(";"):
+        if "=" in item:
+            key, value = item.strip().split("=", 1)
+            parts[key] = value
+    for key in ACCOUNT_COOKIE_KEYS:
+        if parts.get(key):
+            raw = f"{key}={parts[key]}"
+            break
+    else:
+        raw = cookie.strip()
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class AccountHealth:
+    """单个账号的健康状态（可序列化）。"""
+
+    account: str
+    score: float = 1.0
+    successes: int = 0
+    failures: int = 0
+    last_status: Optional[int] = None
+    last_4xx: Optional[int] = None
+    last_4xx_at: float = 0.0
+    window_start: float = 0.0
+    window_requests: int = 0
+    strikes: int = 0
+    quarantined_until: float = 0.0
+    quarantines: int = 0
+
+    def quarantined(self, now: float) -> bool:
+        return self.quarantined_until > now
+
+
+class CookiePool:
+    """线程安全的 Cookie 账号池。
+
+    Args:
+        cookies: 账号 Cookie 列表，一项一个账号。
+        state_path: 状态文件路径，None 表示不落盘。
+        window: 请求计数窗口（秒）。
+        window_limit: 单账号每个窗口最多分配的请求数，0 表示不限。
+        base_cooldown: 首次隔离的冷却时长（秒）。
+        max_cooldown: 冷却时长上限（秒）。
+        clock: 时间函数，测试时可注入。
+    """
+
+    def __init__(
+        self,
+        cookies: Sequence[str],
+        state_path: pathlib.Path | None = None,
+        *,
+        window: float | None = None,
+        window_limit: int | None = None,
+        base_cooldown: float | None = None,
+        max_cooldown: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if not cookies:
+            raise ValueError("至少需要一个 Cookie")
+        self.window = window or settings.xhs_cookie_window
+        self.window_limit = settings.xhs_cookie_window_limit if window_limit is None else window_limit
+        self.base_cooldown = base_cooldown or settings.xhs_cookie_cooldown
+        self.max_cooldown = max_cooldown or settings.xhs_cookie_max_cooldown
+        self.state_path = state_path
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._save_lock = threading.Lock()
+        self._unsaved = 0
+        # 同一账号的重复行只保留一份
+        self._cookies: Dict[str, str] = {}
+        for cookie in cookies:
+            self._cookies.setdefault(account_key(cookie), cookie)
+        saved = self._load()
+        self._health: Dict[str, AccountHealth] = {
+            key: saved.get(key) or AccountHealth(key) for key in self._cookies
+        }
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def _load(self) -> Dict[str, AccountHealth]:
+        if self.state_path is None or not self.state_path.exists():
+            return {}
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning("Cookie 池状态文件损坏，将重建: {}", exc)
+            return {}
+        names = {f.name for f in fields(AccountHealth)}
+        return {
+            key: AccountHealth(**{k: v for k, v in entry.items() if k in names})
+            for key, entry in data.items()
+            if isinstance(entry, dict)
+        }
+
+    def save(self) -> None:
+        """把全部账号状态写入文件（保留文件中其他账号的记录）。"""
+        if self.state_path is None:
+            return
+        with self._cond:
+            entries = {key: asdict(h) for key, h in self._health.items()}
+            self._unsaved = 0
+        with self._save_lock:
+            if self.state_path.exists():
+                try:
+                    existing = json.loads(self.state_path.read_text(encoding="utf-8"))
+                    entries = {**existing, **entries}
+                except (OSError, ValueError):
+                    pass
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_suffix(self.state_path.suffix + ".tmp")
+            tmp.write_text(json.dumps(entries, ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, self.state_path)
+
+    # ------------------------------------------------------------------
+    # 分配
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._cookies)
+
+    def _roll_window(self, health: AccountHealth, now: float) -> None:
+        if now - health.window_start >= self.window:
+            health.window_start = now
+            health.window_requests = 0
+
+    def _eligible(self, health: AccountHealth, now: float) -> bool:
+        if health.quarantined(now):
+            return False
+        self._roll_window(health, now)
+        return not self.window_limit or health.window_requests < self.window_limit
+
+    def _available_at(self, health: AccountHealth, now: float) -> float:
+        """该账号最早何时可再分配。"""
+        at = max(now, health.quarantined_until)
+        if self.window_limit and health.window_requests >= self.window_limit:
+            at = max(at, health.window_start + self.window)
+        return at
+
+    def is_eligible(self, cookie: str) -> bool:
+        with self._cond:
+            health = self._health.get(account_key(cookie))
+            return health is not None and self._eligible(health, self.clock())
+
+    def claim(self, cookie: str) -> bool:
+        """账号可用时占用一次窗口配额并返回 True；用于调用方自行挑选账号的场景（如异步引擎）。"""
+        with self._cond:
+            health = self._health.get(account_key(cookie))
+            if health is None or not self._eligible(health, self.clock()):
+                return False
+            health.window_requests += 1
+            return True
+
+    def next_available_in(self) -> float:
+        """距最早一个账号可用还有多少秒（已有可用账号时为 0）。"""
+        with self._cond:
+            now = self.clock()
+            return min(self._available_at(h, now) for h in self._health.values()) - now
+
+    def _pick(self, now: float) -> Optional[AccountHealth]:
+        candidates = [h for h in self._health.values() if self._eligible(h, now)]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda h: (h.score, -h.window_requests))
+
+    def acquire(self, timeout: float | None = 0) -> Optional[str]:
+        """取当前最健康的可用账号；全部不可用时最多等待 ``timeout`` 秒（None 表示一直等），超时返回 None。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = self.clock()
+                health = self._pick(now)
+                if health is not None:
+                    health.window_requests += 1
+                    return self._cookies[health.account]
+                wait = min(self._available_at(h, now) for h in self._health.values()) - now
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    wait = min(wait, remaining)
+                logger.info("暂无可用 Cookie 账号，等待 {:.0f}s", wait)
+                self._cond.wait(max(wait, 0.05))
+
+    # ------------------------------------------------------------------
+    # 上报
+    # ------------------------------------------------------------------
+
+    def report(self, cookie: str, status: int, ok: bool | None = None) -> None:
+        """上报一次请求结果。
+
+        Args:
+            status: HTTP 状态码，网络异常传 0。
+            ok: 业务是否成功；None 时按 ``status == 200`` 判断（接口返回 ``success: false`` 时应传 False）。
+        """
+        key = account_key(cookie)
+        ok = status == 200 if ok is None else ok
+        save_now = False
+        with self._cond:
+            health = self._health.get(key)
+            if health is None:
+                return
+            now = self.clock()
+            health.last_status = status
+            health.score = (1 - SCORE_ALPHA) * health.score + SCORE_ALPHA * (1.0 if ok else 0.0)
+            if ok:
+                health.successes += 1
+                if health.strikes:
+                    health.strikes = 0
+                    save_now = True
+            else:
+                health.failures += 1
+            if 400 <= status < 500:
+                health.last_4xx = status
+                health.last_4xx_at = now
+            if status in QUARANTINE_STATUSES:
+                health.strikes += 1
+                health.quarantines += 1
+                cooldown = min(self.base_cooldown * 2 ** (health.strikes - 1), self.max_cooldown)
+                health.quarantined_until = now + cooldown
+                logger.warning(
+                    "账号 {} {}（HTTP {}），隔离 {:.0f}s（第 {} 次）",
+                    key, QUARANTINE_STATUSES[status], status, cooldown, health.strikes,
+                )
+                save_now = True
+            self._unsaved += 1
+            save_now = save_now or self._unsaved >= SAVE_EVERY
+            self._cond.notify_all()
+        if save_now:
+            self.save()
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> List[dict]:
+        with self._cond:
+            now = self.clock()
+            return [
+                {**asdict(h), "quarantined": h.quarantined(now)}
+                for h in sorted(self._health.values(), key=lambda h: -h.score)
+            ]
+
+    def log_summary(self) -> None:
+        for row in self.snapshot():
+            logger.info(
+                "账号 {}: score {:.2f}，成功 {} / 失败 {}，最近 4xx {}，隔离 {} 次{}",
+                row["account"], row["score"], row["successes"], row["failures"],
+                row["last_4xx"] or "-", row["quarantines"], "（隔离中）" if row["quarantined"] else "",
+            )
+
+
+def default_cookie_pool(cookies: Sequence[str]) -> CookiePool:
+    """状态文件路径取自 ``settings.xhs_cookie_pool_file`` 的账号池。"""
+    path = pathlib.Path(settings.xhs_cookie_pool_file)
+    if not path.is_absolute():
+        path = PROJECT_ROOT / path
+    return CookiePool(cookies, path)
@@ -0,0 +1,206 @@
+"""增量抓取水位。
+
+列表类采集器每次都从第 1 页翻到空页 / ``max_pages``，库里已有的数据被反复下载。
+``IncrementalCrawl`` 在 ``crawl_states`` 表中按 ``(source, keyword, area)`` 记录已见过的最新条目，
+并在翻页过程中判断每一页是否「全部已知」：
+
+- 条目的唯一键（URL / note_id / job_id）已在业务表中，或其发布时间早于水位时间，即视为已知；
+- 连续 ``stop_after`` 页全部已知时 ``should_stop`` 为 True，调用方停止翻页；
+- ``observe_page`` 只返回确实已在库中的键：发布时间往往是粗粒度的（「昨天」、``%m-%d``），
+  早于水位但未入库的条目仍需保存，时间水位只参与停止判断；
+- ``full=True`` 为全量重抓模式：照常记录水位，但从不提前停止。
+
+必须在保存本页数据 **之前** 调用 ``observe_page``，否则刚写入的条目也会被当成已知。
+
+用法::
+
+    with IncrementalCrawl("job51", KEYWORD, JOB_AREA_CODE, lookup=job_posting_urls) as crawl:
+        for page in ...:
+            known = crawl.observe_page([j["url"] for j in jobs])
+            if crawl.should_stop:
+                break
+            save(jobs)
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional, Sequence, Set
+
+from loguru import logger
+from sqlalchemy import String, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from app.config import SessionLocal
+from app.models import CrawlState, JobPosting, XHSNote, ZhilianJob
+
+KeyLookup = Callable[[object, Sequence[str]], Set[str]]
+
+
+# ---------------------------------------------------------------------------
+# 已入库判定
+# ---------------------------------------------------------------------------
+
+def existing_keys(db, column, keys: Iterable[str]) -> Set[str]:
+    """一次 ``column = ANY(:keys)`` 查询返回已入库的键。"""
+    keys = list({k for k in keys if k})
+    if not keys:
+        return set()
+    stmt = select(column).where(column == any_(bindparam("keys", keys, type_=ARRAY(String))))
+    return {row[0] for row in db.execute(stmt)}
+
+
+def job_posting_urls(db, keys: Sequence[str]) -> Set[str]:
+    return existing_keys(db, JobPosting.url, keys)
+
+
+def xhs_note_ids(db, keys: Sequence[str]) -> Set[str]:
+    return existing_keys(db, XHSNote.note_id, keys)
+
+
+def zhilian_job_ids(db, keys: Sequence[str]) -> Set[str]:
+    return existing_keys(db, ZhilianJob.job_id, keys)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    """统一成带时区的时间，便于与数据库中的 timestamptz 比较。"""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.astimezone(timezone.utc)
+
+
+# ---------------------------------------------------------------------------
+# 水位
+# ---------------------------------------------------------------------------
+
+class IncrementalCrawl:
+    """一次增量抓取的上下文。
+
+    Args:
+        source / keyword / area: 水位的键。
+        lookup: ``(db, keys) -> 已入库的键集合``。
+        full: 全量模式，不提前停止。
+        stop_after: 连续多少页全部已知后停止。
+    """
+
+    def __init__(
+        self,
+        source: str,
+        keyword: str = "",
+        area: str = "",
+        *,
+        lookup: KeyLookup,
+        full: bool = False,
+        stop_after: int = 1,
+    ):
+        self.source = source
+        self.keyword = keyword or ""
+        self.area = area or ""
+        self.lookup = lookup
+        self.full = full
+        self.stop_after = stop_after
+        self.watermark_time: Optional[datetime] = None
+        self.watermark_id: Optional[str] = None
+        self.pages = 0
+        self.new_items = 0
+        self.known_streak = 0
+        self._newest_id: Optional[str] = None
+        self._newest_time: Optional[datetime] = None
+        self._db = None
+
+    def __enter__(self) -> "IncrementalCrawl":
+        self._db = SessionLocal()
+        state = self._db.execute(
+            select(CrawlState).where(
+                CrawlState.source == self.source,
+                CrawlState.keyword == self.keyword,
+                CrawlState.area == self.area,
+            )
+        ).scalar_one_or_none()
+        if state is not None:
+            self.watermark_time = state.newest_item_time
+            self.watermark_id = state.newest_item_id
+        logger.info(
+            "[{}] {}抓取 keyword={!r} area={!r}，水位: {} / {}",
+            self.source, "全量" if self.full else "增量", self.keyword, self.area,
+            self.watermark_id or "-", self.watermark_time or "-",
+        )
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                self.save()
+        finally:
+            self._db.close()
+
+    @property
+    def should_stop(self) -> bool:
+        return not self.full and self.known_streak >= self.stop_after
+
+    def observe_page(
+        self, keys: Sequence[str], times: Sequence[Optional[datetime]] | None = None
+    ) -> Set[str]:
+        """登记一页条目（保存之前调用），返回其中已在库中的键。
+
+        早于水位时间的条目只用于 ``known_streak`` / ``should_stop`` 判断，不会出现在返回值中。
+        """
+        keys = [k for k in keys if k]
+        times = list(times) if times is not None else [None] * len(keys)
+        known = self.lookup(self._db, keys) if keys else set()
+        seen = set(known)  # 已入库或早于水位
+        for key, ts in zip(keys, times):
+            ts = _aware(ts)
+            if ts is not None and self.watermark_time is not None and ts < self.watermark_time:
+                seen.add(key)
+            if ts is not None and (self._newest_time is None or ts > self._newest_time):
+                self._newest_time = ts
+                self._newest_id = key
+        if self._newest_id is None and keys:
+            # 没有时间信息时以第一页第一条作为最新条目
+            self._newest_id = keys[0]
+
+        self.pages += 1
+        fresh = len(set(keys) - known)
+        self.new_items += fresh
+        self.known_streak = self.known_streak + 1 if keys and not set(keys) - seen else 0
+        logger.debug("[{}] 第 {} 页: {} 条，未入库 {} 条", self.source, self.pages, len(keys), fresh)
+        if self.should_stop:
+            logger.info("[{}] 连续 {} 页全部为已知条目，停止翻页", self.source, self.known_streak)
+        return known
+
+    def save(self) -> None:
+        """写回水位（仅向前推进）。"""
+        now = datetime.now(timezone.utc)
+        newest_id, newest_time = self._newest_id or self.watermark_id, self._newest_time
+        if self.watermark_time is not None and (newest_time is None or newest_time < self.watermark_time):
+            newest_id, newest_time = self.watermark_id, self.watermark_time
+        values = {
+            "source": self.source,
+            "keyword": self.keyword,
+            "area": self.area,
+            "newest_item_id": newest_id,
+            "newest_item_time": newest_time,
+            "last_run_at": now,
+            "last_run_pages": self.pages,
+            "last_run_new_items": self.new_items,
+        }
+        if self.full:
+            values["last_full_run_at"] = now
+        stmt = insert(CrawlState).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_crawl_state",
+            set_={k: stmt.excluded[k] for k in values if k not in ("source", "keyword", "area")},
+        )
+        self._db.execute(stmt)
+        self._db.commit()
+        logger.info("[{}] 本次翻页 {} 页，新条目 {} 条", self.source, self.pages, self.new_items)
+
+
+def crawl_states(source: str | None = None) -> List[CrawlState]:
+    """列出水位（调试用）。"""
+    with SessionLocal() as db:
+        stmt = select(CrawlState).order_by(CrawlState.source, CrawlState.keyword)
+        if source:
+            stmt = stmt.where(CrawlState.source == source)
+        return list(db.execute(stmt).scalars())
@@ -0,0 +1,123 @@
+"""列表 / 详情两阶段抓取流水线。
+
+原先列表页上的每个职位都在同一个标签页里 ``get(详情页)``，列表页被覆盖、翻页按钮失效，
+详情抓取也只能串行。``DetailPipeline`` 把两者拆开：
+
+- 列表阶段（调用方线程）解析列表页后 ``submit(job_info)``，有界队列提供背压；
+- 详情阶段每个 worker 线程独占一个浏览器句柄（DrissionPage 标签页 / 独立的 webdriver），
+  从队列取任务调用 ``fetch_detail(handle, job_info)``，并发度即句柄数；
+- 详情结果合并进 ``job_info`` 后立即交给 ``on_result``（通常是 ``JobSink.add``），
+  回调在锁内串行执行，写库缓冲无需线程安全。
+
+句柄的创建与关闭由调用方负责。
+
+用法::
+
+    with DetailPipeline(tabs, fetch_detail, sink.add) as pipeline:
+        for job in list_jobs:
+            pipeline.submit(job)
+    # 退出时等待队列清空
+"""
+
+from __future__ import annotations
+
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from loguru import logger
+
+DetailFetcher = Callable[[Any, Dict], Dict]
+
+_STOP = object()
+
+
+class DetailPipeline:
+    """并发详情抓取。
+
+    Args:
+        handles: 浏览器句柄，每个对应一个 worker 线程。
+        fetch_detail: ``(handle, job_info) -> 详情字段``。
+        on_result: 接收补全后的 ``job_info``。
+        delay: 每个 worker 两次详情请求之间的随机间隔（秒）。
+        max_pending: 队列上限，列表阶段领先过多时 ``submit`` 会阻塞。
+    """
+
+    def __init__(
+        self,
+        handles: Sequence[Any],
+        fetch_detail: DetailFetcher,
+        on_result: Callable[[Dict], Any],
+        *,
+        delay: Tuple[float, float] = (1.0, 3.0),
+        max_pending: int | None = None,
+    ):
+        if not handles:
+            raise ValueError("至少需要一个浏览器句柄")
+        self.fetch_detail = fetch_detail
+        self.on_result = on_result
+        self.delay = delay
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending or len(handles) * 10)
+        self._result_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._started_at = time.perf_counter()
+        self._threads: List[threading.Thread] = [
+            threading.Thread(target=self._worker, args=(handle,), name=f"detail-{i}", daemon=True)
+            for i, handle in enumerate(handles)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job_info: Dict) -> None:
+        self._queue.put(job_info)
+        self.submitted += 1
+
+    def _worker(self, handle: Any) -> None:
+        while True:
+            job_info = self._queue.get()
+            if job_info is _STOP:
+                return
+            t0 = time.perf_counter()
+            try:
+                job_info.update(self.fetch_detail(handle, job_info) or {})
+            except Exception as exc:  # noqa: BLE001
+                # 详情失败时仍保存列表页上的字段
+                logger.warning("详情抓取失败 {}: {}", job_info.get("job_url"), exc)
+                with self._stats_lock:
+                    self.failed += 1
+            elapsed = time.perf_counter() - t0
+            try:
+                with self._result_lock:
+                    self.on_result(job_info)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("保存职位失败 {}: {}", job_info.get("job_id"), exc)
+            with self._stats_lock:
+                self.completed += 1
+                self.busy_seconds += elapsed
+            if self.delay[1] > 0:
+                time.sleep(random.uniform(*self.delay))
+
+    def close(self) -> None:
+        """等待已提交的任务全部完成并结束 worker 线程。"""
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        wall = time.perf_counter() - self._started_at
+        logger.info(
+            "详情抓取完成 {}/{} 条（失败 {}），{} 个并发，单条平均 {:.2f}s，总耗时 {:.1f}s",
+            self.completed, self.submitted, self.failed, len(self._threads),
+            self.busy_seconds / self.completed if self.completed else 0.0, wall,
+        )
+
+    def __enter__(self) -> "DetailPipeline":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
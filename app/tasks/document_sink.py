@@ -0,0 +1,292 @@
+"""采集结果统一入库 ``documents``。
+
+小红书笔记、51Job 岗位、智联职位分别落在 ``xhs_notes`` / ``job_postings`` / ``zhilian_jobs``，
+下游分析要各写一套查询。这里把三张表投影到 ``documents``（source / url / title / content /
+publish_at / raw_json / company_hint），下游只需扫描这一张带索引的表：
+
+- ``xhs_note_document`` 等规整函数把源表行转换成 ``documents`` 行；
+- ``sync_documents`` 按源表主键（note_id / url / job_id）读回刚写入的行并 upsert 到 ``documents``，
+  各爬虫写源表后（``JobSink`` 的 ``on_flush``、``upsert_note_rows``）自动调用，
+  读源表而不是直接用爬虫字典，保证 ``documents`` 与源表一致（智联已存在的职位不会被覆盖等）；
+- ``backfill_documents`` 按 id 键集分页回填已有数据。
+
+写入为 ``INSERT ... ON CONFLICT (url) DO UPDATE ... WHERE 有字段变化``：重复同步不会改写未变化的行；
+标题或正文变化时把 ``processed`` 置回 false、清空 ``embedding``，下游分析 / 向量化会重新处理这些文档；
+只有 ``raw_json`` 变化（如笔记点赞数）时只重置 ``processed``。
+
+用法::
+
+    python -m app.tasks.document_sink                  # 回填全部来源
+    python -m app.tasks.document_sink xhs --chunk-size 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import case, false, null, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import SessionLocal, settings
+from app.models import Document, JobPosting, XHSNote, ZhilianJob
+from app.tasks.bulk_writer import BulkUpserter, UpsertStats, iter_batches
+
+# 冲突时刷新的列；其中任一列变化才会真正更新
+DOCUMENT_REFRESH_COLUMNS = ("source", "title", "content", "publish_at", "raw_json", "company_hint")
+
+DEFAULT_BATCH_SIZE = 500
+
+XHS_NOTE_URL = "https://www.xiaohongshu.com/explore/{}"
+ZHILIAN_JOB_URL = "https://jobs.zhaopin.com/{}.htm"
+
+
+# ---------------------------------------------------------------------------
+# 字段规整：源表行 → documents 行
+# ---------------------------------------------------------------------------
+
+def _clip(value: Any, size: int) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value[:size] if value else None
+
+
+def _join(*parts: Any) -> str:
+    return "\n".join(str(p).strip() for p in parts if p and str(p).strip())
+
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    """51Job 的 post_date 是字符串（``2024-05-01 10:00:00`` / ``2024-05-01``），其他格式返回 None。"""
+    if isinstance(value, datetime) or not value:
+        return value or None
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def xhs_note_document(row: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """``xhs_notes`` 行 → ``documents`` 行；正文为空（尚未抓详情）时用标题代替。"""
+    note_id = row.get("note_id")
+    if not note_id:
+        return None
+    title = _clip(row.get("title"), 256)
+    return {
+        "source": "xhs",
+        "url": row.get("url") or XHS_NOTE_URL.format(note_id),
+        "title": title,
+        "content": _join(row.get("desc")) or title or "",
+        "publish_at": row.get("publish_time"),
+        "raw_json": row.get("raw_json"),
+        "company_hint": None,
+    }
+
+
+def job_posting_document(row: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """``job_postings`` 行 → ``documents`` 行；正文由职位、公司、地点、薪资及原始数据中的职位描述拼成。"""
+    url = row.get("url")
+    if not url:
+        return None
+    raw = row.get("raw_json") or {}
+    description = next((raw[k] for k in ("job_description", "jobDescribe", "description") if raw.get(k)), None)
+    return {
+        "source": "job51",
+        "url": url,
+        "title": _clip(row.get("title"), 256),
+        "content": _join(row.get("title"), row.get("company_name"), row.get("location"),
+                         row.get("salary"), description),
+        "publish_at": _parse_date(row.get("post_date")),
+        "raw_json": raw or None,
+        "company_hint": _clip(row.get("company_name"), 256),
+    }
+
+
+def zhilian_job_document(row: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """``zhilian_jobs`` 行 → ``documents`` 行；没有详情链接时按 job_id 拼出职位页 URL。"""
+    job_id = row.get("job_id")
+    if not job_id:
+        return None
+    return {
+        "source": "zhilian",
+        "url": row.get("job_url") or ZHILIAN_JOB_URL.format(job_id),
+        "title": _clip(row.get("job_title"), 256),
+        "content": _join(row.get("job_title"), row.get("company_name"), row.get("work_city"),
+                         row.get("salary"), row.get("job_description"), row.get("job_requirements"),
+                         row.get("welfare")),
+        "publish_at": row.get("publish_time"),
+        "raw_json": row.get("raw_json"),
+        "company_hint": _clip(row.get("company_name"), 256),
+    }
+
+
+@dataclass(frozen=True)
+class DocumentSource:
+    """一个采集来源：源表、用于定位行的唯一键列、规整函数。"""
+
+    name: str
+    model: Any
+    key: str
+    normalize: Callable[[Mapping[str, Any]], Optional[Dict[str, Any]]]
+
+    @property
+    def columns(self):
+        return list(self.model.__table__.c)
+
+
+SOURCES: Dict[str, DocumentSource] = {
+    source.name: source
+    for source in (
+        DocumentSource("xhs", XHSNote, "note_id", xhs_note_document),
+        DocumentSource("job51", JobPosting, "url", job_posting_document),
+        DocumentSource("zhilian", ZhilianJob, "job_id", zhilian_job_document),
+    )
+}
+
+
+# ---------------------------------------------------------------------------
+# 写入
+# ---------------------------------------------------------------------------
+
+def _text_changed(excluded):
+    return or_(
+        Document.title.is_distinct_from(excluded.title),
+        Document.content.is_distinct_from(excluded.content),
+    )
+
+
+def document_writer(batch_size: int = DEFAULT_BATCH_SIZE) -> BulkUpserter:
+    """``documents`` 写入器：按 URL 去重，字段无变化的行跳过；文本变化时重置 processed / embedding。"""
+    return BulkUpserter(
+        Document,
+        conflict_cols=["url"],
+        update_cols=DOCUMENT_REFRESH_COLUMNS,
+        batch_size=batch_size,
+        extra_set=lambda excluded: {
+            # raw_json 变化（如笔记点赞数）也要重新分析；分析时内容哈希未变的文档只标记完成
+            "processed": case(
+                (or_(_text_changed(excluded), Document.raw_json.is_distinct_from(excluded.raw_json)), false()),
+                else_=Document.processed,
+            ),
+            "embedding": case((_text_changed(excluded), null()), else_=Document.embedding),
+            "embedding_model": case((_text_changed(excluded), null()), else_=Document.embedding_model),
+        },
+        update_where=lambda excluded: or_(
+            *(getattr(Document, c).is_distinct_from(excluded[c]) for c in DOCUMENT_REFRESH_COLUMNS)
+        ),
+    )
+
+
+def _normalized(source: DocumentSource, rows: Iterable[Mapping[str, Any]]) -> Iterable[Dict[str, Any]]:
+    for row in rows:
+        doc = source.normalize(row)
+        if doc is not None:
+            yield doc
+
+
+def sync_documents(
+    db,
+    source: str,
+    keys: Iterable[Any],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> UpsertStats:
+    """把源表中唯一键属于 ``keys`` 的行同步到 ``documents``（每批提交一次）。"""
+    src = SOURCES[source]
+    key_col = getattr(src.model, src.key)
+    writer = document_writer(batch_size)
+    stats = UpsertStats()
+    for chunk in iter_batches(dict.fromkeys(k for k in keys if k), batch_size):
+        rows = db.execute(select(*src.columns).where(key_col.in_(chunk))).mappings().all()
+        stats += writer.upsert(db, _normalized(src, rows))
+    return stats
+
+
+def sync_after_write(db, source: str, keys: Iterable[Any]) -> None:
+    """源表写入后的同步钩子：``settings.document_sync`` 关闭时不做任何事，同步出错只记日志，不影响采集。"""
+    if not settings.document_sync:
+        return
+    try:
+        stats = sync_documents(db, source, keys)
+    except SQLAlchemyError as exc:
+        db.rollback()
+        logger.warning("同步 {} 到 documents 失败: {}", source, exc)
+        return
+    logger.debug("documents 同步 {}：新增 {} / 更新 {} / 未变化 {}", source, stats.inserted, stats.updated, stats.skipped)
+
+
+def document_hook(source: str) -> Callable[[Any, List[Dict[str, Any]]], None]:
+    """供 ``JobSink(on_flush=...)`` 使用：按刚写入行的唯一键同步。"""
+    key = SOURCES[source].key
+
+    def hook(db, rows: List[Dict[str, Any]]) -> None:
+        sync_after_write(db, source, (row.get(key) for row in rows))
+
+    return hook
+
+
+# ---------------------------------------------------------------------------
+# 回填
+# ---------------------------------------------------------------------------
+
+def backfill_source(
+    db,
+    source: str,
+    chunk_size: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> UpsertStats:
+    """按 id 键集分页（``WHERE id > :last ORDER BY id LIMIT :chunk``）把一个来源全部回填到 ``documents``。
+
+    每页独立查询，不持有长事务或服务端游标；重复运行是幂等的，未变化的行计入 ``skipped``。
+    """
+    src = SOURCES[source]
+    chunk_size = chunk_size or settings.document_backfill_chunk
+    writer = document_writer(batch_size)
+    stats = UpsertStats()
+    last_id, scanned = 0, 0
+    while True:
+        rows = db.execute(
+            select(*src.columns)
+            .where(src.model.id > last_id)
+            .order_by(src.model.id)
+            .limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        scanned += len(rows)
+        stats += writer.upsert(db, _normalized(src, rows))
+        logger.info("回填 {}：已扫描 {} 行（id ≤ {}）", source, scanned, last_id)
+    logger.info(
+        "回填 {} 完成：新增 {} / 更新 {} / 未变化 {} / 失败 {}",
+        source, stats.inserted, stats.updated, stats.skipped, stats.failed,
+    )
+    return stats
+
+
+def backfill_documents(sources: Sequence[str] | None = None, chunk_size: int | None = None) -> Dict[str, UpsertStats]:
+    """回填指定来源（默认全部），返回各来源的统计。"""
+    results: Dict[str, UpsertStats] = {}
+    with SessionLocal() as db:
+        for source in sources or SOURCES:
+            results[source] = backfill_source(db, source, chunk_size)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="把各采集表回填到 documents")
+    parser.add_argument("sources", nargs="*", help=f"来源（{' / '.join(SOURCES)}），默认全部")
+    parser.add_argument("--chunk-size", type=int, default=None, help="每批读取的源表行数")
+    args = parser.parse_args()
+    unknown = set(args.sources) - set(SOURCES)
+    if unknown:
+        parser.error(f"未知来源: {', '.join(sorted(unknown))}")
+    backfill_documents(args.sources, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
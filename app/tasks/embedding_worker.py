@@ -0,0 +1,336 @@
+"""文档向量化：为 ``documents.embedding`` 批量计算向量，并提供近邻查询。
+
+- ``create_encoder`` 按 ``settings.embedding_model`` 创建编码器：sentence-transformers 模型名或本地路径，
+  在 CPU 上运行，输出维度须与列定义（768）一致；``hashing`` 为确定性的字符 n-gram 哈希向量，
+  只反映字面重合、没有语义，仅供测试与离线调试，须显式指定（``--model hashing``），调度任务不会使用；
+- ``embed_pending`` 按 id 键集分页取 ``embedding_model`` 为空或与当前编码器不同的文档，编码后用一条
+  executemany UPDATE 批量写回向量和编码器名，每批提交一次。UPDATE 带内容哈希条件：编码期间文本被采集
+  更新过的文档不会写入旧向量；
+- ``ensure_vector_index`` 创建 HNSW（默认）或 IVFFlat 余弦索引；
+- ``similar_documents(doc_id, k)`` 用 ``ORDER BY embedding <=> :vec LIMIT k`` 走向量索引做近邻查询。
+
+文本变化时 ``document_sink`` 会清空 embedding / embedding_model，下一轮自动重新编码；更换模型后旧向量
+按编码器名识别并逐轮重算，近邻查询只在同一编码器的向量之间进行，不会混用。
+
+用法::
+
+    python -m app.tasks.embedding_worker                       # 编码全部待处理文档并建索引
+    python -m app.tasks.embedding_worker --model shibing624/text2vec-base-chinese
+    python -m app.tasks.embedding_worker --similar 123 -k 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional, Protocol, Sequence
+
+import numpy as np
+from loguru import logger
+from sqlalchemy import bindparam, func, or_, select, text, update
+
+from app.config import SessionLocal, settings
+from app.models import Document
+
+EMBEDDING_DIM = getattr(Document.__table__.c.embedding.type, "dim", None) or 768
+
+INDEX_METHODS = ("hnsw", "ivfflat")
+
+# 标题 + 正文的哈希，写回时用来确认编码期间文本未变化
+TEXT_HASH = func.md5(func.coalesce(Document.title, "") + "\n" + Document.content)
+
+
+# ---------------------------------------------------------------------------
+# 编码器
+# ---------------------------------------------------------------------------
+
+class Encoder(Protocol):
+    name: str
+    dim: int
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """返回 ``(len(texts), dim)`` 的 float32 矩阵，每行 L2 归一化。"""
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+class HashingEncoder:
+    """确定性的哈希向量：字符一元 / 二元组经 CRC32 映射到 ``dim`` 个桶（带符号），再 L2 归一化。
+
+    不理解语义，但相同的文本总得到相同的向量、用字相近的文本距离更近，只用于测试与无模型环境。
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    @staticmethod
+    def _grams(text: str) -> List[str]:
+        chars = [c for c in text.lower() if not c.isspace()]
+        return chars + [a + b for a, b in zip(chars, chars[1:])]
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            hashes = np.fromiter(
+                (zlib.crc32(g.encode("utf-8")) for g in self._grams(text or "")), dtype=np.uint32,
+            )
+            if not hashes.size:
+                continue
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[i], hashes % self.dim, signs)
+        return _normalize(vectors)
+
+
+class SentenceTransformerEncoder:
+    """sentence-transformers 模型（可选依赖，``pip install sentence-transformers``），固定在 CPU 上运行。"""
+
+    def __init__(self, model_name: str, batch_size: int | None = None):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ModuleNotFoundError as exc:
+            raise RuntimeError(
+                f"embedding_model={model_name!r} 需要 sentence-transformers，"
+                "请先安装（测试时可用 --model hashing）"
+            ) from exc
+        self.name = model_name
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        if self.dim != EMBEDDING_DIM:
+            raise ValueError(f"模型 {model_name} 输出 {self.dim} 维，documents.embedding 为 {EMBEDDING_DIM} 维")
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            list(texts), batch_size=self.batch_size, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False,
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+def create_encoder(name: str | None = None) -> Encoder:
+    """按名称（默认 ``settings.embedding_model``）创建编码器。"""
+    name = name or settings.embedding_model
+    if not name:
+        raise RuntimeError("未配置 embedding_model（sentence-transformers 模型名或本地路径）")
+    if name == HashingEncoder.name:
+        return HashingEncoder()
+    return SentenceTransformerEncoder(name)
+
+
+# ---------------------------------------------------------------------------
+# 批量编码
+# ---------------------------------------------------------------------------
+
+@dataclass
+class EmbedStats:
+    embedded: int = 0
+    stale: int = 0  # 编码期间文本已变化、未写入的文档（保持 NULL，下一轮重算）
+    batches: int = 0
+
+
+_UPDATE_EMBEDDING = (
+    update(Document.__table__)
+    .where(Document.id == bindparam("doc_id"), TEXT_HASH == bindparam("text_hash"))
+    .values(embedding=bindparam("vector"), embedding_model=bindparam("model"))
+)
+
+
+def document_text(title: Optional[str], content: Optional[str], max_chars: int | None = None) -> str:
+    """编码用的文本：标题 + 正文，截断到 ``max_chars``（模型本身有输入长度上限）。"""
+    max_chars = max_chars or settings.embedding_max_chars
+    return f"{title or ''}\n{content or ''}".strip()[:max_chars]
+
+
+def embed_pending(
+    db,
+    encoder: Encoder,
+    batch_size: int | None = None,
+    limit: int | None = None,
+) -> EmbedStats:
+    """为尚未由 ``encoder`` 编码的文档（无向量或由其他编码器生成）编码并写回，``limit`` 为本次最多处理的条数。"""
+    batch_size = batch_size or settings.embedding_batch_size
+    stats = EmbedStats()
+    last_id = 0
+    while limit is None or stats.embedded + stats.stale < limit:
+        size = batch_size if limit is None else min(batch_size, limit - stats.embedded - stats.stale)
+        rows = db.execute(
+            select(Document.id, Document.title, Document.content, TEXT_HASH.label("text_hash"))
+            .where(
+                or_(Document.embedding_model.is_(None), Document.embedding_model != encoder.name),
+                Document.id > last_id,
+            )
+            .order_by(Document.id)
+            .limit(size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        vectors = encoder.encode([document_text(row.title, row.content) for row in rows])
+        result = db.execute(_UPDATE_EMBEDDING, [
+            {"doc_id": row.id, "text_hash": row.text_hash, "vector": vector, "model": encoder.name}
+            for row, vector in zip(rows, vectors)
+        ])
+        db.commit()
+        written = result.rowcount if result.rowcount >= 0 else len(rows)
+        stats.embedded += written
+        stats.stale += len(rows) - written
+        stats.batches += 1
+        logger.debug("已编码 {} 条文档（id ≤ {}）", stats.embedded, last_id)
+    return stats
+
+
+def reset_embeddings(db) -> int:
+    """清空全部向量（需要立即停用旧向量时调用；更换模型本身不需要），返回影响行数。"""
+    count = db.execute(
+        update(Document)
+        .where(or_(Document.embedding.is_not(None), Document.embedding_model.is_not(None)))
+        .values(embedding=None, embedding_model=None)
+    ).rowcount
+    db.commit()
+    return count
+
+
+# ---------------------------------------------------------------------------
+# 向量索引
+# ---------------------------------------------------------------------------
+
+def ensure_vector_index(db, method: str | None = None) -> str:
+    """创建 ``documents.embedding`` 的余弦距离索引（已存在则跳过），返回索引名。
+
+    HNSW 查询更快、可在空表上建立，之后增量维护；IVFFlat 建索引更快、占用更小，
+    但聚类中心取自建索引时的数据，应在大部分文档编码完成后再建，数据量变化较大时需重建。
+    """
+    method = method or settings.embedding_index
+    if method not in INDEX_METHODS:
+        raise ValueError(f"未知索引类型 {method!r}，可选 {INDEX_METHODS}")
+    name = f"ix_documents_embedding_{method}"
+    if method == "hnsw":
+        options = "m = 16, ef_construction = 64"
+    else:
+        # pgvector 建议：100 万行以内 lists = 行数 / 1000，之上 sqrt(行数)
+        rows = db.execute(select(func.count()).where(Document.embedding.is_not(None))).scalar_one()
+        options = f"lists = {max(10, rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows)))}"
+    db.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    if db.execute(select(func.to_regclass(name))).scalar() is not None:
+        db.commit()
+        return name
+    db.execute(select(func.set_config("maintenance_work_mem", settings.embedding_index_work_mem, True)))
+    db.execute(text(
+        f"CREATE INDEX IF NOT EXISTS {name} ON documents "
+        f"USING {method} (embedding vector_cosine_ops) WITH ({options})"
+    ))
+    db.commit()
+    return name
+
+
+# ---------------------------------------------------------------------------
+# 近邻查询
+# ---------------------------------------------------------------------------
+
+@dataclass
+class SimilarDocument:
+    id: int
+    source: Optional[str]
+    title: Optional[str]
+    url: Optional[str]
+    distance: float  # 余弦距离，0 表示方向完全相同
+
+
+def similar_documents(doc_id: int, k: int = 10, db=None) -> List[SimilarDocument]:
+    """与 ``doc_id`` 最相近的 k 篇文档（按余弦距离升序）；该文档尚未编码时返回空列表。
+
+    先取出目标向量再以参数形式查询，``ORDER BY embedding <=> :vec LIMIT k`` 可直接走 HNSW / IVFFlat 索引；
+    只比较同一编码器生成的向量（更换模型、尚未全部重算期间不会混入旧向量）。近似索引只返回有限个候选，
+    按编码器过滤后不足 k 条时（重算期间两种向量混存）改用不走索引的精确查询。
+    """
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        target = db.execute(
+            select(Document.embedding, Document.embedding_model).where(Document.id == doc_id)
+        ).one_or_none()
+        if target is None or target.embedding is None:
+            return []
+        vector = target.embedding
+        distance = Document.embedding.cosine_distance(vector)
+        query = (
+            select(Document.id, Document.source, Document.title, Document.url, distance.label("distance"))
+            .where(
+                Document.id != doc_id,
+                Document.embedding.is_not(None),
+                Document.embedding_model == target.embedding_model,
+            )
+            .order_by(distance)
+            .limit(k)
+        )
+        rows = db.execute(query).all()
+        if len(rows) < k:
+            db.execute(select(func.set_config("enable_indexscan", "off", True)))
+            rows = db.execute(query).all()
+            db.rollback()
+        return [SimilarDocument(*row) for row in rows]
+    finally:
+        if own_session:
+            db.close()
+
+
+# ---------------------------------------------------------------------------
+# 入口
+# ---------------------------------------------------------------------------
+
+def run(model: str | None = None, batch_size: int | None = None, limit: int | None = None,
+        index: str | None = None, reset: bool = False) -> EmbedStats:
+    """编码待处理文档并确保向量索引存在（供调度器调用）。
+
+    哈希编码器只在显式传入 ``model="hashing"`` 时使用；配置为 ``hashing`` 时拒绝运行，
+    避免定时任务把没有语义的哈希向量写进生产数据。
+    """
+    if model is None and settings.embedding_model == HashingEncoder.name:
+        raise RuntimeError("embedding_model=hashing 只用于测试，定时任务不使用；请配置模型或显式 --model hashing")
+    encoder = create_encoder(model)
+    with SessionLocal() as db:
+        if reset:
+            logger.info("已清空 {} 条文档的向量", reset_embeddings(db))
+        t0 = time.perf_counter()
+        stats = embed_pending(db, encoder, batch_size, limit)
+        elapsed = time.perf_counter() - t0
+        index_name = ensure_vector_index(db, index)
+    logger.success(
+        "向量化完成（{}）：写入 {} 条，文本已变化 {} 条，用时 {:.1f}s；索引 {}",
+        encoder.name, stats.embedded, stats.stale, elapsed, index_name,
+    )
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="documents 向量化与近邻查询")
+    parser.add_argument("--model", default=None, help="sentence-transformers 模型名，默认取配置；hashing 为测试用哈希向量")
+    parser.add_argument("--batch-size", type=int, default=None, help="每批编码的文档数")
+    parser.add_argument("--limit", type=int, default=None, help="本次最多编码的文档数")
+    parser.add_argument("--index", choices=INDEX_METHODS, default=None, help="向量索引类型，默认取配置")
+    parser.add_argument("--reset", action="store_true", help="先清空全部向量（更换模型无需此项，旧向量会按编码器名自动重算）")
+    parser.add_argument("--similar", type=int, metavar="DOC_ID", help="只查询与该文档最相近的文档")
+    parser.add_argument("-k", type=int, default=10, help="近邻数量")
+    args = parser.parse_args()
+
+    if args.similar is not None:
+        t0 = time.perf_counter()
+        results = similar_documents(args.similar, args.k)
+        logger.info("查询用时 {:.1f} ms", (time.perf_counter() - t0) * 1000)
+        for doc in results:
+            print(f"{doc.distance:.4f}  [{doc.source}] {doc.id} {doc.title}  {doc.url}")
+        return
+    run(args.model, args.batch_size, args.limit, args.index, args.reset)
+
+
+if __name__ == "__main__":
+    main()
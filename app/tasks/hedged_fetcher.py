@@ -0,0 +1,260 @@
+"""多策略对冲请求引擎。
+
+同一份数据往往有多个获取途径（不同接口版本、GET / POST、浏览器等），依次串行尝试时
+一条全部失败的数据要付出所有途径的超时与间隔之和。``HedgedFetcher``：
+
+- 为每个策略维护最近成功率与延迟的 EWMA，按「期望耗时 = 延迟 / 成功率」排序，优先尝试历史最好的策略；
+- 首选策略在自适应延迟（其延迟 EWMA + 4 倍偏差，类似 TCP RTO）内未返回时，并行发出下一个策略（对冲）；
+  首选策略明确失败时立即切换，不再等待；
+- 连续返回 ``cooldown_statuses``（默认 404/406）达到阈值的策略进入冷却期，期间不参与排序；
+- 先成功的结果即返回；落后的请求在后台完成后仍会更新统计，并计入「浪费请求」。
+
+策略函数签名为 ``fn(*args) -> (status, data)``，``data`` 为真值表示成功。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+StrategyFn = Callable[..., Tuple[int, Any]]
+
+
+@dataclass
+class StrategyStats:
+    """单个策略的运行统计。"""
+
+    name: str
+    attempts: int = 0
+    successes: int = 0
+    failures: int = 0
+    wins: int = 0  # 作为最终结果返回的次数
+    wasted: int = 0  # 已发出但结果未被采用的次数
+    success_rate: float = 1.0  # EWMA，初始乐观，保证新策略有机会被尝试
+    latency: Optional[float] = None  # EWMA（秒）
+    latency_dev: float = 0.0  # 延迟的 EWMA 平均偏差
+    consecutive_blocks: int = 0
+    cooldown_until: float = 0.0
+    cooldowns: int = 0
+    last_status: Optional[int] = None
+
+    def expected_cost(self, default_latency: float) -> float:
+        latency = self.latency if self.latency is not None else default_latency
+        return latency / max(self.success_rate, 0.05)
+
+
+@dataclass
+class Strategy:
+    name: str
+    fn: StrategyFn
+    stats: StrategyStats = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.stats = StrategyStats(self.name)
+
+
+class HedgedFetcher:
+    """按历史表现排序、带对冲与冷却的多策略请求器（线程安全）。
+
+    Args:
+        strategies: ``(name, fn)`` 列表，顺序即冷启动时的优先级。
+        alpha: EWMA 平滑系数。
+        min_hedge_delay / max_hedge_delay: 对冲延迟的上下限（秒）。
+        cooldown: 冷却时长（秒），连续多次冷却时按 2 的幂递增，最多 8 倍。
+        cooldown_statuses: 视为「被限制 / 不可用」的状态码。
+        block_threshold: 连续多少次命中上述状态码后进入冷却。
+        max_workers: 并发线程数上限。
+    """
+
+    def __init__(
+        self,
+        strategies: Sequence[Tuple[str, StrategyFn]],
+        *,
+        alpha: float = 0.2,
+        min_hedge_delay: float = 0.3,
+        max_hedge_delay: float = 5.0,
+        cooldown: float = 300.0,
+        cooldown_statuses: Sequence[int] = (404, 406),
+        block_threshold: int = 3,
+        max_workers: int = 8,
+    ):
+        if not strategies:
+            raise ValueError("至少需要一个策略")
+        self.strategies = [Strategy(name, fn) for name, fn in strategies]
+        self.alpha = alpha
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.cooldown = cooldown
+        self.cooldown_statuses = set(cooldown_statuses)
+        self.block_threshold = block_threshold
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []  # 每次 fetch 的端到端耗时
+        self.fetches = 0
+        self.resolved = 0
+        self.hedges = 0
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def _record(self, strategy: Strategy, status: int, ok: bool, elapsed: float) -> None:
+        s = strategy.stats
+        a = self.alpha
+        with self._lock:
+            s.attempts += 1
+            s.last_status = status
+            s.success_rate = (1 - a) * s.success_rate + a * (1.0 if ok else 0.0)
+            if s.latency is None:
+                s.latency = elapsed
+                s.latency_dev = elapsed / 2
+            else:
+                s.latency_dev = (1 - a) * s.latency_dev + a * abs(elapsed - s.latency)
+                s.latency = (1 - a) * s.latency + a * elapsed
+            if ok:
+                s.successes += 1
+                s.consecutive_blocks = 0
+                s.cooldowns = 0
+                return
+            s.failures += 1
+            if status not in self.cooldown_statuses:
+                return
+            s.consecutive_blocks += 1
+            if s.consecutive_blocks >= self.block_threshold:
+                duration = self.cooldown * 2 ** min(s.cooldowns, 3)
+                s.cooldown_until = time.monotonic() + duration
+                s.cooldowns += 1
+                s.consecutive_blocks = 0
+                logger.warning("策略 {} 连续返回 {}，冷却 {:.0f}s", s.name, status, duration)
+
+    def ranking(self) -> List[Strategy]:
+        """当前可用（未冷却）的策略，按期望耗时升序。"""
+        now = time.monotonic()
+        with self._lock:
+            available = [st for st in self.strategies if st.stats.cooldown_until <= now]
+            known = [st.stats.latency for st in available if st.stats.latency is not None]
+            default = sum(known) / len(known) if known else 1.0
+            order = {id(st): i for i, st in enumerate(self.strategies)}
+            return sorted(available, key=lambda st: (st.stats.expected_cost(default), order[id(st)]))
+
+    def hedge_delay(self, strategy: Strategy) -> float:
+        s = strategy.stats
+        if s.latency is None:
+            return self.max_hedge_delay
+        delay = s.latency + 4 * s.latency_dev
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, delay))
+
+    # ------------------------------------------------------------------
+    # 请求
+    # ------------------------------------------------------------------
+
+    def _run(self, strategy: Strategy, args: tuple) -> Tuple[Strategy, int, Any]:
+        t0 = time.perf_counter()
+        try:
+            status, data = strategy.fn(*args)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("策略 {} 异常: {}", strategy.name, str(exc)[:100])
+            status, data = 0, None
+        self._record(strategy, status, bool(data), time.perf_counter() - t0)
+        return strategy, status, data
+
+    def _mark_wasted(self, future: Future) -> None:
+        strategy = future.result()[0]
+        with self._lock:
+            strategy.stats.wasted += 1
+
+    def fetch(self, *args) -> Tuple[Optional[str], Any]:
+        """依次（带对冲）尝试各策略，返回 ``(策略名, data)``；全部失败返回 ``(None, None)``。"""
+        t0 = time.perf_counter()
+        queue = self.ranking()
+        if not queue:
+            logger.warning("所有策略都在冷却中")
+            return None, None
+        with self._lock:
+            self.fetches += 1
+
+        in_flight: Dict[Future, Strategy] = {}
+        winner: Tuple[Optional[str], Any] = (None, None)
+        timeout_expired = False
+        try:
+            while queue or in_flight:
+                if queue and (timeout_expired or not in_flight):
+                    strategy = queue.pop(0)
+                    if in_flight:
+                        with self._lock:
+                            self.hedges += 1
+                    in_flight[self._executor.submit(self._run, strategy, args)] = strategy
+                # 只对最新发出的请求计时；已无后备策略时一直等到有结果
+                newest = list(in_flight.values())[-1]
+                timeout = self.hedge_delay(newest) if queue else None
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                timeout_expired = not done
+                for future in done:
+                    in_flight.pop(future)
+                    strategy, status, data = future.result()
+                    if data:
+                        winner = (strategy.name, data)
+                        with self._lock:
+                            strategy.stats.wins += 1
+                        return winner
+                    # 明确失败：下一轮立即发出后备策略
+                    timeout_expired = True
+            return winner
+        finally:
+            for future in in_flight:
+                future.add_done_callback(self._mark_wasted)
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self._latencies.append(elapsed)
+                if winner[0] is not None:
+                    self.resolved += 1
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # 指标
+    # ------------------------------------------------------------------
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self._latencies)
+            strategies = [asdict(st.stats) for st in self.strategies]
+            requests = sum(s["attempts"] for s in strategies)
+            wasted = sum(s["wasted"] for s in strategies)
+            fetches, resolved, hedges = self.fetches, self.resolved, self.hedges
+
+        def pct(q: float) -> float:
+            return lat[min(len(lat) - 1, int(q * len(lat)))] if lat else 0.0
+
+        return {
+            "fetches": fetches,
+            "resolved": resolved,
+            "hedges": hedges,
+            "requests": requests,
+            "wasted": wasted,
+            "p50": pct(0.5),
+            "p95": pct(0.95),
+            "max": lat[-1] if lat else 0.0,
+            "strategies": strategies,
+        }
+
+    def log_metrics(self) -> None:
+        m = self.metrics()
+        logger.info(
+            "详情请求 {} 次，成功 {}，对冲 {} 次，总请求 {}（浪费 {}），耗时 p50 {:.2f}s / p95 {:.2f}s / max {:.2f}s",
+            m["fetches"], m["resolved"], m["hedges"], m["requests"], m["wasted"],
+            m["p50"], m["p95"], m["max"],
+        )
+        for s in m["strategies"]:
+            logger.info(
+                "  策略 {}: 请求 {}，成功率 {:.2f}，延迟 {}，采用 {}，浪费 {}，最近状态 {}",
+                s["name"], s["attempts"], s["success_rate"],
+                f"{s['latency']:.2f}s" if s["latency"] is not None else "-",
+                s["wins"], s["wasted"], s["last_status"],
+            )
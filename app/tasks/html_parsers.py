@@ -0,0 +1,78 @@
+"""可插拔的 HTML 解析后端。
+
+同一个页面解析函数可以有多种实现：
+
+- ``bs4``：BeautifulSoup + CSS 选择器，最早的写法，最慢；
+- ``lxml``：直接在 lxml 树上用 XPath 取值，省去 bs4 的对象包装；
+- ``selectolax``：基于 lexbor 的解析器，最快，需额外安装（``pip install selectolax``），未安装时自动回退到 lxml。
+
+各实现都是 ``html -> Iterator[dict]`` 的生成器，按需产出记录；``ParserRegistry`` 负责按名称选择后端::
+
+    list_parsers = ParserRegistry("51Job 列表页")
+
+    @list_parsers.register("lxml")
+    def _iter_list_lxml(html): ...
+
+    for job in list_parsers.iter(html):            # 使用 settings.html_parser_backend
+        ...
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterator, List
+
+from loguru import logger
+
+from app.config import settings
+
+try:
+    import selectolax  # noqa: F401
+
+    HAS_SELECTOLAX = True
+except ModuleNotFoundError:  # pragma: no cover
+    HAS_SELECTOLAX = False
+
+BACKENDS = ("bs4", "lxml", "selectolax")
+FALLBACK_BACKEND = "lxml"
+
+PageParser = Callable[[str], Iterator[dict]]
+
+
+def xpath_class(name: str) -> str:
+    """XPath 中等价于 CSS ``.name`` 的谓词。"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class ParserRegistry:
+    """某一类页面的解析后端注册表。"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._parsers: Dict[str, PageParser] = {}
+
+    def register(self, backend: str) -> Callable[[PageParser], PageParser]:
+        if backend not in BACKENDS:
+            raise ValueError(f"未知解析后端: {backend}")
+
+        def decorator(fn: PageParser) -> PageParser:
+            self._parsers[backend] = fn
+            return fn
+
+        return decorator
+
+    def backends(self) -> List[str]:
+        """当前环境中可用的后端。"""
+        return [b for b in BACKENDS if b in self._parsers and (b != "selectolax" or HAS_SELECTOLAX)]
+
+    def get(self, backend: str | None = None) -> PageParser:
+        backend = backend or settings.html_parser_backend
+        if backend == "selectolax" and not HAS_SELECTOLAX:
+            logger.warning("未安装 selectolax，{} 改用 {} 解析", self.name, FALLBACK_BACKEND)
+            backend = FALLBACK_BACKEND
+        try:
+            return self._parsers[backend]
+        except KeyError:
+            raise ValueError(f"{self.name} 没有 {backend} 解析实现，可选: {', '.join(self._parsers)}") from None
+
+    def iter(self, html: str, backend: str | None = None) -> Iterator[dict]:
+        return self.get(backend)(html)
@@ -0,0 +1,298 @@
+"""51Job search-pc 接口直连采集（HTTP 优先）。
+
+Selenium 版每页都要完整加载搜索页、轮询 ``window.__INITIAL_STATE__`` 最长 12 秒，
+最后往往还是退回到在浏览器里 fetch ``/api/job/search-pc``。这里直接用 ``requests.Session``
+调用该 JSON 接口：
+
+- 连接池复用 TCP / TLS 连接，单页请求为几十毫秒级；
+- 接口依赖的 Cookie 只在首次运行或失效时用浏览器访问一次搜索页获取，落盘缓存（TTL）；
+- 响应不是合法 JSON / 缺少 ``resultbody``（Cookie 过期、被风控）时刷新一次 Cookie 并重试；
+- ``base_url`` 可指向本地 stub，用录制的 ``resultbody.job.items`` 响应离线调试。
+
+与 Selenium 版共用 ``job51`` 增量水位与 ``job_postings`` 写库逻辑，两种模式可以互换。
+
+用法：
+    python -m app.tasks.job51_api --max-pages 10
+    python -m app.tasks.job51_api --base-url http://127.0.0.1:8766 --no-browser
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.config import settings
+from app.tasks.browser_wait import wait_for_js
+from app.tasks.crawl_state import IncrementalCrawl, job_posting_urls
+from app.tasks.job51_selenium_scraper import (
+    JOB_AREA_CODE,
+    KEYWORD,
+    SEARCH_URL_TMPL,
+    _issue_time,
+    _job_url,
+    build_search_api_url,
+    extract_job_list,
+    save_jobs,
+)
+
+PROJECT_ROOT = pathlib.Path(__file__).parents[2]
+
+HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                   "AppleWebKit/537.36 (KHTML, like Gecko) "
+                   "Chrome/126.0.0.0 Safari/537.36"),
+    "Accept": "application/json, text/plain, */*",
+    "Referer": "https://we.51job.com/pc/search",
+}
+
+CookieHarvester = Callable[[], Dict[str, str]]
+
+SEARCH_API_DONE_JS = (
+    "return performance.getEntriesByType('resource')"
+    ".some(function (e) { return e.name.indexOf('/api/job/search-pc') >= 0; });"
+)
+
+
+# ---------------------------------------------------------------------------
+# Cookie
+# ---------------------------------------------------------------------------
+
+class CookieStore:
+    """带 TTL 的 Cookie 磁盘缓存（线程安全）。"""
+
+    def __init__(self, path: pathlib.Path, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.RLock()
+
+    def load(self) -> Optional[Dict[str, str]]:
+        """未过期时返回 Cookie，否则返回 None。"""
+        with self._lock:
+            if not self.path.exists():
+                return None
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as exc:
+                logger.warning("51Job Cookie 缓存文件损坏，将重新获取: {}", exc)
+                return None
+            if time.time() - data.get("fetched_at", 0) > self.ttl:
+                return None
+            return data.get("cookies") or None
+
+    def save(self, cookies: Dict[str, str]) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            payload = {"cookies": cookies, "fetched_at": time.time()}
+            tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.path.unlink(missing_ok=True)
+
+
+def default_cookie_store() -> CookieStore:
+    path = pathlib.Path(settings.job51_cookie_file)
+    if not path.is_absolute():
+        path = PROJECT_ROOT / path
+    return CookieStore(path, settings.job51_cookie_ttl)
+
+
+def harvest_cookies() -> Dict[str, str]:
+    """用浏览器打开一次搜索页，取回接口所需的 Cookie（仅在缓存缺失 / 失效时调用）。"""
+    from app.tasks.job51_selenium_scraper import init_driver
+
+    logger.info("通过浏览器获取 51Job Cookie…")
+    driver = init_driver()
+    try:
+        driver.get(SEARCH_URL_TMPL.format(area=JOB_AREA_CODE, kw=KEYWORD, page=1))
+        # 页面自己的 search-pc 请求完成，说明前端脚本已写好 acw_tc 等 Cookie
+        wait_for_js(driver, SEARCH_API_DONE_JS, timeout=10)
+        cookies = {c["name"]: c["value"] for c in driver.get_cookies()}
+    finally:
+        driver.quit()
+    logger.success("获取到 {} 个 Cookie", len(cookies))
+    return cookies
+
+
+# ---------------------------------------------------------------------------
+# 接口客户端
+# ---------------------------------------------------------------------------
+
+class Job51ApiClient:
+    """search-pc 接口客户端。
+
+    Args:
+        base_url: 接口域名，默认取 ``settings.job51_api_base_url``。
+        cookie_store: Cookie 缓存，None 表示不落盘。
+        harvester: 获取新 Cookie 的函数（默认启动浏览器），None 表示不带 Cookie 请求。
+        pool_size: 连接池大小。
+        timeout: 单次请求超时（秒）。
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        *,
+        cookie_store: CookieStore | None = None,
+        harvester: CookieHarvester | None = harvest_cookies,
+        pool_size: int = 4,
+        timeout: float | None = None,
+    ):
+        self.base_url = (base_url or settings.job51_api_base_url).rstrip("/")
+        self.cookie_store = cookie_store
+        self.harvester = harvester
+        self.timeout = timeout or settings.job51_api_timeout
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._cookies_loaded = False
+        self.requests = 0
+        self.cookie_refreshes = 0
+        self.latencies: List[float] = []
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "Job51ApiClient":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Cookie
+    # ------------------------------------------------------------------
+
+    def _ensure_cookies(self, refresh: bool = False) -> None:
+        if self._cookies_loaded and not refresh:
+            return
+        self._cookies_loaded = True
+        cookies = None
+        if self.cookie_store is not None:
+            if refresh:
+                self.cookie_store.invalidate()
+            else:
+                cookies = self.cookie_store.load()
+        if cookies is None and self.harvester is not None:
+            cookies = self.harvester()
+            if refresh:
+                self.cookie_refreshes += 1
+            if cookies and self.cookie_store is not None:
+                self.cookie_store.save(cookies)
+        if cookies:
+            self.session.cookies.clear()
+            self.session.cookies.update(cookies)
+
+    # ------------------------------------------------------------------
+    # 请求
+    # ------------------------------------------------------------------
+
+    def _get(self, page: int, keyword: str, area: str) -> Tuple[int, Optional[dict]]:
+        url = build_search_api_url(page, keyword, area, base_url=self.base_url)
+        t0 = time.perf_counter()
+        try:
+            resp = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as exc:
+            logger.warning("[page {}] 请求失败: {}", page, exc)
+            return 0, None
+        finally:
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - t0)
+        try:
+            return resp.status_code, resp.json()
+        except ValueError:
+            return resp.status_code, None
+
+    @staticmethod
+    def _valid(status: int, data: Optional[dict]) -> bool:
+        """合法响应：200 且带 ``resultbody`` / ``data``；否则多半是 Cookie 失效或风控页。"""
+        return status == 200 and isinstance(data, dict) and ("resultbody" in data or "data" in data)
+
+    def fetch_page(self, page: int, keyword: str = KEYWORD, area: str = JOB_AREA_CODE) -> List[dict]:
+        """获取一页岗位（接口原始字段）；末页返回空列表，Cookie 刷新后仍失败也返回空列表。"""
+        self._ensure_cookies()
+        status, data = self._get(page, keyword, area)
+        if not self._valid(status, data) and self.harvester is not None:
+            logger.warning("[page {}] 接口返回异常（状态 {}），刷新 Cookie 后重试", page, status)
+            self._ensure_cookies(refresh=True)
+            status, data = self._get(page, keyword, area)
+        if not self._valid(status, data):
+            logger.error("[page {}] 接口请求失败，状态 {}: {}", page, status, str(data)[:300])
+            return []
+        jobs = extract_job_list(data) or []
+        logger.debug("[page {}] 接口返回 {} 条，{:.0f} ms", page, len(jobs), self.latencies[-1] * 1000)
+        return jobs
+
+    def log_metrics(self) -> None:
+        if not self.latencies:
+            return
+        lat = sorted(self.latencies)
+        logger.info(
+            "接口请求 {} 次，Cookie 刷新 {} 次，耗时 p50 {:.0f} ms / max {:.0f} ms",
+            self.requests, self.cookie_refreshes, lat[len(lat) // 2] * 1000, lat[-1] * 1000,
+        )
+
+
+# ---------------------------------------------------------------------------
+# 任务入口
+# ---------------------------------------------------------------------------
+
+def run(
+    max_pages: int | None = None,
+    full: bool = False,
+    *,
+    base_url: str | None = None,
+    use_browser: bool = True,
+) -> None:
+    """直连接口翻页抓取并写库（增量规则同 ``job51_selenium_scraper.run``）。"""
+    client = Job51ApiClient(
+        base_url,
+        cookie_store=default_cookie_store() if use_browser else None,
+        harvester=harvest_cookies if use_browser else None,
+    )
+    page = 1
+    try:
+        with IncrementalCrawl("job51", KEYWORD, JOB_AREA_CODE, lookup=job_posting_urls, full=full) as crawl:
+            while True:
+                jobs = client.fetch_page(page)
+                if not jobs:
+                    logger.info("第 {} 页无数据，结束翻页", page)
+                    break
+                crawl.observe_page([_job_url(j) for j in jobs], [_issue_time(j) for j in jobs])
+                save_jobs(jobs)
+                if crawl.should_stop:
+                    break
+                page += 1
+                if max_pages and page > max_pages:
+                    logger.info("达到 max_pages={} 限制，停止", max_pages)
+                    break
+                time.sleep(settings.job51_api_interval)
+    finally:
+        client.log_metrics()
+        client.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="51Job search-pc 接口直连爬虫")
+    parser.add_argument("--max-pages", type=int, default=None, help="最大页数，默认不限")
+    parser.add_argument("--full", action="store_true", help="全量重抓，不因遇到已入库的页面而提前停止")
+    parser.add_argument("--base-url", default=None, help="接口域名，可指向本地 stub")
+    parser.add_argument("--no-browser", action="store_true", help="不启动浏览器获取 Cookie")
+    args = parser.parse_args()
+    run(args.max_pages, full=args.full, base_url=args.base_url, use_browser=not args.no_browser)
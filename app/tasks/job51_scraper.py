@@ -7,17 +7,22 @@
 
 from __future__ import annotations
 
-import json
 import time
 import urllib.parse
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional
 
+import lxml.etree
+import lxml.html
 import requests
 from bs4 import BeautifulSoup
 from loguru import logger
+from requests.adapters import HTTPAdapter
 
-from app.config import SessionLocal
-from app.models import JobPosting
+from app.config import settings
+from app.tasks.html_parsers import ParserRegistry, xpath_class
+from app.tasks.job_sink import save_job_postings
+from app.tasks.rate_control import AIMDRateController, RequestMetrics
 
 # ---------------------------------------------------------------------------
 # 常量配置
@@ -34,7 +39,8 @@ HEADERS = {
     "Referer": "https://www.51job.com/",
 }
 MAX_PAGES = 5  # 可自行调整
-REQ_INTERVAL = 1.5  # 秒，简单限速
+# 触发降速的错误：被封禁 / 限流 / 超时
+BACKOFF_ERRORS = ("403", "429", "timeout")
 
 
 # ---------------------------------------------------------------------------
@@ -54,86 +60,197 @@ def build_url(page: int) -> str:
     )
 
 
-def parse_list(html: str) -> List[dict]:
+list_parsers = ParserRegistry("51Job 列表页")
+
+
+def parse_list(html: str, backend: str | None = None) -> List[dict]:
     """解析列表页，返回岗位基本信息列表。"""
+    return list(iter_list(html, backend))
+
+
+def iter_list(html: str, backend: str | None = None) -> Iterator[dict]:
+    """逐条产出列表页岗位；``backend`` 为空时取 ``settings.html_parser_backend``。"""
+    return list_parsers.iter(html, backend)
+
+
+def _job_record(title, company, location, salary, post_date, url) -> dict:
+    return {
+        "title": title,
+        "company": company,
+        "location": location,
+        "salary": salary,
+        "post_date": post_date,
+        "detail_url": url,
+    }
+
+
+@list_parsers.register("bs4")
+def _iter_list_bs4(html: str) -> Iterator[dict]:
     soup = BeautifulSoup(html, "lxml")
-    results: List[dict] = []
     for div in soup.select("div.el"):
         a_tag = div.select_one("a")
         if not a_tag:
             continue
-        url = a_tag.get("href")
-        title = a_tag.get("title")
         company = div.select_one("span.t2 a")
         loc_span = div.select_one("span.t3")
         salary_span = div.select_one("span.t4")
         date_span = div.select_one("span.t5")
+        yield _job_record(
+            a_tag.get("title"),
+            company.text.strip() if company else None,
+            loc_span.text.strip() if loc_span else None,
+            salary_span.text.strip() if salary_span else None,
+            date_span.text.strip() if date_span else None,
+            a_tag.get("href"),
+        )
+
+
+# 预编译 XPath，避免每行重新解析表达式
+_XP_ROWS = lxml.etree.XPath(f"//div[{xpath_class('el')}]")
+_XP_LINK = lxml.etree.XPath("(.//a)[1]")
+_XP_COMPANY = lxml.etree.XPath(f"(.//span[{xpath_class('t2')}]//a)[1]")
+_XP_SPAN = {name: lxml.etree.XPath(f"(.//span[{xpath_class(name)}])[1]") for name in ("t3", "t4", "t5")}
+
+
+@list_parsers.register("lxml")
+def _iter_list_lxml(html: str) -> Iterator[dict]:
+    try:
+        root = lxml.html.document_fromstring(html)
+    except lxml.etree.ParserError:  # 空页面
+        return
+
+    def first_text(node, xpath: lxml.etree.XPath) -> Optional[str]:
+        found = xpath(node)
+        return found[0].text_content().strip() if found else None
+
+    for div in _XP_ROWS(root):
+        links = _XP_LINK(div)
+        if not links:
+            continue
+        a_tag = links[0]
+        yield _job_record(
+            a_tag.get("title"),
+            first_text(div, _XP_COMPANY),
+            first_text(div, _XP_SPAN["t3"]),
+            first_text(div, _XP_SPAN["t4"]),
+            first_text(div, _XP_SPAN["t5"]),
+            a_tag.get("href"),
+        )
+
+
+@list_parsers.register("selectolax")
+def _iter_list_selectolax(html: str) -> Iterator[dict]:
+    from selectolax.lexbor import LexborHTMLParser
 
-        results.append(
-            {
-                "title": title,
-                "company": company.text.strip() if company else None,
-                "location": loc_span.text.strip() if loc_span else None,
-                "salary": salary_span.text.strip() if salary_span else None,
-                "post_date": date_span.text.strip() if date_span else None,
-                "detail_url": url,
-            }
+    def first_text(node, css: str) -> Optional[str]:
+        found = node.css_first(css)
+        return found.text(deep=True).strip() if found is not None else None
+
+    for div in LexborHTMLParser(html).css("div.el"):
+        a_tag = div.css_first("a")
+        if a_tag is None:
+            continue
+        yield _job_record(
+            a_tag.attributes.get("title"),
+            first_text(div, "span.t2 a"),
+            first_text(div, "span.t3"),
+            first_text(div, "span.t4"),
+            first_text(div, "span.t5"),
+            a_tag.attributes.get("href"),
         )
-    return results
 
 
 def save_jobs(jobs: List[dict]) -> None:
-    """批量保存到数据库（去重）。"""
+    """批量保存到数据库（按 URL upsert）。"""
     if not jobs:
         return
-    with SessionLocal() as ses:
-        for item in jobs:
-            if not item["detail_url"]:
-                continue
-            # 简易去重：URL 唯一索引冲突时使用 merge
-            job_obj = JobPosting(
-                title=item["title"],
-                salary=item["salary"],
-                location=item["location"],
-                company_name=item["company"],
-                post_date=item["post_date"],
-                url=item["detail_url"],
-                raw_json=item,
-            )
-            ses.merge(job_obj)
-        ses.commit()
-    logger.info("保存 {} 条职位", len(jobs))
+    stats = save_job_postings(jobs)
+    logger.info("保存 {} 条职位：新增 {} / 更新 {}", len(jobs), stats.inserted, stats.updated)
 
 
 # ---------------------------------------------------------------------------
-# 任务入口
+# 并发抓取
 # ---------------------------------------------------------------------------
 
-def run(pages: int = MAX_PAGES) -> None:
-    """执行爬取任务。"""
-    logger.info("开始爬取 51Job：{}×{} 页", CITY_PARAM, pages)
-    for page in range(1, pages + 1):
-        url = build_url(page)
-        logger.debug("GET {}", url)
+def make_session(pool_size: int) -> requests.Session:
+    """keep-alive 连接池会话，各页共用。"""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.verify = False
+    session.trust_env = False  # 不走系统代理
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_page(
+    session: requests.Session,
+    page: int,
+    controller: AIMDRateController,
+    metrics: RequestMetrics,
+    retries: int = 2,
+) -> Optional[List[dict]]:
+    """按限速获取并解析一页，重试用尽时返回 None。"""
+    url = build_url(page)
+    for attempt in range(1, retries + 2):
+        controller.acquire()
+        t0 = time.perf_counter()
+        error: Optional[str] = None
         try:
-            resp = requests.get(
-                url,
-                headers=HEADERS,
-                timeout=15,
-                verify=False,
-                allow_redirects=True,
-                proxies={"http": "", "https": ""},
-            )
-            resp.encoding = "gbk"  # 51Job 返回页面编码为 GBK
+            resp = session.get(url, timeout=15, allow_redirects=True)
+            if resp.status_code >= 400:
+                error = str(resp.status_code)
+        except requests.Timeout:
+            error = "timeout"
         except requests.RequestException as exc:
-            logger.error("请求失败: {}", exc)
-            continue
+            error = type(exc).__name__
+        metrics.record(time.perf_counter() - t0, error)
+
+        if error is None:
+            controller.on_success()
+            resp.encoding = "gbk"  # 51Job 返回页面编码为 GBK
+            return parse_list(resp.text)
+        if error in BACKOFF_ERRORS and controller.on_backoff():
+            logger.warning("第 {} 页返回 {}，降速至 {:.2f} 次/秒", page, error, controller.rate)
+        logger.warning("第 {} 页请求失败（{}），第 {}/{} 次", page, error, attempt, retries + 1)
+    return None
 
-        jobs = parse_list(resp.text)
-        save_jobs(jobs)
-        time.sleep(REQ_INTERVAL)
-        if not jobs:
-            logger.warning("第 {} 页未解析到岗位数据", page)
+
+def log_metrics(metrics: RequestMetrics, controller: AIMDRateController) -> None:
+    m = metrics.snapshot()
+    logger.info(
+        "请求 {} 次，错误率 {:.1%} {}，耗时 p50 {:.2f}s / p95 {:.2f}s / max {:.2f}s，最终速率 {:.2f} 次/秒（降速 {} 次）",
+        m["requests"], m["error_rate"], m["errors_by_kind"] or "", m["p50"], m["p95"], m["max"],
+        controller.rate, controller.backoffs,
+    )
+
+
+# ---------------------------------------------------------------------------
+# 任务入口
+# ---------------------------------------------------------------------------
+
+def run(pages: int = MAX_PAGES, concurrency: int | None = None) -> None:
+    """执行爬取任务：各页 URL 预先已知，并发获取，按完成顺序写库。"""
+    concurrency = concurrency or settings.job51_concurrency
+    controller = AIMDRateController(settings.job51_rate, max_rate=settings.job51_max_rate)
+    metrics = RequestMetrics()
+    logger.info("开始爬取 51Job：{}×{} 页，并发 {}", CITY_PARAM, pages, concurrency)
+    with make_session(concurrency) as session, ThreadPoolExecutor(concurrency, thread_name_prefix="job51") as pool:
+        futures = {
+            pool.submit(fetch_page, session, page, controller, metrics): page
+            for page in range(1, pages + 1)
+        }
+        for future in as_completed(futures):
+            page = futures[future]
+            jobs = future.result()
+            if jobs is None:
+                logger.error("第 {} 页多次请求失败，跳过", page)
+                continue
+            if not jobs:
+                logger.warning("第 {} 页未解析到岗位数据", page)
+            save_jobs(jobs)
+    log_metrics(metrics, controller)
     logger.success("爬取完成")
 
 
@@ -142,4 +259,10 @@ def run(pages: int = MAX_PAGES) -> None:
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="51Job 列表页爬虫")
+    parser.add_argument("--pages", type=int, default=MAX_PAGES, help="抓取页数")
+    parser.add_argument("--concurrency", type=int, default=None, help="并发数，默认取 settings.job51_concurrency")
+    args = parser.parse_args()
+    run(args.pages, args.concurrency)
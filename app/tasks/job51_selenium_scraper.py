@@ -14,6 +14,8 @@ from __future__ import annotations
 import json
 import os
 import time
+import urllib.parse
+from datetime import datetime
 from typing import List
 
 from loguru import logger
@@ -21,16 +23,15 @@ import sys
 
 import requests
 from selenium import webdriver
-from selenium.common.exceptions import JavascriptException, WebDriverException
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-try:
-    from webdriver_manager.chrome import ChromeDriverManager  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover
-    ChromeDriverManager = None  # type: ignore
+from selenium.common.exceptions import WebDriverException
 
-from app.config import SessionLocal
-from app.models import JobPosting
+from app.config import settings
+from app.tasks.browser_factory import create_browser, create_chrome
+from app.tasks.browser_intercept import ResponseInterceptor
+from app.tasks.browser_wait import run_js, wait_until
+from app.tasks.crawl_state import IncrementalCrawl, job_posting_urls
+from app.tasks.job_sink import save_job_postings
+from app.tasks.rate_control import PolitenessDelay
 
 JOB_AREA_CODE = "070306"  # 苏州工业园区（新版接口代码）
 # 关键词留空即可爬取园区所有岗位
@@ -38,15 +39,24 @@ KEYWORD = ""
 
 # 不再限制最大页数，可通过 run(max_pages=N) 临时限制
 MAX_PAGES = None
-SLEEP_SECONDS = 2
 
 SEARCH_URL_TMPL = (
     "https://we.51job.com/pc/search?keyword={kw}&jobArea={area}&pageNum={page}"
 )
+API_BASE_URL = "https://we.51job.com"
+API_SEARCH_PATH = "/api/job/search-pc"
+API_PAGE_SIZE = 50
+# 搜索页前端自己请求的列表接口，浏览器内拦截其 JSON 响应
+API_RESPONSE_PATTERN = r"/api/job/search-pc"
+
+INITIAL_STATE_JS = (
+    "return (window.__INITIAL_STATE__ && window.__INITIAL_STATE__.searchResult) || "
+    "(window.__NUXT__ && window.__NUXT__.state && window.__NUXT__.state.searchResult) || null;"
+)
 
 
 def init_driver() -> webdriver.Chrome:
-    """连接到已开启远程调试端口的 Chrome；若失败则启动新的无头浏览器。"""
+    """连接到已开启远程调试端口的 Chrome；若失败则按 settings.browser_backend 启动新的无头浏览器。"""
 
     debugger_address = os.getenv("CHROME_DEBUG", "127.0.0.1:9527")
 
@@ -59,14 +69,8 @@ def init_driver() -> webdriver.Chrome:
 
     if debug_ok:
         logger.debug("检测到调试端口 {} 在线，尝试附加…", debugger_address)
-        chrome_options = Options()
-        chrome_options.add_experimental_option("debuggerAddress", debugger_address)
         try:
-            if ChromeDriverManager:
-                service = Service(ChromeDriverManager().install())
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-            else:
-                driver = webdriver.Chrome(options=chrome_options)
+            driver = create_chrome(debugger_address=debugger_address)
             logger.success("已连接到现有 Chrome 会话 {}", debugger_address)
             return driver
         except WebDriverException as exc:  # more specific
@@ -74,33 +78,93 @@ def init_driver() -> webdriver.Chrome:
     else:
         logger.warning("调试端口 {} 不可用，直接启动无头实例", debugger_address)
 
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--disable-gpu")
-    driver = webdriver.Chrome(options=chrome_options)
-    return driver
-
-
-def fetch_page_jobs(driver: webdriver.Chrome, page: int) -> List[dict]:
+    return create_browser(account="job51", headless=True)
+
+
+def build_search_api_url(
+    page: int,
+    keyword: str = KEYWORD,
+    area: str = JOB_AREA_CODE,
+    page_size: int = API_PAGE_SIZE,
+    base_url: str = API_BASE_URL,
+) -> str:
+    """search-pc JSON 接口地址（浏览器内 fetch 与 HTTP 直连共用）。"""
+    kw_enc = urllib.parse.quote(keyword)
+    ts = int(time.time())
+    return (
+        f"{base_url}{API_SEARCH_PATH}?api_key=51job&timestamp={ts}"
+        f"&keyword={kw_enc}&searchType=2&jobArea={area}&jobArea2={area}"
+        f"&sortType=0&pageNum={page}&pageSize={page_size}&source=1&scene=7"
+    )
+
+
+def extract_job_list(resp: dict) -> List[dict] | None:
+    """从 search-pc 响应中取出岗位列表，兼容 ``data.jobList`` 与 ``resultbody.job.items`` 等结构。"""
+    if not isinstance(resp, dict):
+        return None
+    if resp.get("data") and resp["data"].get("jobList"):
+        return resp["data"]["jobList"]
+    rb = resp.get("resultbody")
+    if rb:
+        # 兼容两种嵌套
+        if rb.get("job") and rb["job"].get("items"):
+            return rb["job"]["items"]
+        if rb.get("items"):
+            return rb["items"]
+    return None
+
+
+def _fetch_api_in_browser(driver: webdriver.Chrome, page: int) -> List[dict]:
+    """在浏览器上下文中 fetch search-pc 接口（自动带上页面 Cookie）。"""
+    api_url = build_search_api_url(page)
+    logger.debug("[page {}] API fetch {}", page, api_url)
+
+    api_js = (
+        "const cb = arguments[arguments.length-1];"
+        "fetch('" + api_url + "',{credentials:'include'})"
+        ".then(r=>r.json()).then(d=>cb(d)).catch(e=>cb({error:e.toString()}));"
+    )
+
+    resp = driver.execute_async_script(api_js)
+    job_list = extract_job_list(resp)
+    if job_list:
+        logger.success("[page {}] API 获取到 {} 条", page, len(job_list))
+        return job_list
+    resp_str = str(resp)
+    if len(resp_str) > 800:
+        resp_str = resp_str[:800] + "…(truncated)"
+    logger.error("[page {}] API fetch 失败: {}", page, resp_str)
+    return []
+
+
+def fetch_page_jobs(
+    driver: webdriver.Chrome,
+    page: int,
+    interceptor: ResponseInterceptor | None = None,
+) -> List[dict]:
+    """打开第 ``page`` 页搜索结果并取出岗位列表。
+
+    传入 ``interceptor`` 时优先使用页面自己请求 search-pc 接口的 JSON 响应，
+    否则（或接口响应里没有岗位时）读取 ``__INITIAL_STATE__`` 等注入数据。
+    """
     url = SEARCH_URL_TMPL.format(area=JOB_AREA_CODE, kw=KEYWORD, page=page)
     logger.debug("[page {}] GET {}", page, url)
+    if interceptor is not None:
+        interceptor.clear()
     driver.get(url)
-    logger.debug("[page {}] 页面载入完成，等待 JS 数据注入…", page)
+    logger.debug("[page {}] 页面载入完成，等待接口响应或 JS 数据注入…", page)
 
-    # 等待全局变量或 nuxt 数据注入（最长 12 秒）
-    data: dict | None = None
-    for _ in range(12):
-        try:
-            data = driver.execute_script(
-                "return (window.__INITIAL_STATE__ && window.__INITIAL_STATE__.searchResult) || "
-                "(window.__NUXT__ && window.__NUXT__.state && window.__NUXT__.state.searchResult) || null;"
-            )  # type: ignore[assignment]
-        except JavascriptException:
-            data = None
-        if data:
-            break
-        time.sleep(1)
-        logger.debug("[page {}] 等待数据…", page)
+    def captured_or_state() -> dict | None:
+        if interceptor is not None:
+            for resp in interceptor.take():
+                job_list = extract_job_list(resp.body)
+                if job_list:
+                    logger.debug("[page {}] 拦截到接口响应 {}", page, resp.url)
+                    return {"jobList": job_list}
+        return run_js(driver, INITIAL_STATE_JS)
+
+    # 接口响应或全局变量任一就绪即返回（最长 12 秒）
+    data: dict | None = wait_until(captured_or_state, timeout=12)
 
     if not data:
         # 尝试 ret_nodes（SSR 数据）
@@ -119,88 +183,13 @@ def fetch_page_jobs(driver: webdriver.Chrome, page: int) -> List[dict]:
             logger.debug("窗口键(前30): {}… 共 {} 项", keys[:30], len(keys))
         else:
             logger.debug("窗口键: {}", keys)
-        # 执行 API fetch fallback 同前逻辑
-        import urllib.parse, time as _t
-        kw_enc = urllib.parse.quote(KEYWORD)
-        ts = int(_t.time())
-        api_url = (
-            f"https://we.51job.com/api/job/search-pc?api_key=51job&timestamp={ts}"
-            f"&keyword={kw_enc}&searchType=2&jobArea={JOB_AREA_CODE}&jobArea2={JOB_AREA_CODE}"
-            f"&sortType=0&pageNum={page}&pageSize=50&source=1&scene=7"
-        )
-
-        logger.debug("[page {}] API fetch {}", page, api_url)
-
-        api_js = (
-            "const cb = arguments[arguments.length-1];"
-            "fetch('" + api_url + "',{credentials:'include'})"
-            ".then(r=>r.json()).then(d=>cb(d)).catch(e=>cb({error:e.toString()}));"
-        )
-
-        resp = driver.execute_async_script(api_js)
-        if isinstance(resp, dict):
-            job_list = None
-            if resp.get("data") and resp["data"].get("jobList"):
-                job_list = resp["data"]["jobList"]
-            elif resp.get("resultbody"):
-                rb = resp["resultbody"]
-                # 兼容两种嵌套
-                if rb.get("job") and rb["job"].get("items"):
-                    job_list = rb["job"]["items"]
-                elif rb.get("items"):
-                    job_list = rb["items"]
-
-            if job_list:
-                logger.success("[page {}] API 获取到 {} 条", page, len(job_list))
-                return job_list
-        resp_str = str(resp)
-        if len(resp_str) > 800:
-            resp_str = resp_str[:800] + "…(truncated)"
-        logger.error("[page {}] API fetch 失败: {}", page, resp_str)
-        return []
+        return _fetch_api_in_browser(driver, page)
 
     job_list = data.get("jobList") or data.get("joblist")
     if not job_list:
         logger.warning("第 {} 页 searchResult 内无 jobList 字段，尝试 API fetch", page)
         # 尝试通过页面 fetch 直接请求官方 API
-        import urllib.parse, time as _t
-        kw_enc = urllib.parse.quote(KEYWORD)
-        ts = int(_t.time())
-        api_url = (
-            f"https://we.51job.com/api/job/search-pc?api_key=51job&timestamp={ts}"
-            f"&keyword={kw_enc}&searchType=2&jobArea={JOB_AREA_CODE}&jobArea2={JOB_AREA_CODE}"
-            f"&sortType=0&pageNum={page}&pageSize=50&source=1&scene=7"
-        )
-
-        logger.debug("[page {}] API fetch {}", page, api_url)
-
-        api_js = (
-            "const cb = arguments[arguments.length-1];"
-            "fetch('" + api_url + "',{credentials:'include'})"
-            ".then(r=>r.json()).then(d=>cb(d)).catch(e=>cb({error:e.toString()}));"
-        )
-
-        resp = driver.execute_async_script(api_js)
-        if isinstance(resp, dict):
-            job_list = None
-            if resp.get("data") and resp["data"].get("jobList"):
-                job_list = resp["data"]["jobList"]
-            elif resp.get("resultbody"):
-                rb = resp["resultbody"]
-                # 兼容两种嵌套
-                if rb.get("job") and rb["job"].get("items"):
-                    job_list = rb["job"]["items"]
-                elif rb.get("items"):
-                    job_list = rb["items"]
-
-            if job_list:
-                logger.success("[page {}] API 获取到 {} 条", page, len(job_list))
-            else:
-                resp_str = str(resp)
-                if len(resp_str) > 800:
-                    resp_str = resp_str[:800] + "…(truncated)"
-                logger.error("[page {}] API fetch 失败: {}", page, resp_str)
-                return []
+        return _fetch_api_in_browser(driver, page)
 
     jobs: List[dict] = job_list or []
     logger.success("[page {}] 解析到 {} 条记录", page, len(jobs))
@@ -210,47 +199,63 @@ def fetch_page_jobs(driver: webdriver.Chrome, page: int) -> List[dict]:
 def save_jobs(jobs: List[dict]) -> None:
     if not jobs:
         return
-    with SessionLocal() as ses:
-        for j in jobs:
-            url = j.get("detail_url") or j.get("jobHref") or j.get("jobUrl")
-            if not url:
-                continue
-
-            job_obj = JobPosting(
-                title=j.get("title") or j.get("jobName"),
-                salary=j.get("salary") or j.get("provideSalaryString"),
-                location=j.get("location") or j.get("jobAreaString"),
-                company_name=j.get("company") or j.get("companyName"),
-                post_date=j.get("post_date") or j.get("issueDateString"),
-                url=url,
-                raw_json=j,
-            )
-            ses.merge(job_obj)
-        ses.commit()
-    logger.success("写入 {} 条职位", len(jobs))
-
-
-def run(max_pages: int | None = MAX_PAGES) -> None:
+    stats = save_job_postings(jobs)
+    logger.success("写入 {} 条职位：新增 {} / 更新 {}", len(jobs), stats.inserted, stats.updated)
+
+
+def _job_url(job: dict) -> str | None:
+    return job.get("detail_url") or job.get("jobHref") or job.get("jobUrl")
+
+
+def _issue_time(job: dict) -> datetime | None:
+    value = job.get("issueDateString") or job.get("post_date")
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def run(max_pages: int | None = MAX_PAGES, full: bool = False) -> None:
+    """翻页抓取并写库。
+
+    默认增量模式：某一页的岗位全部已入库（或早于上次水位）时停止；``full=True`` 全量重抓。
+    """
     logger.debug("=== 爬虫启动，最大页数 {} ===", max_pages if max_pages else "无限")
     driver = init_driver()
+    interceptor = ResponseInterceptor(driver, [API_RESPONSE_PATTERN])
+    politeness = PolitenessDelay(settings.politeness_interval, settings.politeness_jitter)
     page = 1
     try:
-        while True:
-            logger.debug("======== 处理第 {} 页 ========", page)
-            jobs = fetch_page_jobs(driver, page)
-            if not jobs:
-                logger.warning("第 {} 页无数据，结束翻页", page)
-                break
-            save_jobs(jobs)
-            page += 1
-            if max_pages and page > max_pages:
-                logger.info("达到 max_pages={} 限制，停止", max_pages)
-                break
-            # 可适当休眠，避免过快请求
-            time.sleep(SLEEP_SECONDS)
+        with IncrementalCrawl("job51", KEYWORD, JOB_AREA_CODE, lookup=job_posting_urls, full=full) as crawl:
+            while True:
+                logger.debug("======== 处理第 {} 页 ========", page)
+                jobs = fetch_page_jobs(driver, page, interceptor)
+                if not jobs:
+                    logger.warning("第 {} 页无数据，结束翻页", page)
+                    break
+                crawl.observe_page([_job_url(j) for j in jobs], [_issue_time(j) for j in jobs])
+                save_jobs(jobs)
+                if crawl.should_stop:
+                    break
+                page += 1
+                if max_pages and page > max_pages:
+                    logger.info("达到 max_pages={} 限制，停止", max_pages)
+                    break
+                # 礼貌间隔：只补足距上次翻页的剩余时间
+                politeness.wait()
     finally:
         driver.quit()
 
 
 if __name__ == "__main__":
-    run()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="51Job Selenium 爬虫")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES, help="最大页数，默认不限")
+    parser.add_argument("--full", action="store_true", help="全量重抓，不因遇到已入库的页面而提前停止")
+    args = parser.parse_args()
+    run(args.max_pages, full=args.full)
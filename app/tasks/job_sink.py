@@ -0,0 +1,201 @@
+"""招聘岗位统一写库入口。
+
+51Job（requests / Selenium 两版）和智联（DrissionPage / Selenium 两版）爬虫原先各自逐行
+``merge`` 或「先查后插 + 每行 commit」。这里统一为：
+
+- ``job_posting_row`` / ``zhilian_job_row`` 把各爬虫产出的岗位字典规整成表字段；
+- ``JobSink`` 缓冲规整后的行，攒满 ``batch_size`` 即通过 ``BulkUpserter`` 以
+  ``ON CONFLICT (url)`` / ``ON CONFLICT (job_id)`` 批量写入，单行出错不影响同批其他行；
+- 每次 flush 后通过 ``on_flush`` 把写入的岗位同步到 ``documents``（见 ``document_sink``）。
+
+用法::
+
+    with job_posting_sink() as sink:
+        sink.extend(jobs)
+    logger.info("新增 {} 条", sink.stats.inserted)
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from app.config import SessionLocal
+from app.models import JobPosting, ZhilianJob
+from app.tasks.bulk_writer import BulkUpserter, UpsertStats
+from app.tasks.document_sink import document_hook
+
+# 重复抓到同一 URL 时刷新的列（薪资、发布日期等会变化）
+JOB_POSTING_REFRESH_COLUMNS = ("title", "salary", "location", "company_name", "post_date", "raw_json")
+
+DEFAULT_BATCH_SIZE = 200
+
+
+# ---------------------------------------------------------------------------
+# 字段规整
+# ---------------------------------------------------------------------------
+
+def _json_safe(item: dict) -> dict:
+    """raw_json 中可能带 datetime 等对象，转成 JSONB 可接受的结构。"""
+    return json.loads(json.dumps(item, ensure_ascii=False, default=str))
+
+
+def _first(item: dict, *keys: str) -> Any:
+    for key in keys:
+        value = item.get(key)
+        if value:
+            return value
+    return None
+
+
+def job_posting_row(item: dict) -> Optional[Dict[str, Any]]:
+    """51Job 岗位 → ``job_postings`` 行。
+
+    兼容列表页解析结果（``title`` / ``detail_url`` …）与 search-pc 接口原始字段
+    （``jobName`` / ``jobHref`` …），缺少 URL 或标题时返回 None。
+    """
+    url = _first(item, "detail_url", "jobHref", "jobUrl")
+    title = _first(item, "title", "jobName")
+    if not url or not title:
+        return None
+    return {
+        "title": title,
+        "salary": _first(item, "salary", "provideSalaryString"),
+        "location": _first(item, "location", "jobAreaString"),
+        "company_name": _first(item, "company", "companyName"),
+        "post_date": _first(item, "post_date", "issueDateString"),
+        "url": url,
+        "raw_json": _json_safe(item),
+    }
+
+
+def zhilian_job_row(job_info: dict) -> Optional[Dict[str, Any]]:
+    """智联岗位字典 → ``zhilian_jobs`` 行，缺少 job_id 时返回 None。"""
+    job_id = job_info.get("job_id")
+    if not job_id:
+        return None
+    return {
+        "job_id": job_id,
+        "job_title": job_info.get("job_title", ""),
+        "company_name": job_info.get("company_name", ""),
+        "company_size": job_info.get("company_size", ""),
+        "company_type": job_info.get("company_type", ""),
+        "salary": job_info.get("salary", ""),
+        "work_city": job_info.get("work_city", ""),
+        "work_experience": job_info.get("work_experience", ""),
+        "education": job_info.get("education", ""),
+        "job_type": job_info.get("job_type", "全职"),
+        "job_description": job_info.get("job_description", ""),
+        "job_requirements": job_info.get("job_requirements", ""),
+        "welfare": job_info.get("welfare", ""),
+        "publish_time": job_info.get("publish_time"),
+        "job_url": job_info.get("job_url", ""),
+        "raw_json": _json_safe(job_info),
+    }
+
+
+# ---------------------------------------------------------------------------
+# 缓冲写入
+# ---------------------------------------------------------------------------
+
+class JobSink:
+    """带缓冲的岗位写入器。
+
+    Args:
+        writer: 目标表的 ``BulkUpserter``。
+        normalize: 岗位字典 → 表行的转换函数，返回 None 表示丢弃。
+        batch_size: 缓冲满多少行触发一次写库。
+        session_factory: 会话工厂，每次 flush 使用独立会话。
+        on_flush: ``(db, rows)`` 回调，每次写库后在同一会话中调用（如同步到 ``documents``）。
+    """
+
+    def __init__(
+        self,
+        writer: BulkUpserter,
+        normalize: Callable[[dict], Optional[Dict[str, Any]]],
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        session_factory: Callable[[], Any] = SessionLocal,
+        on_flush: Callable[[Any, List[Dict[str, Any]]], Any] | None = None,
+    ):
+        self.writer = writer
+        self.normalize = normalize
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self.on_flush = on_flush
+        self.stats = UpsertStats()
+        self.dropped = 0  # 规整失败（缺主键字段）的条数
+        self._buffer: List[Dict[str, Any]] = []
+
+    def add(self, item: dict) -> bool:
+        """加入一条岗位，返回是否通过规整进入缓冲。"""
+        row = self.normalize(item)
+        if row is None:
+            self.dropped += 1
+            return False
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        return True
+
+    def extend(self, items: Iterable[dict]) -> int:
+        """批量加入，返回进入缓冲的条数。"""
+        return sum(1 for item in items if self.add(item))
+
+    def flush(self) -> UpsertStats:
+        """把缓冲写入数据库，返回本次统计。"""
+        if not self._buffer:
+            return UpsertStats()
+        rows, self._buffer = self._buffer, []
+        with self.session_factory() as db:
+            stats = self.writer.upsert(db, rows)
+            if self.on_flush is not None:
+                self.on_flush(db, rows)
+        self.stats += stats
+        logger.debug(
+            "{} 写入 {} 行：新增 {} / 更新 {} / 跳过 {} / 失败 {}",
+            self.writer.table.name, len(rows), stats.inserted, stats.updated, stats.skipped, stats.failed,
+        )
+        return stats
+
+    def close(self) -> UpsertStats:
+        self.flush()
+        return self.stats
+
+    def __enter__(self) -> "JobSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def job_posting_sink(**kwargs) -> JobSink:
+    """``job_postings`` 写入器：按 URL 去重，重复时刷新薪资等字段。"""
+    writer = BulkUpserter(
+        JobPosting,
+        conflict_cols=["url"],
+        update_cols=JOB_POSTING_REFRESH_COLUMNS,
+        batch_size=kwargs.get("batch_size", DEFAULT_BATCH_SIZE),
+    )
+    kwargs.setdefault("on_flush", document_hook("job51"))
+    return JobSink(writer, job_posting_row, **kwargs)
+
+
+def zhilian_job_sink(**kwargs) -> JobSink:
+    """``zhilian_jobs`` 写入器：按 job_id 去重，已存在的职位保持不变（与原先「已存在则跳过」一致）。"""
+    writer = BulkUpserter(
+        ZhilianJob,
+        conflict_cols=["job_id"],
+        batch_size=kwargs.get("batch_size", DEFAULT_BATCH_SIZE),
+    )
+    kwargs.setdefault("on_flush", document_hook("zhilian"))
+    return JobSink(writer, zhilian_job_row, **kwargs)
+
+
+def save_job_postings(jobs: Iterable[dict]) -> UpsertStats:
+    """一次性写入一批 51Job 岗位。"""
+    with job_posting_sink() as sink:
+        sink.extend(jobs)
+    return sink.stats
@@ -0,0 +1,94 @@
+// 常驻签名进程：由 app/tasks/xhs_signer.py 启动，通过 stdin/stdout 按行交换 JSON。
+//
+// 启动：node sign_worker.js <签名脚本路径> <函数名>
+// payload 由 Python 端按签名函数的要求预先处理（对象或 JSON 字符串），这里原样传入。
+//
+// 请求（一行一个）：
+//   {"id": 1, "op": "ping"}
+//   {"id": 2, "op": "sign", "items": [[url, payload, cookie], ...]}
+// 响应（一行一个）：
+//   {"id": 1, "ok": true}
+//   {"id": 2, "ok": true, "results": [{"x-s": "...", "x-t": "..."} | {"error": "..."}]}
+//
+// 签名脚本只在启动时编译一次，之后每次签名都是进程内函数调用，不再 spawn 新进程。
+
+'use strict';
+
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+const { createRequire } = require('module');
+
+const [scriptPath, fnName] = process.argv.slice(2);
+
+// 签名脚本里的 console.log 不能混进协议输出
+console.log = console.info = console.debug = console.error;
+
+function send(obj) {
+  process.stdout.write(JSON.stringify(obj) + '\n');
+}
+
+// 与 PyExecJS 的语义保持一致：脚本源码整体包在一个函数体里执行，顶层 function 可直接按名字取到；
+// require 以脚本所在目录为基准，便于签名脚本加载同目录的 vendor 文件。
+function loadSignFunction() {
+  const source = fs.readFileSync(scriptPath, 'utf-8');
+  const localRequire = createRequire(path.resolve(scriptPath));
+  const mod = { exports: {} };
+  const factory = new Function(
+    'require', 'module', 'exports', '__filename', '__dirname',
+    source + `\n;return typeof ${fnName} === 'function' ? ${fnName} : null;`
+  );
+  const fn = factory(localRequire, mod, mod.exports, path.resolve(scriptPath), path.dirname(path.resolve(scriptPath)))
+    || mod.exports[fnName];
+  if (typeof fn !== 'function') {
+    throw new Error(`签名脚本中未找到函数 ${fnName}`);
+  }
+  return fn;
+}
+
+function normalize(result) {
+  // GetXsXt 返回 JSON 字符串，get_sign 返回对象；统一为 {"x-s", "x-t"} 字符串字典
+  const obj = typeof result === 'string' ? JSON.parse(result) : result;
+  const out = {};
+  for (const [k, v] of Object.entries(obj || {})) {
+    out[k] = String(v);
+  }
+  return out;
+}
+
+let signFn;
+try {
+  signFn = loadSignFunction();
+} catch (err) {
+  send({ id: 0, ok: false, error: String(err && err.message || err) });
+  process.exit(1);
+}
+send({ id: 0, ok: true, ready: true });
+
+const rl = readline.createInterface({ input: process.stdin, terminal: false });
+rl.on('line', (line) => {
+  let req;
+  try {
+    req = JSON.parse(line);
+  } catch (err) {
+    send({ id: null, ok: false, error: 'bad request: ' + err.message });
+    return;
+  }
+  if (req.op === 'ping') {
+    send({ id: req.id, ok: true });
+    return;
+  }
+  if (req.op !== 'sign') {
+    send({ id: req.id, ok: false, error: 'unknown op: ' + req.op });
+    return;
+  }
+  const results = (req.items || []).map(([url, payload, cookie]) => {
+    try {
+      return normalize(signFn(url, payload, cookie));
+    } catch (err) {
+      return { error: String(err && err.message || err) };
+    }
+  });
+  send({ id: req.id, ok: true, results });
+});
+rl.on('close', () => process.exit(0));
@@ -0,0 +1,411 @@
+"""Playwright 异步浏览器后端。
+
+Selenium / DrissionPage 下每个任务、每个详情 worker、每个浏览器池槽位都各自启动一个 Chrome 进程。
+这里由一个 Chromium 进程承载多个相互隔离的 ``BrowserContext``（Cookie / 存储互不可见，通常一个 Cookie 账号一个），
+单机可以同时跑几十个页面会话，内存远小于每个会话一个 Chrome：
+
+- ``AsyncBrowserHost``：异步 API，启动一次浏览器，``new_context()`` 按档位创建上下文
+  （``fast`` 档位用 ``route`` 屏蔽图片 / 字体 / 音视频 / 统计脚本，导航在 DOMContentLoaded 后返回）；
+- ``PlaywrightDriver``：同步适配器，实现采集代码用到的 WebDriver 子集（``get`` / ``execute_script`` /
+  ``find_element`` / Cookie / ``execute_cdp_cmd`` 等），现有 Selenium 流程以及 ``browser_wait``、
+  ``browser_intercept``、``WebDriverWait``、``BrowserPool`` 无需改动即可使用；
+- ``PlaywrightRuntime``：在后台线程的事件循环里运行 ``AsyncBrowserHost``，多个线程（如详情流水线 worker）
+  各持一个 driver 时在同一浏览器内并发执行。
+
+设置 ``settings.browser_backend = "playwright"`` 后由 ``browser_factory.create_browser`` 统一创建；
+首次使用前需执行 ``playwright install chromium``。Playwright 的超时 / 错误转换为 Selenium 的
+``TimeoutException`` / ``WebDriverException``，调用方原有的异常处理保持有效。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import fnmatch
+import re
+import threading
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, TypeVar
+
+from loguru import logger
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+
+from app.config import settings
+from app.tasks.browser_factory import BLOCKED_TRACKER_PATTERNS, DEFAULT_USER_AGENT
+
+try:
+    from playwright.async_api import Error as PlaywrightError
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    from playwright.async_api import async_playwright
+except ModuleNotFoundError:  # pragma: no cover
+    async_playwright = None  # type: ignore
+
+    class PlaywrightError(Exception):  # type: ignore[no-redef]
+        pass
+
+    class PlaywrightTimeoutError(PlaywrightError):  # type: ignore[no-redef]
+        pass
+
+T = TypeVar("T")
+
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+_TRACKER_RE = re.compile("|".join(fnmatch.translate(p) for p in BLOCKED_TRACKER_PATTERNS))
+
+LAUNCH_ARGS = ("--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--mute-audio")
+
+
+def _viewport() -> Dict[str, int]:
+    width, height = (int(v) for v in settings.browser_window_size.split(","))
+    return {"width": width, "height": height}
+
+
+async def _block_route(route: Any) -> None:
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or _TRACKER_RE.match(request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+# ---------------------------------------------------------------------------
+# 异步 API
+# ---------------------------------------------------------------------------
+
+class AsyncBrowserHost:
+    """一个 Chromium 进程 + 多个隔离上下文。
+
+    用法::
+
+        async with AsyncBrowserHost() as host:
+            context = await host.new_context("account-a", cookies=[...])
+            page = await context.new_page()
+    """
+
+    def __init__(self, profile: str | None = None, headless: bool | None = None):
+        self.profile = profile or settings.browser_profile
+        self.headless = settings.playwright_headless if headless is None else headless
+        self.open_contexts = 0
+        self._playwright: Any = None
+        self.browser: Any = None
+
+    async def start(self) -> "AsyncBrowserHost":
+        if async_playwright is None:
+            raise RuntimeError("未安装 playwright：pip install playwright && playwright install chromium")
+        self._playwright = await async_playwright().start()
+        self.browser = await self._playwright.chromium.launch(headless=self.headless, args=list(LAUNCH_ARGS))
+        logger.info("Playwright Chromium 已启动（{} 档位，headless={}）", self.profile, self.headless)
+        return self
+
+    async def close(self) -> None:
+        if self.browser is not None:
+            await self.browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self.browser = self._playwright = None
+
+    async def __aenter__(self) -> "AsyncBrowserHost":
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    @property
+    def wait_until(self) -> str:
+        """导航完成的判定：fast 档位对应 Selenium 的 eager 加载策略。"""
+        return "domcontentloaded" if self.profile == "fast" else "load"
+
+    async def new_context(
+        self,
+        account: str | None = None,
+        *,
+        cookies: Iterable[Dict[str, Any]] = (),
+        user_agent: str | None = DEFAULT_USER_AGENT,
+        **context_kwargs: Any,
+    ) -> Any:
+        """创建隔离上下文；``cookies`` 为 Playwright 格式（需带 ``url`` 或 ``domain`` + ``path``）。"""
+        context = await self.browser.new_context(user_agent=user_agent, viewport=_viewport(), **context_kwargs)
+        context.set_default_timeout(settings.playwright_timeout * 1000)
+        if self.profile == "fast":
+            await context.route("**/*", _block_route)
+        cookies = list(cookies)
+        if cookies:
+            await context.add_cookies(cookies)
+        self.open_contexts += 1
+
+        def on_close(_: Any) -> None:
+            self.open_contexts -= 1
+
+        context.on("close", on_close)
+        logger.debug("新建浏览器上下文 account={}，当前 {} 个", account or "-", self.open_contexts)
+        return context
+
+
+# ---------------------------------------------------------------------------
+# 同步适配
+# ---------------------------------------------------------------------------
+
+class PlaywrightRuntime:
+    """在后台线程的事件循环中运行 ``AsyncBrowserHost``，供同步采集代码使用。"""
+
+    def __init__(self, profile: str | None = None, headless: bool | None = None):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="playwright", daemon=True)
+        self._thread.start()
+        self.host = AsyncBrowserHost(profile, headless)
+        try:
+            self.call(self.host.start())
+        except Exception:
+            self._stop_loop()
+            raise
+
+    def call(self, coro: Awaitable[T], timeout: float | None = None) -> T:
+        """在事件循环线程中执行协程并等待结果；Playwright 异常转换为 Selenium 异常。"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except PlaywrightTimeoutError as exc:
+            raise TimeoutException(str(exc)) from exc
+        except PlaywrightError as exc:
+            raise WebDriverException(str(exc)) from exc
+
+    def new_driver(self, account: str | None = None, **context_kwargs: Any) -> "PlaywrightDriver":
+        """新建一个上下文 + 页面，包装为 WebDriver 兼容对象。"""
+        context = self.call(self.host.new_context(account, **context_kwargs))
+        page = self.call(context.new_page())
+        return PlaywrightDriver(self, context, page, account)
+
+    def _stop_loop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+    def close(self) -> None:
+        if not self._thread.is_alive():
+            return
+        try:
+            self.call(self.host.close(), timeout=30)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("关闭 Playwright 浏览器失败: {}", exc)
+        finally:
+            self._stop_loop()
+
+
+_runtime: Optional[PlaywrightRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> PlaywrightRuntime:
+    """进程内共享的运行时：首次调用时启动浏览器，进程退出时关闭。"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = PlaywrightRuntime()
+            atexit.register(_runtime.close)
+        return _runtime
+
+
+_SELECTORS = {
+    By.CSS_SELECTOR: "{}",
+    By.CLASS_NAME: ".{}",
+    By.ID: "#{}",
+    By.TAG_NAME: "{}",
+    By.NAME: '[name="{}"]',
+    By.XPATH: "xpath={}",
+    By.LINK_TEXT: 'a:text-is("{}")',
+    By.PARTIAL_LINK_TEXT: 'a:has-text("{}")',
+}
+
+_KEYS = {
+    Keys.RETURN: "Enter",
+    Keys.ENTER: "Enter",
+    Keys.TAB: "Tab",
+    Keys.ESCAPE: "Escape",
+    Keys.BACKSPACE: "Backspace",
+    Keys.END: "End",
+    Keys.HOME: "Home",
+    Keys.PAGE_DOWN: "PageDown",
+    Keys.PAGE_UP: "PageUp",
+}
+
+# WebDriver 的 get_attribute 优先返回属性值（如 href 为绝对地址），否则返回 HTML 特性
+_ATTRIBUTE_JS = """(el, name) => {
+    const value = el[name];
+    if (value === undefined || value === null || typeof value === 'object' || typeof value === 'function') {
+        return el.getAttribute(name);
+    }
+    return String(value);
+}"""
+
+
+def _selector(by: str, value: str) -> str:
+    try:
+        return _SELECTORS[by].format(value)
+    except KeyError:
+        raise WebDriverException(f"Playwright 后端不支持的定位方式: {by}") from None
+
+
+def _function_js(script: str, is_async: bool = False) -> str:
+    """把 WebDriver 风格的脚本（函数体，通过 ``arguments`` 取参）包装为 ``page.evaluate`` 的函数。"""
+    if is_async:
+        # execute_async_script：最后一个参数是回调
+        return ("(args) => new Promise((resolve) => (function () {\n" + script
+                + "\n}).apply(null, args.concat([resolve])))")
+    return "(args) => (function () {\n" + script + "\n}).apply(null, args)"
+
+
+class PlaywrightElement:
+    """WebElement 子集。"""
+
+    def __init__(self, driver: "PlaywrightDriver", handle: Any):
+        self._driver = driver
+        self._handle = handle
+
+    @property
+    def text(self) -> str:
+        return self._driver._call(self._handle.inner_text())
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        return self._driver._call(self._handle.evaluate(_ATTRIBUTE_JS, name))
+
+    def click(self) -> None:
+        self._driver._call(self._handle.click())
+
+    def clear(self) -> None:
+        self._driver._call(self._handle.fill(""))
+
+    def send_keys(self, *values: str) -> None:
+        text = ""
+        for char in "".join(str(v) for v in values):
+            key = _KEYS.get(char)
+            if key is None:
+                text += char
+                continue
+            if text:
+                self._driver._call(self._handle.type(text))
+                text = ""
+            self._driver._call(self._handle.press(key))
+        if text:
+            self._driver._call(self._handle.type(text))
+
+    def is_enabled(self) -> bool:
+        return self._driver._call(self._handle.is_enabled())
+
+    def is_displayed(self) -> bool:
+        return self._driver._call(self._handle.is_visible())
+
+    def find_element(self, by: str = By.ID, value: str | None = None) -> "PlaywrightElement":
+        handle = self._driver._call(self._handle.query_selector(_selector(by, value)))
+        if handle is None:
+            raise NoSuchElementException(f"{by}={value}")
+        return PlaywrightElement(self._driver, handle)
+
+    def find_elements(self, by: str = By.ID, value: str | None = None) -> List["PlaywrightElement"]:
+        handles = self._driver._call(self._handle.query_selector_all(_selector(by, value)))
+        return [PlaywrightElement(self._driver, h) for h in handles]
+
+
+class PlaywrightDriver:
+    """WebDriver 子集的同步适配器，对应某个上下文中的一个页面；``quit()`` 只关闭该上下文。"""
+
+    def __init__(self, runtime: PlaywrightRuntime, context: Any, page: Any, account: str | None = None):
+        self.runtime = runtime
+        self.context = context
+        self.page = page
+        self.account = account
+        self._cdp: Any = None
+        self._closed = False
+
+    def _call(self, coro: Awaitable[T]) -> T:
+        if self._closed:
+            getattr(coro, "close", lambda: None)()  # 避免 "coroutine was never awaited" 警告
+            raise WebDriverException("invalid session id: 上下文已关闭")
+        return self.runtime.call(coro)
+
+    # 导航 ----------------------------------------------------------------
+
+    def get(self, url: str) -> None:
+        self._call(self.page.goto(url, wait_until=self.runtime.host.wait_until))
+
+    def refresh(self) -> None:
+        self._call(self.page.reload(wait_until=self.runtime.host.wait_until))
+
+    def back(self) -> None:
+        self._call(self.page.go_back(wait_until=self.runtime.host.wait_until))
+
+    def set_page_load_timeout(self, seconds: float) -> None:
+        self.page.set_default_navigation_timeout(seconds * 1000)
+
+    @property
+    def current_url(self) -> str:
+        return self.page.url
+
+    @property
+    def title(self) -> str:
+        return self._call(self.page.title())
+
+    @property
+    def page_source(self) -> str:
+        return self._call(self.page.content())
+
+    # 脚本 ----------------------------------------------------------------
+
+    def execute_script(self, script: str, *args: Any) -> Any:
+        return self._call(self.page.evaluate(_function_js(script), list(args)))
+
+    def execute_async_script(self, script: str, *args: Any) -> Any:
+        return self._call(self.page.evaluate(_function_js(script, is_async=True), list(args)))
+
+    def execute_cdp_cmd(self, cmd: str, cmd_args: Dict[str, Any] | None = None) -> Any:
+        if self._cdp is None:
+            self._cdp = self._call(self.context.new_cdp_session(self.page))
+        return self._call(self._cdp.send(cmd, cmd_args or {}))
+
+    def get_log(self, log_type: str) -> List[dict]:
+        raise WebDriverException(f"Playwright 后端不提供 {log_type} 日志，请改用 browser_intercept")
+
+    # 元素 ----------------------------------------------------------------
+
+    def find_element(self, by: str = By.ID, value: str | None = None) -> PlaywrightElement:
+        handle = self._call(self.page.query_selector(_selector(by, value)))
+        if handle is None:
+            raise NoSuchElementException(f"{by}={value}")
+        return PlaywrightElement(self, handle)
+
+    def find_elements(self, by: str = By.ID, value: str | None = None) -> List[PlaywrightElement]:
+        handles = self._call(self.page.query_selector_all(_selector(by, value)))
+        return [PlaywrightElement(self, h) for h in handles]
+
+    # Cookie --------------------------------------------------------------
+
+    def get_cookies(self) -> List[Dict[str, Any]]:
+        return self._call(self.context.cookies())
+
+    def get_cookie(self, name: str) -> Optional[Dict[str, Any]]:
+        return next((c for c in self.get_cookies() if c["name"] == name), None)
+
+    def add_cookie(self, cookie: Dict[str, Any]) -> None:
+        """与 WebDriver 一致：未指定 domain 时作用于当前页面的域名。"""
+        cookie = dict(cookie)
+        if "expiry" in cookie:
+            cookie["expires"] = cookie.pop("expiry")
+        if cookie.get("domain"):
+            cookie.setdefault("path", "/")
+        else:
+            cookie.pop("domain", None)
+            cookie.pop("path", None)
+            cookie["url"] = self.page.url
+        self._call(self.context.add_cookies([cookie]))
+
+    def delete_all_cookies(self) -> None:
+        self._call(self.context.clear_cookies())
+
+    # 生命周期 ------------------------------------------------------------
+
+    def quit(self) -> None:
+        if self._closed:
+            return
+        try:
+            self.runtime.call(self.context.close())
+        except WebDriverException as exc:
+            logger.debug("关闭浏览器上下文失败: {}", exc)
+        self._closed = True
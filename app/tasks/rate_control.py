@@ -0,0 +1,202 @@
+"""限速工具。
+
+``TokenBucket``：令牌桶，按固定速率补充令牌，支持同步 / asyncio 两种等待方式。
+调用方先 ``reserve`` 预约令牌，令牌不足时返回需要等待的秒数，因此并发请求会按到达顺序排队，
+而不会在令牌恢复的瞬间一起涌出。
+
+``AIMDRateController``：在令牌桶之上按 AIMD（加性增、乘性减）自适应调整速率，
+响应健康时逐步提速，遇到 403 / 429 / 超时立即减半。
+
+``RequestMetrics``：请求延迟分位数与错误率计数。
+
+``PolitenessDelay``：浏览器导航之间的显式礼貌间隔，只补足距上次导航的剩余时间。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, Hashable, List
+
+
+class TokenBucket:
+    """令牌桶限速器（线程安全）。
+
+    Args:
+        rate: 每秒补充的令牌数，即长期平均请求速率。
+        capacity: 桶容量，即允许的瞬时突发数；默认 ``max(1, rate)``。
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate 必须大于 0")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """预约令牌，返回获得令牌前需要等待的秒数（0 表示立即可用）。"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def set_rate(self, rate: float) -> None:
+        """调整速率；已积累的令牌按旧速率结算。"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def next_available(self) -> float:
+        """距离下一个令牌可用还需等待的秒数（不消耗令牌）。"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AIMDRateController:
+    """AIMD 自适应限速器（线程安全）。
+
+    Args:
+        rate: 初始速率（请求 / 秒）。
+        min_rate / max_rate: 速率上下限。
+        increase: 每次成功响应增加的速率。
+        decrease: 退避时速率乘以的系数。
+        cooldown: 两次退避之间的最小间隔（秒）；同一波并发请求先后失败只减速一次。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        *,
+        min_rate: float = 0.2,
+        max_rate: float = 10.0,
+        increase: float = 0.2,
+        decrease: float = 0.5,
+        cooldown: float = 2.0,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.bucket = TokenBucket(min(max(rate, min_rate), max_rate), capacity=1)
+        self._lock = threading.Lock()
+        self._last_backoff = float("-inf")
+        self.increases = 0
+        self.backoffs = 0
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def acquire(self) -> None:
+        self.bucket.acquire()
+
+    async def acquire_async(self) -> None:
+        await self.bucket.acquire_async()
+
+    def on_success(self) -> None:
+        with self._lock:
+            rate = min(self.max_rate, self.bucket.rate + self.increase)
+            if rate > self.bucket.rate:
+                self.increases += 1
+                self.bucket.set_rate(rate)
+
+    def on_backoff(self) -> bool:
+        """被限流 / 超时时调用；返回本次是否实际减速（冷却期内的后续失败忽略）。"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_backoff < self.cooldown:
+                return False
+            self._last_backoff = now
+            self.backoffs += 1
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate * self.decrease))
+            return True
+
+
+class RequestMetrics:
+    """请求延迟 / 错误计数（线程安全）。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []
+        self.errors: Counter = Counter()
+
+    def record(self, latency: float, error: str | None = None) -> None:
+        """登记一次请求；``error`` 为错误类别（如 ``"429"`` / ``"timeout"``），成功时为 None。"""
+        with self._lock:
+            self._latencies.append(latency)
+            if error:
+                self.errors[error] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lat = sorted(self._latencies)
+            errors = dict(self.errors)
+
+        def pct(q: float) -> float:
+            return lat[min(len(lat) - 1, int(q * len(lat)))] if lat else 0.0
+
+        total_errors = sum(errors.values())
+        return {
+            "requests": len(lat),
+            "errors": total_errors,
+            "error_rate": total_errors / len(lat) if lat else 0.0,
+            "errors_by_kind": errors,
+            "p50": pct(0.5),
+            "p95": pct(0.95),
+            "max": lat[-1] if lat else 0.0,
+        }
+
+
+class PolitenessDelay:
+    """同一站点（或同一浏览器）两次导航之间的最小间隔（线程安全）。
+
+    与页面加载等待分开：等待只等数据就绪，这里单独控制访问节奏。每次 ``wait`` 从上次导航时刻起算，
+    页面本身已经花掉的时间不再重复等待。
+
+    Args:
+        interval: 最小间隔（秒）。
+        jitter: 额外的随机间隔上限（秒），避免固定节奏。
+    """
+
+    def __init__(self, interval: float, jitter: float = 0.0):
+        self.interval = interval
+        self.jitter = jitter
+        self._next: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, key: Hashable = None) -> float:
+        """等到允许下一次导航，返回实际等待的秒数。"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(key, now))
+            self._next[key] = start + self.interval + random.uniform(0, self.jitter)
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
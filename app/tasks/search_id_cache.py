@@ -0,0 +1,131 @@
+"""小红书 search_id 持久化缓存。
+
+search_id 需要启动 Selenium 浏览器执行一次真实搜索才能拿到，单次冷启动 10 秒以上。
+同一关键词在一段时间内的 search_id 可以复用，因此这里按关键词落盘缓存，
+在启动任何浏览器之前先查缓存，过期（TTL）后才重新获取。search_id 由浏览器搜索得到，
+与账号无关，抓取时各账号共用同一个；接口拒绝时调用 ``invalidate`` 丢弃，下次重新获取。
+
+缓存文件为 JSON，结构::
+
+    {
+        "<keyword>": {"search_id": "...", "fetched_at": 1718000000.0},
+        ...
+    }
+
+用法::
+
+    cache = get_search_id_cache()
+    sid = cache.get_or_fetch(keyword, lambda: fetch_from_browser(keyword))
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+
+from app.config import settings
+
+PROJECT_ROOT = pathlib.Path(__file__).parents[2]
+
+class SearchIdCache:
+    """带 TTL 的 search_id 磁盘缓存（线程安全）。"""
+
+    def __init__(self, path: pathlib.Path, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._entries: Dict[str, dict] = self._load()
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def _load(self) -> Dict[str, dict]:
+        if not self.path.exists():
+            return {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning("search_id 缓存文件损坏，将重建: {}", exc)
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        # 旧版按「账号\t关键词」存储，丢弃这些条目
+        return {k: v for k, v in data.items() if "\t" not in k}
+
+    def _dump(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self._entries, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.path)  # 原子替换，避免中途崩溃留下半个文件
+
+    def get(self, keyword: str) -> Optional[str]:
+        """命中且未过期时返回 search_id，否则返回 None。"""
+        with self._lock:
+            entry = self._entries.get(keyword)
+            if not entry:
+                return None
+            if time.time() - entry.get("fetched_at", 0) > self.ttl:
+                return None
+            return entry.get("search_id")
+
+    def set(self, keyword: str, search_id: str) -> None:
+        with self._lock:
+            self._entries[keyword] = {
+                "search_id": search_id,
+                "fetched_at": time.time(),
+            }
+            self._purge_expired()
+            self._dump()
+
+    def invalidate(self, keyword: str) -> None:
+        """search_id 被接口判定失效时调用，下次访问将重新获取。"""
+        with self._lock:
+            if self._entries.pop(keyword, None) is not None:
+                logger.info("search_id 已失效: {}", keyword)
+                self._dump()
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        expired = [k for k, v in self._entries.items() if now - v.get("fetched_at", 0) > self.ttl]
+        for k in expired:
+            del self._entries[k]
+
+    # ------------------------------------------------------------------
+    # 组合操作
+    # ------------------------------------------------------------------
+
+    def get_or_fetch(self, keyword: str, fetcher: Callable[[], Optional[str]]) -> Optional[str]:
+        """先查缓存，未命中再调用 ``fetcher``（通常会启动浏览器）并写回缓存。
+
+        持锁调用 fetcher，保证同一进程内并发请求同一关键词时只启动一次浏览器。
+        """
+        with self._lock:
+            search_id = self.get(keyword)
+            if search_id:
+                logger.info("search_id 缓存命中: {} -> {}", keyword, search_id)
+                return search_id
+            search_id = fetcher()
+            if search_id:
+                self.set(keyword, search_id)
+            return search_id
+
+
+_cache: SearchIdCache | None = None
+
+
+def get_search_id_cache() -> SearchIdCache:
+    """懒加载全局缓存实例，路径与 TTL 取自 Settings。"""
+    global _cache  # noqa: PLW0603
+    if _cache is None:
+        path = pathlib.Path(settings.xhs_search_id_cache_file)
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        _cache = SearchIdCache(path, settings.xhs_search_id_ttl)
+    return _cache
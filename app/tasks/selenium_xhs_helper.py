@@ -3,21 +3,46 @@
 Selenium 辅助模块，用于获取小红书的 search_id
 """
 
-import json
 import time
 import random
 import pathlib
-from typing import Optional, Dict, Any
+import urllib.parse
+from typing import Optional, Dict
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from loguru import logger
 
+from app.tasks.browser_factory import create_browser
+from app.tasks.browser_intercept import ResponseInterceptor
+from app.tasks.browser_wait import wait_for_js
+
+# 搜索结果页发出的、URL 中带 search_id 的接口请求
+SEARCH_RESPONSE_PATTERN = r"search/filter.*search_id="
+
+# 在页面内遍历全局状态树查找 search_id，只把结果传回（避免序列化整棵状态树）
+_FIND_SEARCH_ID_JS = """
+var stack = [window.__INITIAL_STATE__, window.__NUXT__, window.__INITIAL_DATA__,
+             window.pageData, window.searchData].filter(Boolean).reverse();
+var seen = new Set(), budget = 50000;
+while (stack.length && budget-- > 0) {
+    var node = stack.pop();
+    if (!node || typeof node !== 'object' || seen.has(node)) continue;
+    seen.add(node);
+    try {
+        if (node.search_id) return String(node.search_id);
+        var keys = Object.keys(node);
+        for (var i = keys.length - 1; i >= 0; i--) {
+            var value = node[keys[i]];
+            if (value && typeof value === 'object') stack.push(value);
+        }
+    } catch (e) { /* 跳过不可访问的属性 */ }
+}
+return null;
+"""
+
 
 class XHSSeleniumHelper:
     """小红书 Selenium 辅助类"""
@@ -26,39 +51,24 @@ class XHSSeleniumHelper:
         self.headless = headless
         self.cookie_file = cookie_file or pathlib.Path(__file__).parent / "cookies" / "xhs_cookies.txt"
         self.driver = None
+        self.interceptor: Optional[ResponseInterceptor] = None
         self.search_id_cache = {}  # 缓存 search_id
         
     def setup_driver(self) -> webdriver.Chrome:
-        """设置 Chrome 驱动"""
-        options = Options()
-        
-        # 基本配置
-        options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option('useAutomationExtension', False)
-        
-        # 无头模式
-        if self.headless:
-            options.add_argument('--headless')
-            
-        # 禁用图片和CSS加载以加速
-        prefs = {
-            "profile.managed_default_content_settings.images": 2,
-            "profile.managed_default_content_settings.stylesheets": 2,
-        }
-        options.add_experimental_option("prefs", prefs)
-        
-        # 启用性能日志
-        options.add_argument('--enable-logging')
-        options.add_argument('--log-level=0')
-        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-        
-        # 自动管理 ChromeDriver
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        """设置浏览器驱动（按 settings.browser_backend 创建，每个 Cookie 文件对应一个账号）"""
+        driver = create_browser(
+            account=self.cookie_file.stem,
+            headless=self.headless,
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36',
+            # 启用日志
+            extra_args=('--enable-logging', '--log-level=0'),
+            # 禁用图片和CSS加载以加速
+            prefs={
+                "profile.managed_default_content_settings.images": 2,
+                "profile.managed_default_content_settings.stylesheets": 2,
+            },
+            hide_automation=True,
+        )
         
         # 执行反检测脚本
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
@@ -108,20 +118,21 @@ class XHSSeleniumHelper:
                 # 设置驱动
                 if not self.driver:
                     self.driver = self.setup_driver()
+                    # 在浏览器内拦截搜索接口响应（从请求 URL 中提取 search_id）
+                    self.interceptor = ResponseInterceptor(self.driver, [SEARCH_RESPONSE_PATTERN])
                 
-                # 访问小红书首页
+                # 访问小红书首页（eager 加载，DOMContentLoaded 后即可设置 Cookie）
                 self.driver.get("https://www.xiaohongshu.com")
-                time.sleep(2)
                 
                 # 设置 Cookie
                 cookies = self.load_cookies()
                 if cookies:
                     self.set_cookies(cookies)
                     self.driver.refresh()
-                    time.sleep(2)
+                    wait_for_js(self.driver, "return document.readyState !== 'loading';", timeout=10)
                 
-                # 清空之前的网络日志
-                self.driver.get_log('performance')
+                # 丢弃之前拦截到的响应
+                self.interceptor.clear()
                 
                 # 搜索关键词
                 search_id = self._perform_search(keyword)
@@ -141,6 +152,7 @@ class XHSSeleniumHelper:
                 if self.driver:
                     self.driver.quit()
                     self.driver = None
+                    self.interceptor = None
                     
                 time.sleep(random.uniform(2, 5))
         
@@ -183,14 +195,13 @@ class XHSSeleniumHelper:
                 logger.warning("找不到搜索框，尝试直接导航到搜索页面")
                 search_url = f"https://www.xiaohongshu.com/search_result?keyword={keyword}"
                 self.driver.get(search_url)
-                time.sleep(3)
                 
                 # 检查是否成功跳转到搜索结果页面
                 current_url = self.driver.current_url
                 if 'search_result' in current_url:
                     logger.info("成功导航到搜索结果页面")
                     # 从当前页面提取 search_id
-                    search_id = self._extract_search_id_from_logs()
+                    search_id = self._extract_search_id_from_response()
                     if not search_id:
                         search_id = self._extract_search_id_from_page()
                     if not search_id:
@@ -200,16 +211,13 @@ class XHSSeleniumHelper:
                     logger.error("无法导航到搜索页面")
                     return None
             
-            # 输入关键词并搜索
+            # 输入关键词并搜索，等到搜索接口响应即返回
             search_box.clear()
             search_box.send_keys(keyword)
             search_box.send_keys(Keys.RETURN)
             
-            # 等待页面加载
-            time.sleep(3)
-            
-            # 方法1: 从网络日志获取 search_id
-            search_id = self._extract_search_id_from_logs()
+            # 方法1: 从拦截到的搜索接口请求 URL 获取 search_id
+            search_id = self._extract_search_id_from_response()
             if search_id:
                 return search_id
             
@@ -229,66 +237,31 @@ class XHSSeleniumHelper:
             logger.error("搜索操作失败: {}", e)
             return None
     
-    def _extract_search_id_from_logs(self) -> Optional[str]:
-        """从网络日志中提取 search_id"""
-        if not self.driver:
+    def _extract_search_id_from_response(self, timeout: float = 10) -> Optional[str]:
+        """等待浏览器内拦截到搜索接口响应，从其 URL 中提取 search_id"""
+        if not self.interceptor:
             return None
             
-        try:
-            logs = self.driver.get_log('performance')
-            
-            for log in logs:
-                message = json.loads(log['message'])
-                
-                if message['message']['method'] == 'Network.responseReceived':
-                    url = message['message']['params']['response']['url']
-                    
-                    if 'search/filter' in url and 'search_id=' in url:
-                        logger.debug("发现 filter 请求: {}", url)
-                        
-                        # 直接从 URL 中提取 search_id
-                        try:
-                            import urllib.parse
-                            parsed = urllib.parse.urlparse(url)
-                            params = urllib.parse.parse_qs(parsed.query)
-                            search_id = params.get('search_id', [None])[0]
-                            if search_id:
-                                logger.info("从网络日志 URL 获取到 search_id: {}", search_id)
-                                return search_id
-                        except Exception as e:
-                            logger.debug("从 URL 解析 search_id 失败: {}", e)
-                            
-        except Exception as e:
-            logger.debug("从网络日志提取 search_id 失败: {}", e)
-            
-        return None
+        response = self.interceptor.wait_for(SEARCH_RESPONSE_PATTERN, timeout=timeout)
+        if not response:
+            return None
+        logger.debug("拦截到 filter 请求: {}", response.url)
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(response.url).query)
+        search_id = params.get('search_id', [None])[0]
+        if search_id:
+            logger.info("从接口请求 URL 获取到 search_id: {}", search_id)
+        return search_id
     
     def _extract_search_id_from_page(self) -> Optional[str]:
-        """从页面数据中提取 search_id"""
+        """从页面全局数据中提取 search_id（在浏览器内查找）"""
         if not self.driver:
             return None
             
         try:
-            # 尝试获取页面中的全局数据
-            scripts = [
-                "return window.__INITIAL_STATE__ || {}",
-                "return window.__NUXT__ || {}",
-                "return window.__INITIAL_DATA__ || {}",
-                "return window.pageData || {}",
-                "return window.searchData || {}"
-            ]
-            
-            for script in scripts:
-                try:
-                    page_data = self.driver.execute_script(script)
-                    if page_data:
-                        search_id = self._find_search_id_in_data(page_data)
-                        if search_id:
-                            logger.info("从页面数据获取到 search_id: {}", search_id)
-                            return search_id
-                except Exception as e:
-                    logger.debug("执行脚本失败: {}", e)
-                    
+            search_id = self.driver.execute_script(_FIND_SEARCH_ID_JS)
+            if search_id:
+                logger.info("从页面数据获取到 search_id: {}", search_id)
+                return search_id
         except Exception as e:
             logger.debug("从页面数据提取 search_id 失败: {}", e)
             
@@ -305,7 +278,6 @@ class XHSSeleniumHelper:
             
             # 检查 URL 参数
             if 'search_id=' in current_url:
-                import urllib.parse
                 parsed = urllib.parse.urlparse(current_url)
                 params = urllib.parse.parse_qs(parsed.query)
                 search_id = params.get('search_id', [None])[0]
@@ -318,27 +290,12 @@ class XHSSeleniumHelper:
             
         return None
     
-    def _find_search_id_in_data(self, data: Any) -> Optional[str]:
-        """递归查找数据中的 search_id"""
-        if isinstance(data, dict):
-            if 'search_id' in data and data['search_id']:
-                return data['search_id']
-            for value in data.values():
-                result = self._find_search_id_in_data(value)
-                if result:
-                    return result
-        elif isinstance(data, list):
-            for item in data:
-                result = self._find_search_id_in_data(item)
-                if result:
-                    return result
-        return None
-    
     def close(self):
         """关闭浏览器"""
         if self.driver:
             self.driver.quit()
             self.driver = None
+            self.interceptor = None
     
     def __enter__(self):
         return self
@@ -0,0 +1,429 @@
+"""小红书异步抓取引擎（aiohttp）。
+
+``fetch_notes`` / ``simple_xhs_scraper.scrape_xhs_notes`` 是顺序的 requests 循环，
+翻页和每条详情前都要 ``time.sleep`` 2–4 秒。这里改为：
+
+- 搜索页按窗口并发请求，结果按页码顺序消费，遇到空页或 ``has_more = false`` 即停止；
+  ``crawl_and_save`` 与 ``fetch_notes`` 一样按时间倒序抓取，默认增量：某一页全部已入库时停止（``full=True`` 翻到末页）；
+- 搜索结果进入队列，由一组详情 worker 并发请求 ``/api/sns/web/v1/feed``，与翻页流水线并行；
+- ``load_cookies`` 中的每个账号拥有独立的 ``asyncio.Semaphore``（并发上限）和 ``TokenBucket``（速率上限），
+  请求总是分配给当前最空闲的账号，N 个账号即 N 倍吞吐，但单账号频率不超限；
+- 传入 ``cookie_pool`` 时只向池中未被隔离的账号分配请求，遇到 461 / 406 的账号被隔离，
+  该请求换账号重试，其余账号继续满速工作。
+
+``base_url`` 可指向本地 aiohttp stub 服务（实现 ``/api/sns/web/v1/search/notes`` 与
+``/api/sns/web/v1/feed`` 两个接口），配合 ``xhs_signer.StubSigner`` 即可离线测试。
+
+用法：
+    python -m app.tasks.xhs_async_crawler "苏州工业园区" --pages 5
+    python -m app.tasks.xhs_async_crawler "苏州工业园区" --full
+"""
+
+from __future__ import annotations
+
+import asyncio
+import pathlib
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+from loguru import logger
+
+from app.config import SessionLocal, settings
+from app.tasks.cookie_pool import QUARANTINE_STATUSES, CookiePool, default_cookie_pool
+from app.tasks.crawl_state import IncrementalCrawl, xhs_note_ids
+from app.tasks.rate_control import TokenBucket
+from app.tasks.xhs_signer import Signer, get_signer
+from app.tasks.xiaohongshu_scraper import (
+    DEFAULT_COOKIE_FILE,
+    DEFAULT_PAGE_SIZE,
+    HEADERS_BASE,
+    SEARCH_SORT,
+    NewNoteFilter,
+    get_search_id,
+    invalidate_search_id,
+    load_cookies,
+    note_from_search_item,
+    note_id_of,
+    upsert_note_rows,
+)
+
+EDITH_BASE_URL = "https://edith.xiaohongshu.com"
+SEARCH_PATH = "/api/sns/web/v1/search/notes"
+DETAIL_PATH = "/api/sns/web/v1/feed"
+
+
+@dataclass
+class AccountSlot:
+    """单个 Cookie 账号的并发与速率配额。"""
+
+    cookie: str
+    semaphore: asyncio.Semaphore
+    bucket: TokenBucket
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+    last_status: int | None = None
+
+
+@dataclass
+class CrawlResult:
+    """一次抓取的汇总。"""
+
+    notes: List[Dict[str, Any]] = field(default_factory=list)  # 搜索结果项，附带 ``detail`` 字段
+    pages: int = 0
+    details_ok: int = 0
+    details_failed: int = 0
+    elapsed: float = 0.0
+
+
+class XHSAsyncCrawler:
+    """按账号限流的异步搜索 + 详情抓取引擎。
+
+    Args:
+        cookies: 账号 Cookie 列表，一项一个账号。
+        base_url: 接口域名，测试时指向本地 stub。
+        signer: 签名器，默认使用全局 ``get_signer()``。
+        per_account_concurrency: 每个账号同时在途的请求上限。
+        per_account_rate: 每个账号每秒请求数上限（令牌桶速率）。
+        detail_workers: 详情 worker 数，默认等于所有账号的并发上限之和。
+        cookie_pool: 账号健康度池；None 表示不做隔离，所有账号始终参与分配。
+    """
+
+    def __init__(
+        self,
+        cookies: Sequence[str],
+        *,
+        base_url: str = EDITH_BASE_URL,
+        signer: Signer | None = None,
+        per_account_concurrency: int | None = None,
+        per_account_rate: float | None = None,
+        detail_workers: int | None = None,
+        timeout: float = 15.0,
+        cookie_pool: CookiePool | None = None,
+    ):
+        if not cookies:
+            raise ValueError("至少需要一个 Cookie")
+        self.cookies = list(cookies)
+        self.base_url = base_url.rstrip("/")
+        self.signer = signer or get_signer()
+        self.per_account_concurrency = per_account_concurrency or settings.xhs_account_concurrency
+        self.per_account_rate = per_account_rate or settings.xhs_account_rate
+        self.detail_workers = detail_workers or self.per_account_concurrency * len(self.cookies)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.cookie_pool = cookie_pool
+        self.slots: List[AccountSlot] = []
+
+    # ------------------------------------------------------------------
+    # 请求层
+    # ------------------------------------------------------------------
+
+    def _init_slots(self) -> None:
+        # Semaphore 需在事件循环内创建
+        self.slots = [
+            AccountSlot(
+                cookie=ck,
+                semaphore=asyncio.Semaphore(self.per_account_concurrency),
+                bucket=TokenBucket(self.per_account_rate, capacity=1),
+            )
+            for ck in self.cookies
+        ]
+
+    def _pick_slot(self) -> AccountSlot | None:
+        """选择在途请求最少、令牌最早可用的账号；有账号池时跳过隔离中 / 本窗口配额用尽的账号。"""
+        for slot in sorted(self.slots, key=lambda s: (s.in_flight, s.bucket.next_available())):
+            if self.cookie_pool is None or self.cookie_pool.claim(slot.cookie):
+                return slot
+        return None
+
+    async def _acquire_slot(self) -> AccountSlot:
+        while True:
+            slot = self._pick_slot()
+            if slot is not None:
+                return slot
+            wait = max(self.cookie_pool.next_available_in(), 0.1)
+            logger.warning("所有账号均不可用，等待 {:.0f}s", wait)
+            await asyncio.sleep(wait)
+
+    async def _request(
+        self, session: aiohttp.ClientSession, method: str, path: str, payload: dict
+    ) -> Tuple[int, Optional[dict]]:
+        """发送请求；账号被隔离（461 / 406）时换一个账号重试，最多尝试账号数次。"""
+        attempts = len(self.slots) if self.cookie_pool is not None else 1
+        for _ in range(attempts):
+            slot = await self._acquire_slot()
+            status, data = await self._request_once(session, slot, method, path, payload)
+            if self.cookie_pool is not None:
+                self.cookie_pool.report(slot.cookie, status, ok=data is not None)
+            if status not in QUARANTINE_STATUSES:
+                break
+        return status, data
+
+    async def _request_once(
+        self, session: aiohttp.ClientSession, slot: AccountSlot, method: str, path: str, payload: dict
+    ) -> Tuple[int, Optional[dict]]:
+        slot.in_flight += 1
+        try:
+            async with slot.semaphore:
+                await slot.bucket.acquire_async()
+                url = self.base_url + path
+                loop = asyncio.get_running_loop()
+                try:
+                    sign_headers = await loop.run_in_executor(
+                        None, self.signer.sign, url, payload, slot.cookie
+                    )
+                except Exception as exc:  # noqa: BLE001
+                    # 签名进程异常只让本次请求失败，不能让翻页任务 / 详情 worker 整体退出
+                    slot.failures += 1
+                    logger.warning("{} {} 计算签名失败: {}", method, path, exc)
+                    return 0, None
+                headers = {**HEADERS_BASE, **sign_headers, "cookie": slot.cookie}
+                slot.requests += 1
+                try:
+                    async with session.request(method, url, json=payload, headers=headers) as resp:
+                        slot.last_status = resp.status
+                        if resp.status != 200:
+                            slot.failures += 1
+                            logger.warning("{} {} -> HTTP {}", method, path, resp.status)
+                            return resp.status, None
+                        data = await resp.json(content_type=None)
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exc:
+                    slot.failures += 1
+                    logger.warning("{} {} 请求异常: {}", method, path, exc)
+                    return 0, None
+                if data.get("success") is False:
+                    slot.failures += 1
+                    logger.warning("{} {} 接口返回失败: {}", method, path, data.get("msg"))
+                    return 200, None
+                return 200, data.get("data", {})
+        finally:
+            slot.in_flight -= 1
+
+    async def search_page(
+        self,
+        session: aiohttp.ClientSession,
+        keyword: str,
+        page: int,
+        *,
+        search_id: str | None = None,
+        sort: str = SEARCH_SORT,
+    ) -> Tuple[List[dict], bool]:
+        """请求一页搜索结果，返回 ``(items, has_more)``。"""
+        payload: Dict[str, Any] = {
+            "keyword": keyword,
+            "page": page,
+            "page_size": DEFAULT_PAGE_SIZE,
+            "sort": sort,
+            "note_type": 0,
+        }
+        if search_id:
+            payload["search_id"] = search_id
+        _, data = await self._request(session, "POST", SEARCH_PATH, payload)
+        if not data:
+            return [], False
+        items = data.get("items") or data.get("notes") or []
+        return items, bool(data.get("has_more", False))
+
+    async def fetch_detail(self, session: aiohttp.ClientSession, note_id: str) -> dict:
+        payload = {
+            "source_note_id": note_id,
+            "image_formats": ["jpg", "webp", "avif"],
+            "extra": {"need_body_topic": "1"},
+        }
+        _, data = await self._request(session, "POST", DETAIL_PATH, payload)
+        return data or {}
+
+    # ------------------------------------------------------------------
+    # 流水线
+    # ------------------------------------------------------------------
+
+    async def _produce_pages(
+        self,
+        session: aiohttp.ClientSession,
+        keyword: str,
+        pages: int | None,
+        queue: "asyncio.Queue[Optional[dict]]",
+        result: CrawlResult,
+        search_id: str | None,
+        sort: str,
+        on_page: Callable[[int, List[dict]], Any] | None,
+        should_stop: Callable[[], bool] | None = None,
+    ) -> None:
+        """按窗口并发请求搜索页，按页码顺序把结果投入详情队列。"""
+        window = max(1, len(self.slots))
+        pending: Dict[int, asyncio.Task] = {}
+        next_page = 1
+        current = 1
+        try:
+            while True:
+                while len(pending) < window and (pages is None or next_page <= pages):
+                    pending[next_page] = asyncio.create_task(
+                        self.search_page(session, keyword, next_page, search_id=search_id, sort=sort)
+                    )
+                    next_page += 1
+                if current not in pending:
+                    break
+                items, has_more = await pending.pop(current)
+                logger.info("第 {} 页返回 {} 条笔记", current, len(items))
+                if not items:
+                    break
+                result.pages += 1
+                if on_page is not None:
+                    filtered = on_page(current, items)
+                    if filtered is not None:
+                        items = filtered
+                for item in items:
+                    await queue.put(item)
+                if not has_more:
+                    break
+                if should_stop is not None and should_stop():
+                    logger.info("第 {} 页后满足停止条件，不再翻页", current)
+                    break
+                current += 1
+        finally:
+            for task in pending.values():
+                task.cancel()
+
+    async def _detail_worker(
+        self,
+        session: aiohttp.ClientSession,
+        queue: "asyncio.Queue[Optional[dict]]",
+        result: CrawlResult,
+        fetch_details: bool,
+    ) -> None:
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                note_id = item.get("id") or item.get("note_id")
+                if fetch_details and note_id:
+                    detail = await self.fetch_detail(session, note_id)
+                    item["detail"] = detail
+                    if detail.get("items"):
+                        result.details_ok += 1
+                    else:
+                        result.details_failed += 1
+                result.notes.append(item)
+            finally:
+                queue.task_done()
+
+    async def crawl(
+        self,
+        keyword: str,
+        pages: int | None = None,
+        *,
+        search_id: str | None = None,
+        sort: str = SEARCH_SORT,
+        fetch_details: bool = True,
+        on_page: Callable[[int, List[dict]], Any] | None = None,
+        should_stop: Callable[[], bool] | None = None,
+    ) -> CrawlResult:
+        """抓取关键词的搜索结果，并发获取每条笔记详情。
+
+        Args:
+            pages: 最大页数，None 表示直到 ``has_more`` 为 false。
+            on_page: 每页搜索结果到达时的回调 ``(page, items)``，可用于在详情前做去重等预处理；
+                返回列表时只有列表中的项进入详情队列。
+            should_stop: 每页处理完后调用，返回 True 时不再翻页（已发出的预取请求被取消）。
+        """
+        self._init_slots()
+        result = CrawlResult()
+        t0 = time.perf_counter()
+        queue: "asyncio.Queue[Optional[dict]]" = asyncio.Queue(maxsize=self.detail_workers * 4)
+        connector = aiohttp.TCPConnector(limit=self.detail_workers + len(self.slots))
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout) as session:
+            workers = [
+                asyncio.create_task(self._detail_worker(session, queue, result, fetch_details))
+                for _ in range(self.detail_workers)
+            ]
+            try:
+                await self._produce_pages(
+                    session, keyword, pages, queue, result, search_id, sort, on_page, should_stop
+                )
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for w in workers:
+                    w.cancel()
+        result.elapsed = time.perf_counter() - t0
+        logger.info(
+            "抓取完成: {} 页 {} 条笔记，详情成功 {} / 失败 {}，耗时 {:.1f}s",
+            result.pages, len(result.notes), result.details_ok, result.details_failed, result.elapsed,
+        )
+        for i, slot in enumerate(self.slots):
+            logger.debug(
+                "账号 #{}: 请求 {} 次，失败 {} 次，最近状态 {}",
+                i, slot.requests, slot.failures, slot.last_status,
+            )
+        if self.cookie_pool is not None:
+            self.cookie_pool.save()
+            self.cookie_pool.log_summary()
+        return result
+
+
+def detail_content(item: dict) -> str:
+    """从 ``crawl`` 结果项的 ``detail`` 字段提取正文。"""
+    detail_items = (item.get("detail") or {}).get("items") or []
+    if not detail_items:
+        return ""
+    return detail_items[0].get("note_card", {}).get("desc", "")
+
+
+def crawl_and_save(
+    keyword: str,
+    pages: int | None = None,
+    cookie_file: pathlib.Path = DEFAULT_COOKIE_FILE,
+    search_id: str | None = None,
+    *,
+    full: bool = False,
+    sort: str = SEARCH_SORT,
+) -> int:
+    """同步入口：异步抓取后批量写入 ``xhs_notes``，返回新增条数。
+
+    与 ``fetch_notes`` 相同：默认按时间倒序增量抓取，某一页的笔记全部已入库时停止翻页；
+    ``full=True`` 时一直翻到末页。已入库的笔记在进入详情队列前即被过滤，只刷新互动数，不再请求详情。
+    """
+    cookies = load_cookies(cookie_file)
+    pool = default_cookie_pool(cookies)
+    if search_id is None:
+        search_id = get_search_id(keyword, pool)
+    crawler = XHSAsyncCrawler(cookies, cookie_pool=pool)
+    with SessionLocal() as db, IncrementalCrawl("xhs", keyword, lookup=xhs_note_ids, full=full) as state:
+        note_filter = NewNoteFilter(db)
+        known: List[dict] = []
+
+        def only_new(page: int, items: List[dict]) -> List[dict]:
+            state.observe_page([note_id_of(n) for n in items])
+            new_items, known_items = note_filter.split(items)
+            known.extend(known_items)
+            logger.info("第 {} 页: {} 条新笔记，{} 条已存在", page, len(new_items), len(known_items))
+            return new_items
+
+        result = asyncio.run(crawler.crawl(
+            keyword, pages, search_id=search_id, sort=sort, on_page=only_new,
+            should_stop=lambda: state.should_stop,
+        ))
+        if search_id and result.pages == 0:
+            # 第一页就失败，search_id 可能已被接口拒绝，丢弃缓存
+            invalidate_search_id(keyword)
+        rows = [note_from_search_item(item, detail_content(item)) for item in result.notes]
+        rows += [note_from_search_item(item) for item in known]
+        stats = upsert_note_rows(db, rows)
+    logger.success("新增 {} 条笔记，更新 {} 条", stats.inserted, stats.updated)
+    return stats.inserted
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="小红书异步抓取")
+    parser.add_argument("keyword", help="搜索关键词")
+    parser.add_argument("--pages", type=int, default=None, help="最大页数，默认不限")
+    parser.add_argument("--cookie-file", type=pathlib.Path, default=DEFAULT_COOKIE_FILE)
+    parser.add_argument("--full", action="store_true", help="全量重抓，不因遇到已入库的页面而提前停止")
+    args = parser.parse_args()
+
+    crawl_and_save(args.keyword, args.pages, args.cookie_file, full=args.full)
@@ -0,0 +1,486 @@
+"""小红书 x-s / x-t 签名服务。
+
+PyExecJS 每次 ``.call()`` 都会启动一个新的外部 JS 运行时进程，签名因此成为单次请求里最贵的一步。
+这里改为维护一组常驻 Node 进程（``js/sign_worker.js``）：签名脚本在进程启动时编译一次，
+之后通过管道按行发送 ``(url, payload, cookie)`` 批次，返回签名头。
+
+提供的签名器：
+
+- ``SignerPool``：常驻 Node 进程池，支持预热、健康检查与可配置的池大小（默认实现）；
+- ``ExecJSSigner``：旧的 PyExecJS 方案，未安装 Node 时回退使用；
+- ``StubSigner``：纯 Python 的确定性签名，测试时通过 ``set_signer`` 替换进去；
+- ``FallbackSigner``：主签名器结果为空或出错的条目改用备用签名器（``xhsvm.js`` 失效时回退 ``sign_xhs.js``）；
+- ``NoopSigner``：找不到签名脚本时返回空签名头。
+
+用法::
+
+    from app.tasks.xhs_signer import get_signer
+    headers = get_signer().sign(url, payload, cookie)
+
+    # 性能自测
+    python -m app.tasks.xhs_signer --bench 1000
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import itertools
+import json
+import pathlib
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from app.config import settings
+
+PROJECT_ROOT = pathlib.Path(__file__).parents[2]
+JS_DIR = pathlib.Path(__file__).parent / "js"
+WORKER_JS = JS_DIR / "sign_worker.js"
+
+# 预热失败后的重试间隔（秒）
+WARMUP_RETRY_INTERVAL = 60
+
+# (url, payload, cookie)
+SignItem = Tuple[str, Any, str]
+
+
+class SignWorkerError(RuntimeError):
+    """签名进程启动失败、超时或意外退出。"""
+
+
+@dataclass(frozen=True)
+class SignScript:
+    """签名脚本描述。"""
+
+    path: pathlib.Path
+    function: str
+    payload_as_json: bool  # True 时 payload 先在 Python 端序列化为紧凑 JSON 字符串再传入
+
+    def prepare_payload(self, payload: Any) -> Any:
+        if self.payload_as_json and not isinstance(payload, str):
+            return json.dumps(payload, separators=(",", ":"))
+        return payload
+
+
+def default_sign_scripts() -> List[SignScript]:
+    """按优先级列出存在的签名脚本：xhs-mcp 的 ``xhsvm.js`` > ``tasks/js/sign_xhs.js``。"""
+    scripts = []
+    xhsvm_path = PROJECT_ROOT / "xhs-mcp" / "api" / "xhsvm.js"
+    if xhsvm_path.exists():
+        scripts.append(SignScript(xhsvm_path, "GetXsXt", payload_as_json=False))
+    sign_js = JS_DIR / "sign_xhs.js"
+    if sign_js.exists():
+        scripts.append(SignScript(sign_js, "get_sign", payload_as_json=True))
+    return scripts
+
+
+def default_sign_script() -> Optional[SignScript]:
+    """优先级最高的签名脚本，没有时返回 None。"""
+    scripts = default_sign_scripts()
+    return scripts[0] if scripts else None
+
+
+# ---------------------------------------------------------------------------
+# 签名器接口与简单实现
+# ---------------------------------------------------------------------------
+
+
+class Signer:
+    """签名器接口；子类实现 ``sign_batch``。"""
+
+    def sign_batch(self, items: Sequence[SignItem]) -> List[Dict[str, str]]:
+        """批量签名；单条失败时对应位置返回空字典。"""
+        raise NotImplementedError
+
+    def sign(self, url: str, payload: Any, cookie: str) -> Dict[str, str]:
+        return self.sign_batch([(url, payload, cookie)])[0]
+
+    def close(self) -> None:  # noqa: D401
+        """释放资源（默认无操作）。"""
+
+
+class NoopSigner(Signer):
+    """没有可用签名脚本时使用，返回空签名头。"""
+
+    def sign_batch(self, items: Sequence[SignItem]) -> List[Dict[str, str]]:
+        return [{} for _ in items]
+
+
+class StubSigner(Signer):
+    """纯 Python 的确定性签名，供测试和本地 stub 服务使用。"""
+
+    def sign_batch(self, items: Sequence[SignItem]) -> List[Dict[str, str]]:
+        results = []
+        for url, payload, _cookie in items:
+            body = payload if isinstance(payload, str) else json.dumps(payload, sort_keys=True)
+            digest = hashlib.sha256(f"{url}{body}".encode("utf-8")).hexdigest()[:32]
+            results.append({"x-s": f"XYS_stub_{digest}", "x-t": str(int(time.time() * 1000))})
+        return results
+
+
+class FallbackSigner(Signer):
+    """主签名器返回空结果或抛出异常的条目，改由备用签名器重新签名。
+
+    备用签名器只在需要时使用（``SignerPool`` 首次签名时才启动进程），主脚本正常时没有额外开销；
+    备用签名器本身出错时异常照常抛出。
+    """
+
+    def __init__(self, primary: Signer, secondary: Signer):
+        self.primary = primary
+        self.secondary = secondary
+
+    def sign_batch(self, items: Sequence[SignItem]) -> List[Dict[str, str]]:
+        try:
+            results = self.primary.sign_batch(items)
+        except Exception as exc:  # noqa: W0703
+            logger.error("主签名脚本失败: {}，改用备用脚本", exc)
+            results = [{} for _ in items]
+        retry = [i for i, result in enumerate(results) if not result]
+        if retry:
+            for i, result in zip(retry, self.secondary.sign_batch([items[i] for i in retry])):
+                results[i] = result
+        return results
+
+    def close(self) -> None:
+        self.primary.close()
+        self.secondary.close()
+
+
+class ExecJSSigner(Signer):
+    """旧方案：通过 PyExecJS 调用签名脚本（每次调用都会启动外部 JS 运行时）。"""
+
+    def __init__(self, script: SignScript):
+        import execjs  # type: ignore  # pylint: disable=C0415
+
+        self.script = script
+        self._ctx = execjs.compile(script.path.read_text(encoding="utf-8"))
+
+    def sign_batch(self, items: Sequence[SignItem]) -> List[Dict[str, str]]:
+        results = []
+        for url, payload, cookie in items:
+            try:
+                raw = self._ctx.call(
+                    self.script.function, url, self.script.prepare_payload(payload), cookie
+                )
+                data = json.loads(raw) if isinstance(raw, str) else raw
+                results.append({k: str(v) for k, v in (data or {}).items()})
+            except Exception as exc:  # noqa: W0703
+                logger.error("execjs 计算签名失败: {}", exc)
+                results.append({})
+        return results
+
+
+# ---------------------------------------------------------------------------
+# 常驻 Node 进程
+# ---------------------------------------------------------------------------
+
+
+class NodeSignWorker:
+    """单个常驻 Node 签名进程，请求/响应按行 JSON 传输。"""
+
+    def __init__(self, script: SignScript, node_bin: str, timeout: float):
+        self.script = script
+        self.node_bin = node_bin
+        self.timeout = timeout
+        self.proc: Optional[subprocess.Popen] = None
+        self.signed = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._responses: "queue.Queue[Optional[dict]]" = queue.Queue()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self) -> None:
+        self.proc = subprocess.Popen(  # noqa: S603
+            [self.node_bin, str(WORKER_JS), str(self.script.path), self.script.function],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+        ready = self._next_response(0, self.timeout)
+        if not ready.get("ok"):
+            self.close()
+            raise SignWorkerError(f"签名进程启动失败: {ready.get('error')}")
+
+    def _read_stdout(self) -> None:
+        assert self.proc and self.proc.stdout
+        for line in self.proc.stdout:
+            try:
+                self._responses.put(json.loads(line))
+            except ValueError:
+                logger.debug("签名进程输出非 JSON 行: {}", line[:200])
+        self._responses.put(None)  # EOF
+
+    def _read_stderr(self) -> None:
+        assert self.proc and self.proc.stderr
+        for line in self.proc.stderr:
+            logger.debug("[sign_worker] {}", line.rstrip())
+
+    def _next_response(self, req_id: int, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SignWorkerError("签名进程响应超时")
+            try:
+                resp = self._responses.get(timeout=remaining)
+            except queue.Empty as exc:
+                raise SignWorkerError("签名进程响应超时") from exc
+            if resp is None:
+                raise SignWorkerError("签名进程已退出")
+            if resp.get("id") == req_id:
+                return resp
+
+    def request(self, body: dict) -> dict:
+        if not self.alive:
+            raise SignWorkerError("签名进程未运行")
+        with self._lock:
+            req_id = next(self._ids)
+            try:
+                self.proc.stdin.write(json.dumps({"id": req_id, **body}) + "\n")  # type: ignore[union-attr]
+                self.proc.stdin.flush()  # type: ignore[union-attr]
+            except OSError as exc:
+                raise SignWorkerError(f"写入签名进程失败: {exc}") from exc
+            return self._next_response(req_id, self.timeout)
+
+    def ping(self) -> bool:
+        try:
+            return bool(self.request({"op": "ping"}).get("ok"))
+        except SignWorkerError:
+            return False
+
+    def sign_batch(self, items: Sequence[SignItem]) -> List[Dict[str, str]]:
+        payload_items = [
+            [url, self.script.prepare_payload(payload), cookie] for url, payload, cookie in items
+        ]
+        resp = self.request({"op": "sign", "items": payload_items})
+        if not resp.get("ok"):
+            raise SignWorkerError(f"签名请求失败: {resp.get('error')}")
+        results = []
+        for item in resp["results"]:
+            if "error" in item:
+                logger.error("签名脚本执行失败: {}", item["error"])
+                results.append({})
+            else:
+                results.append(item)
+        self.signed += len(items)
+        return results
+
+    def close(self) -> None:
+        if not self.proc:
+            return
+        try:
+            if self.proc.stdin:
+                self.proc.stdin.close()
+            self.proc.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+        self.proc = None
+
+
+class SignerPool(Signer):
+    """常驻 Node 签名进程池。
+
+    - ``warmup``：启动全部进程并等待签名脚本编译完成；首次签名时自动调用；
+    - ``health_check``：逐个 ping，替换已退出或无响应的进程；
+    - 大批量签名按 ``chunk_size`` 切分后分发给多个进程并行处理。
+    """
+
+    def __init__(
+        self,
+        script: SignScript,
+        size: int | None = None,
+        node_bin: str | None = None,
+        timeout: float | None = None,
+        chunk_size: int = 200,
+    ):
+        self.script = script
+        self.size = max(1, size or settings.xhs_sign_pool_size)
+        self.node_bin = node_bin or settings.node_bin
+        self.timeout = timeout or settings.xhs_sign_timeout
+        self.chunk_size = chunk_size
+        self.replaced = 0
+        self._idle: "queue.Queue[NodeSignWorker]" = queue.Queue()
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._failed_at = 0.0  # 最近一次预热失败的时间，冷却期内不再反复拉起进程
+
+    def _spawn(self) -> NodeSignWorker:
+        worker = NodeSignWorker(self.script, self.node_bin, self.timeout)
+        worker.start()
+        return worker
+
+    def warmup(self) -> None:
+        with self._start_lock:
+            if self._started:
+                return
+            if time.monotonic() - self._failed_at < WARMUP_RETRY_INTERVAL:
+                raise SignWorkerError("签名进程池预热失败，冷却中")
+            t0 = time.perf_counter()
+            try:
+                for _ in range(self.size):
+                    self._idle.put(self._spawn())
+            except SignWorkerError:
+                self._failed_at = time.monotonic()
+                self.close()
+                raise
+            self._started = True
+            logger.info(
+                "签名进程池已就绪: {} 个进程，耗时 {:.0f} ms",
+                self.size, (time.perf_counter() - t0) * 1000,
+            )
+
+    def _replace(self, worker: NodeSignWorker) -> NodeSignWorker:
+        worker.close()
+        self.replaced += 1
+        logger.warning("替换失效的签名进程（累计 {} 次）", self.replaced)
+        return self._spawn()
+
+    def _sign_chunk(self, chunk: Sequence[SignItem]) -> List[Dict[str, str]]:
+        worker = self._idle.get()
+        try:
+            if not worker.alive:
+                worker = self._replace(worker)
+            try:
+                return worker.sign_batch(chunk)
+            except SignWorkerError as exc:
+                logger.warning("签名进程异常，重启后重试: {}", exc)
+                worker = self._replace(worker)
+                return worker.sign_batch(chunk)
+        finally:
+            self._idle.put(worker)
+
+    def sign_batch(self, items: Sequence[SignItem]) -> List[Dict[str, str]]:
+        if not items:
+            return []
+        self.warmup()
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        if len(chunks) == 1:
+            return self._sign_chunk(chunks[0])
+        with ThreadPoolExecutor(max_workers=min(self.size, len(chunks))) as executor:
+            parts = list(executor.map(self._sign_chunk, chunks))
+        return [result for part in parts for result in part]
+
+    def health_check(self) -> Dict[str, int]:
+        """逐个检查进程存活与响应，返回 ``{"size", "healthy", "replaced"}``。"""
+        self.warmup()
+        healthy = replaced = 0
+        for _ in range(self.size):
+            worker = self._idle.get()
+            try:
+                if worker.alive and worker.ping():
+                    healthy += 1
+                else:
+                    worker = self._replace(worker)
+                    replaced += 1
+            finally:
+                self._idle.put(worker)
+        return {"size": self.size, "healthy": healthy, "replaced": replaced}
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self._started = False
+
+
+# ---------------------------------------------------------------------------
+# 全局签名器
+# ---------------------------------------------------------------------------
+
+_signer: Signer | None = None
+_signer_lock = threading.Lock()
+
+
+def _signer_for(script: SignScript) -> Signer:
+    if shutil.which(settings.node_bin):
+        return SignerPool(script)
+    logger.warning("未找到 Node（{}），回退到 PyExecJS 签名", settings.node_bin)
+    return ExecJSSigner(script)
+
+
+def _build_default_signer() -> Signer:
+    scripts = default_sign_scripts()
+    if not scripts:
+        logger.warning("未找到可用签名脚本，将不携带签名头，接口可能返回 401/461")
+        return NoopSigner()
+    signer = _signer_for(scripts[0])
+    if len(scripts) > 1:
+        # xhsvm.js 失效或过期时，对应条目回退到 sign_xhs.js
+        try:
+            signer = FallbackSigner(signer, _signer_for(scripts[1]))
+        except Exception as exc:  # noqa: W0703
+            logger.error("备用签名脚本 {} 不可用: {}", scripts[1].path.name, exc)
+    return signer
+
+
+def get_signer() -> Signer:
+    """获取全局签名器（懒加载，进程退出时自动关闭）。"""
+    global _signer  # noqa: PLW0603
+    with _signer_lock:
+        if _signer is None:
+            _signer = _build_default_signer()
+        return _signer
+
+
+def set_signer(signer: Signer | None) -> None:
+    """替换全局签名器（测试时注入 ``StubSigner``）；传 None 则恢复默认。"""
+    global _signer  # noqa: PLW0603
+    with _signer_lock:
+        if _signer is not None and _signer is not signer:
+            _signer.close()
+        _signer = signer
+
+
+atexit.register(lambda: _signer.close() if _signer is not None else None)
+
+
+# ---------------------------------------------------------------------------
+# CLI：签名性能自测
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="小红书签名服务自测")
+    parser.add_argument("--bench", type=int, default=1000, help="签名条数")
+    args = parser.parse_args()
+
+    signer = get_signer()
+    items = [
+        (
+            "https://edith.xiaohongshu.com/api/sns/web/v1/search/notes",
+            {"keyword": "苏州工业园区", "page": i, "page_size": 20},
+            "a1=bench",
+        )
+        for i in range(args.bench)
+    ]
+    pool = signer.primary if isinstance(signer, FallbackSigner) else signer
+    if isinstance(pool, SignerPool):
+        pool.warmup()
+        logger.info("健康检查: {}", pool.health_check())
+    t0 = time.perf_counter()
+    out = signer.sign_batch(items)
+    elapsed = time.perf_counter() - t0
+    ok = sum(1 for r in out if r)
+    logger.info(
+        "{}: {} 条签名，成功 {} 条，总耗时 {:.3f} s，平均 {:.3f} ms/条",
+        type(signer).__name__, len(items), ok, elapsed, elapsed / len(items) * 1000,
+    )
@@ -6,8 +6,8 @@
 1. 根据关键词或话题，分页抓取小红书笔记列表（JSON 接口），将结果写入 Postgres 的 ``xhs_notes`` 表。
 2. 支持从本地 ``cookies/xhs_cookies.txt`` 读取多个账号 Cookie 轮询使用，降低风控。
 3. 简化版签名流程：
-   - 小红书接口需要 ``x-s`` / ``x-t`` 等签名头；可以通过阅读博客中的 JS 逆向脚本 ``sign.js`` 丢到 ``tasks/js/sign_xhs.js``，借助 ``execjs`` 计算。
-   - 本脚本保留 ``gen_sign`` 占位函数，开发者需将对应 JS 填充后即可运行。
+   - 小红书接口需要 ``x-s`` / ``x-t`` 等签名头；可以通过阅读博客中的 JS 逆向脚本 ``sign.js`` 丢到 ``tasks/js/sign_xhs.js``。
+   - ``gen_sign`` 通过 ``xhs_signer`` 的常驻 Node 进程池计算签名；未安装 Node 时回退到 ``execjs``。
 
 用法：
     python -m app.tasks.xiaohongshu_scraper "科技创新" --pages 20
@@ -23,20 +23,24 @@ Cookie 准备：
 
 from __future__ import annotations
 
-import json
 import random
 import time
 import pathlib
-from typing import List, Generator, Dict, Any
+from typing import List, Dict, Any, Iterable, Sequence, Set, Tuple
 from datetime import datetime
 
-import execjs  # type: ignore
 import requests
 from loguru import logger
 
-from app.config import SessionLocal
+from app.config import SessionLocal, settings
 from app.models import XHSNote
+from app.tasks.bulk_writer import BulkUpserter, UpsertStats
+from app.tasks.cookie_pool import QUARANTINE_STATUSES, CookiePool, default_cookie_pool
+from app.tasks.document_sink import sync_after_write
+from app.tasks.crawl_state import IncrementalCrawl, existing_keys, xhs_note_ids
+from app.tasks.search_id_cache import get_search_id_cache
 from app.tasks.selenium_xhs_helper import XHSSeleniumHelper
+from app.tasks.xhs_signer import get_signer
 
 # ------------------------------------------------------------
 # 常量配置
@@ -61,6 +65,8 @@ HEADERS_BASE = {
 
 DEFAULT_COOKIE_FILE = pathlib.Path(__file__).parent / "cookies" / "xhs_cookies.txt"
 DEFAULT_PAGE_SIZE = 20
+# 搜索排序：按时间倒序，增量抓取遇到已入库的页面即可停止（fetch_notes 与异步引擎共用）
+SEARCH_SORT = "time"
 
 
 # ------------------------------------------------------------
@@ -80,65 +86,37 @@ def load_cookies(path: pathlib.Path = DEFAULT_COOKIE_FILE) -> List[str]:
 def gen_sign(url: str, payload: dict, cookie: str) -> Dict[str, str]:
     """生成 x-s / x-t 等签名头。
 
-    优先顺序：
-    1) 若项目已 clone xhs-mcp 并存在 `api/xhsvm.js`，
-       直接使用里面提供的 `GetXsXt` 函数，速度更快、依赖最少；
-    2) 否则回退到旧的 `tasks/js/sign_xhs.js` 方案（需自行准备并能在 Node 环境跑通）。
+    实际计算交给 ``app.tasks.xhs_signer`` 的常驻 Node 签名进程池：
+    签名脚本（优先 xhs-mcp 的 `api/xhsvm.js`，其结果为空或出错时回退 `tasks/js/sign_xhs.js`）只编译一次，
+    之后每次签名都是进程内调用，不再为每个请求启动新的 JS 运行时。
     """
-    # ① 尝试使用 xhsvm.js
-    xhsvm_path = pathlib.Path(__file__).parents[2] / "xhs-mcp" / "api" / "xhsvm.js"
-    if xhsvm_path.exists():
-        try:
-            # 缓存编译结果，避免重复开销
-            if not hasattr(gen_sign, "_ctx_xhsvm"):
-                gen_sign._ctx_xhsvm = execjs.compile(xhsvm_path.read_text(encoding='utf-8'))  # type: ignore
-            xs_xt = gen_sign._ctx_xhsvm.call(
-                "GetXsXt", url, payload, cookie  # type: ignore[attr-defined]
-            )
-            if xs_xt:
-                result = json.loads(xs_xt)
-                # 确保 x-t 是字符串类型
-                if 'x-t' in result:
-                    result['x-t'] = str(result['x-t'])
-                return result
-        except Exception as exc:  # noqa: W0703
-            logger.error("xhsvm.js 计算签名失败: {}，尝试备用方案", exc)
-
-    # ② 备用 sign_xhs.js
-    js_file = pathlib.Path(__file__).parent / "js" / "sign_xhs.js"
-    if not js_file.exists():
-        logger.warning("未找到可用签名脚本，将不携带签名头，接口可能返回 401/461")
-        return {}
-
     try:
-        if not hasattr(gen_sign, "_ctx_sign"):
-            gen_sign._ctx_sign = execjs.compile(js_file.read_text(encoding='utf-8'))  # type: ignore
-        result = gen_sign._ctx_sign.call(  # type: ignore[attr-defined]
-            "get_sign", url, json.dumps(payload, separators=(",", ":")), cookie
-        )
-        # 确保 x-t 是字符串类型
-        if isinstance(result, dict) and 'x-t' in result:
-            result['x-t'] = str(result['x-t'])
-        return result
+        return get_signer().sign(url, payload, cookie)
     except Exception as exc:  # noqa: W0703
-        logger.error("sign_xhs.js 计算签名失败: {}，改为无签名请求", exc)
+        logger.error("计算签名失败: {}，改为无签名请求", exc)
         return {}
 
 
-def cycle_cookies(cookies: List[str]) -> Generator[str, None, None]:
-    """无限循环 Cookie，以避免单账号频率过高。"""
-    while True:
-        random.shuffle(cookies)
-        for ck in cookies:
-            yield ck
-
-
 # ------------------------------------------------------------
 # 核心抓取逻辑
 # ------------------------------------------------------------
 
-def get_search_id(keyword: str, cookie: str) -> str | None:
-    """获取 search_id；优先使用 Selenium，失败后回退到 API 方式"""
+def get_search_id(keyword: str, pool: CookiePool | None = None) -> str | None:
+    """获取 search_id；先查持久化缓存，未命中再走浏览器 / API。
+
+    缓存按关键词存储并带 TTL，同一关键词在 TTL 内最多启动一次浏览器，各账号共用同一个 search_id。
+    ``pool`` 仅在浏览器方式失败、回退到 API 时用来借一个账号（结果会上报账号池）。
+    """
+    return get_search_id_cache().get_or_fetch(keyword, lambda: _fetch_search_id(keyword, pool))
+
+
+def invalidate_search_id(keyword: str) -> None:
+    """带 search_id 的搜索被接口拒绝时调用，丢弃缓存，下次抓取重新获取。"""
+    get_search_id_cache().invalidate(keyword)
+
+
+def _fetch_search_id(keyword: str, pool: CookiePool | None) -> str | None:
+    """实际获取 search_id；优先使用 Selenium，失败后回退到 API 方式"""
     
     # 方法1: 使用 Selenium 获取 search_id
     logger.info("尝试使用 Selenium 获取 search_id: {}", keyword)
@@ -152,6 +130,10 @@ def get_search_id(keyword: str, cookie: str) -> str | None:
         logger.warning("Selenium 方式失败: {}", e)
     
     # 方法2: 回退到 API 方式（保留原有逻辑）
+    cookie = pool.acquire() if pool is not None else None
+    if cookie is None:
+        logger.error("没有可用的 Cookie 账号，无法通过 API 获取 search_id: {}", keyword)
+        return None
     logger.info("回退到 API 方式获取 search_id: {}", keyword)
     
     # 尝试不同的参数组合
@@ -176,13 +158,25 @@ def get_search_id(keyword: str, cookie: str) -> str | None:
         # 添加随机延迟
         time.sleep(random.uniform(0.5, 1.5))
         
-        r = requests.get(FILTER_URL, headers=headers, params=params, timeout=10)
+        try:
+            r = requests.get(FILTER_URL, headers=headers, params=params, timeout=10)
+        except requests.RequestException as exc:
+            pool.report(cookie, 0)
+            logger.warning("参数组合 {} 请求失败: {}", i+1, exc)
+            continue
+        if r.status_code in QUARANTINE_STATUSES:
+            # 借来的账号已被隔离，不再用它尝试其他参数组合
+            pool.report(cookie, r.status_code)
+            logger.warning("参数组合 {} 返回 {}，停止 API 方式", i+1, r.status_code)
+            break
         try:
             data = r.json()
         except ValueError:
+            pool.report(cookie, r.status_code, ok=False)
             logger.warning("参数组合 {} 非 JSON 响应: {}", i+1, r.text[:200])
             continue
 
+        pool.report(cookie, r.status_code, ok=r.status_code == 200 and data.get("success", True) is not False)
         if data.get("success", True):
             rid = data.get("data", {}).get("search_id")
             if rid:
@@ -198,103 +192,265 @@ def get_search_id(keyword: str, cookie: str) -> str | None:
     return None
 
 
-def fetch_notes(keyword: str, pages: int | None = None, cookie_file: pathlib.Path = DEFAULT_COOKIE_FILE):
-    cookies = load_cookies(cookie_file)
-    ck_iter = cycle_cookies(cookies)
+def fetch_notes(
+    keyword: str,
+    pages: int | None = None,
+    cookie_file: pathlib.Path = DEFAULT_COOKIE_FILE,
+    full: bool = False,
+):
+    """按时间倒序翻页抓取关键词笔记。
+
+    默认增量模式：某一页的笔记全部已入库时停止翻页；``full=True`` 时一直翻到末页。
+    每页从账号池取最健康的账号；遇到 461 / 406 时该账号被隔离，换一个账号重试本页。
+    """
+    pool = default_cookie_pool(load_cookies(cookie_file))
 
     page = 1
     has_more = True
     ses = requests.Session()
+    retries = 0
 
-    with SessionLocal() as db:
-        while has_more:
-            if pages and page > pages:
-                logger.info("达到页数上限 {}，停止", pages)
-                break
-
-            payload = {
-                "keyword": keyword,
-                "page": page,
-                "page_size": DEFAULT_PAGE_SIZE,
-                "sort": "time",  # 按时间排序
-                "note_type": 0,  # 0=全部，1=视频，2=图文
-            }
-            ck = next(ck_iter)
-            search_id = get_search_id(keyword, ck)
-            if search_id:
-                payload["search_id"] = search_id
-            else:
-                logger.warning("无法获取 search_id，尝试直接搜索...")
-            sign_headers = gen_sign(API_URL, payload, ck)
-            
-            # 确保所有 header 值都是字符串
-            for key, value in sign_headers.items():
-                if not isinstance(value, str):
-                    sign_headers[key] = str(value)
-            
-            headers = {
-                **HEADERS_BASE,
-                **sign_headers,
-                "cookie": ck,
-            }
-
-            resp = ses.post(API_URL, json=payload, headers=headers, timeout=10)
-            logger.debug("搜索接口响应状态码: {}", resp.status_code)
+    # search_id 与页码、账号无关，整个抓取过程只解析一次（命中缓存时不会启动浏览器）
+    search_id = get_search_id(keyword, pool)
+    if not search_id:
+        logger.warning("无法获取 search_id，尝试直接搜索...")
+
+    try:
+        with SessionLocal() as db, IncrementalCrawl("xhs", keyword, lookup=xhs_note_ids, full=full) as crawl:
+            while has_more:
+                if pages and page > pages:
+                    logger.info("达到页数上限 {}，停止", pages)
+                    break
+
+                payload = {
+                    "keyword": keyword,
+                    "page": page,
+                    "page_size": DEFAULT_PAGE_SIZE,
+                    "sort": SEARCH_SORT,
+                    "note_type": 0,  # 0=全部，1=视频，2=图文
+                }
+                ck = pool.acquire(timeout=settings.xhs_cookie_max_cooldown)
+                if ck is None:
+                    logger.error("所有账号均在隔离中，停止")
+                    break
+                if search_id:
+                    payload["search_id"] = search_id
+                sign_headers = gen_sign(API_URL, payload, ck)
             
-            if resp.status_code != 200:
-                logger.error("HTTP {} @ page {}", resp.status_code, page)
-                logger.error("响应内容: {}", resp.text[:500])
-                break
-                
-            data = resp.json()
-            logger.debug("搜索接口完整响应: {}", data)
+                # 确保所有 header 值都是字符串
+                for key, value in sign_headers.items():
+                    if not isinstance(value, str):
+                        sign_headers[key] = str(value)
             
-            if data.get("success") is False:
-                logger.error("接口返回失败: {}", data)
-                break
+                headers = {
+                    **HEADERS_BASE,
+                    **sign_headers,
+                    "cookie": ck,
+                }
+
+                try:
+                    resp = ses.post(API_URL, json=payload, headers=headers, timeout=10)
+                except requests.RequestException as exc:
+                    pool.report(ck, 0)
+                    logger.error("请求失败 @ page {}: {}", page, exc)
+                    break
+                logger.debug("搜索接口响应状态码: {}", resp.status_code)
+
+                if resp.status_code in QUARANTINE_STATUSES and retries < len(pool):
+                    # 账号已被隔离，换下一个健康账号重试本页
+                    pool.report(ck, resp.status_code)
+                    retries += 1
+                    continue
+                if resp.status_code != 200:
+                    pool.report(ck, resp.status_code)
+                    logger.error("HTTP {} @ page {}", resp.status_code, page)
+                    logger.error("响应内容: {}", resp.text[:500])
+                    break
+
+                data = resp.json()
+                logger.debug("搜索接口完整响应: {}", data)
+                pool.report(ck, resp.status_code, ok=data.get("success") is not False)
+                retries = 0
+
+                if data.get("success") is False:
+                    logger.error("接口返回失败: {}", data)
+                    if search_id:
+                        invalidate_search_id(keyword)
+                    break
             
-            # 检查是否有笔记数据
-            data_section = data.get("data", {})
-            note_list = data_section.get("notes") or data_section.get("items") or []
+                # 检查是否有笔记数据
+                data_section = data.get("data", {})
+                note_list = data_section.get("notes") or data_section.get("items") or []
             
-            logger.info("第 {} 页返回 {} 条笔记", page, len(note_list))
+                logger.info("第 {} 页返回 {} 条笔记", page, len(note_list))
             
-            if not note_list:
-                logger.warning("第 {} 页无数据，完整响应: {}", page, data)
-                break
+                if not note_list:
+                    logger.warning("第 {} 页无数据，完整响应: {}", page, data)
+                    break
 
-            save_notes(db, note_list)
-            logger.success("保存第 {} 页 {} 条笔记", page, len(note_list))
+                crawl.observe_page([note_id_of(n) for n in note_list])
+                save_notes(db, note_list)
+                logger.success("保存第 {} 页 {} 条笔记", page, len(note_list))
+                if crawl.should_stop:
+                    break
 
-            page += 1
-            has_more = data.get("data", {}).get("has_more", False)
-            time.sleep(random.uniform(1.5, 3.0))
+                page += 1
+                has_more = data.get("data", {}).get("has_more", False)
+                time.sleep(random.uniform(1.5, 3.0))
+    finally:
+        pool.save()
+        pool.log_summary()
 
 
 # ------------------------------------------------------------
 # 数据库存储
 # ------------------------------------------------------------
 
-def save_notes(db, notes: List[dict]):
+# 已存在的笔记在重复抓取时默认刷新的列
+XHS_REFRESH_COLUMNS = ("like_count", "collect_count", "comment_count")
+
+
+def _safe_int(value) -> int:
+    """安全转换数字字段（接口里的互动数可能是字符串）。"""
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return 0
+    return value if isinstance(value, int) else 0
+
+
+def note_from_search_item(n: dict, content: str = "") -> Dict[str, Any] | None:
+    """把搜索接口返回的 ``note_card`` 结构转换为 ``xhs_notes`` 行字典。
+
+    Args:
+        n: 搜索接口 ``data.items`` 中的一项。
+        content: 从详情接口获取的正文，没有则为空。
+    """
+    note_id = n.get("id") or n.get("note_id")
+    if not note_id:
+        return None
+    note_card = n.get("note_card", {})
+    if not note_card:
+        return None
+
+    user_info = note_card.get("user", {})
+    interact_info = note_card.get("interact_info", {})
+
+    publish_time = None
+    if n.get("publish_time"):
+        try:
+            publish_time = datetime.fromtimestamp(n["publish_time"] / 1000)
+        except (TypeError, ValueError, OSError):
+            pass
+
+    return {
+        "note_id": note_id,
+        "title": note_card.get("display_title", ""),
+        "desc": content,
+        "url": f"https://www.xiaohongshu.com/explore/{note_id}",
+        "user_id": user_info.get("user_id", ""),
+        "user_name": user_info.get("nickname", ""),
+        "like_count": _safe_int(interact_info.get("liked_count", 0)),
+        "collect_count": _safe_int(interact_info.get("collected_count", 0)),
+        "comment_count": _safe_int(interact_info.get("comment_count", 0)),
+        "publish_time": publish_time,
+        "raw_json": n.copy(),
+    }
+
+
+def upsert_note_rows(
+    db,
+    rows: Iterable[Dict[str, Any] | None],
+    refresh_cols: Sequence[str] = XHS_REFRESH_COLUMNS,
+    batch_size: int = 500,
+) -> UpsertStats:
+    """批量写入 ``xhs_notes``：``INSERT ... ON CONFLICT (note_id) DO UPDATE``，每批提交一次。
+
+    Args:
+        rows: ``note_from_search_item`` 等生成的行字典，None 会被忽略。
+        refresh_cols: 已存在的笔记需要刷新的列，默认只刷新点赞 / 收藏 / 评论数。
+
+    写入后把这些笔记同步到 ``documents``（``settings.document_sync``）。
+    """
+    writer = BulkUpserter(XHSNote, ["note_id"], refresh_cols, batch_size=batch_size)
+    note_ids: List[str] = []
+
+    def valid_rows():
+        for row in rows:
+            if row:
+                note_ids.append(row["note_id"])
+                yield row
+
+    stats = writer.upsert(db, valid_rows())
+    sync_after_write(db, "xhs", note_ids)
+    return stats
+
+
+def save_notes(db, notes: List[dict]) -> UpsertStats:
+    """保存一页搜索结果（兼容 ``note_card`` 与扁平两种结构），整页一次 upsert。"""
+    rows = []
     for n in notes:
+        if n.get("note_card"):
+            rows.append(note_from_search_item(n))
+            continue
         note_id = n.get("id") or n.get("note_id")
         if not note_id:
             continue
-        note = XHSNote(
-            note_id=note_id,
-            title=n.get("title"),
-            desc=n.get("desc"),
-            url=f"https://www.xiaohongshu.com/explore/{note_id}",
-            user_id=n.get("user", {}).get("user_id"),
-            user_name=n.get("user", {}).get("nickname"),
-            like_count=n.get("like_count"),
-            collect_count=n.get("collect_count"),
-            comment_count=n.get("comment_count"),
-            publish_time=datetime.fromtimestamp(n.get("time", 0)),
-            raw_json=n,
-        )
-        db.merge(note)
-    db.commit()
+        rows.append({
+            "note_id": note_id,
+            "title": n.get("title"),
+            "desc": n.get("desc"),
+            "url": f"https://www.xiaohongshu.com/explore/{note_id}",
+            "user_id": n.get("user", {}).get("user_id"),
+            "user_name": n.get("user", {}).get("nickname"),
+            "like_count": n.get("like_count"),
+            "collect_count": n.get("collect_count"),
+            "comment_count": n.get("comment_count"),
+            "publish_time": datetime.fromtimestamp(n.get("time", 0)),
+            "raw_json": n,
+        })
+    return upsert_note_rows(db, rows)
+
+
+# ------------------------------------------------------------
+# 去重预过滤
+# ------------------------------------------------------------
+
+
+def note_id_of(n: dict) -> str | None:
+    return n.get("id") or n.get("note_id")
+
+
+def existing_note_ids(db, note_ids: Iterable[str]) -> Set[str]:
+    """一次 ``note_id = ANY(:ids)`` 查询返回 ``note_ids`` 中已入库的部分。"""
+    return existing_keys(db, XHSNote.note_id, note_ids)
+
+
+class NewNoteFilter:
+    """按页把搜索结果分成「新笔记」与「已知笔记」。
+
+    已入库的笔记用一次 ``ANY(:ids)`` 查询判定，本次运行中已经见过的笔记记在内存 seen-set 里，
+    翻页结果重叠时不会重复查询或重复请求详情。只有新笔记需要走详情接口。
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.seen: Set[str] = set()
+
+    def split(self, items: Sequence[dict]) -> Tuple[List[dict], List[dict]]:
+        """返回 ``(new_items, known_items)``，没有 note_id 的项直接丢弃。"""
+        candidates = [n for n in items if note_id_of(n) and note_id_of(n) not in self.seen]
+        stored = existing_note_ids(self.db, (note_id_of(n) for n in candidates))
+        new_items: List[dict] = []
+        known_items: List[dict] = [n for n in items if note_id_of(n) in self.seen]
+        for n in candidates:
+            note_id = note_id_of(n)
+            if note_id in self.seen:  # 同一页内重复
+                continue
+            self.seen.add(note_id)
+            (known_items if note_id in stored else new_items).append(n)
+        return new_items, known_items
 
 
 # ------------------------------------------------------------
@@ -309,8 +465,15 @@ if __name__ == "__main__":
     parser.add_argument("keyword", help="搜索关键词，如 '科技创新'")
     parser.add_argument("--pages", type=int, default=None, help="最大页数，默认不限")
     parser.add_argument("--cookie-file", type=pathlib.Path, default=DEFAULT_COOKIE_FILE, help="Cookie 文件路径")
+    parser.add_argument("--full", action="store_true", help="全量重抓，不因遇到已入库的页面而提前停止")
+    parser.add_argument("--async-engine", action="store_true", help="使用 aiohttp 异步引擎（多账号并发 + 详情流水线）")
     args = parser.parse_args()
 
     logger.info("开始爬取小红书笔记，关键词: {}, 页数限制: {}", args.keyword, args.pages or "无限制")
-    fetch_notes(args.keyword, args.pages, args.cookie_file)
+    if args.async_engine:
+        from app.tasks.xhs_async_crawler import crawl_and_save
+
+        crawl_and_save(args.keyword, args.pages, args.cookie_file, full=args.full)
+    else:
+        fetch_notes(args.keyword, args.pages, args.cookie_file, full=args.full)
     logger.info("爬取完成") 
\ No newline at end of file
@@ -6,12 +6,13 @@
 """
 
 import csv
-import json
 import time
-import random
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Any
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urljoin
+
+import lxml.etree
+import lxml.html
 
 try:
     from DrissionPage import ChromiumPage
@@ -19,53 +20,59 @@ except ImportError:
     print("请先安装DrissionPage: pip install DrissionPage")
     ChromiumPage = None
 
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.tasks.browser_factory import block_resources, create_chromium_page
+from app.tasks.browser_intercept import ResponseInterceptor
+from app.tasks.browser_wait import wait_for_dom_quiet, wait_for_selector
+from app.tasks.crawl_state import IncrementalCrawl, zhilian_job_ids
+from app.tasks.detail_pipeline import DetailPipeline
+from app.tasks.html_parsers import xpath_class
+from app.tasks.job_sink import JobSink, zhilian_job_sink
+from app.tasks.rate_control import PolitenessDelay
 
-from app.config import get_db_session
-from app.models import Base
+# 离线解析列表卡片用的 XPath（与 extract_job_info 中的选择器一一对应）
+_XP_CARDS = lxml.etree.XPath(f"//*[{xpath_class('joblist-item')}]")
+_XP_TITLE = lxml.etree.XPath(f"(.//*[{xpath_class('job-title')}]//a)[1]")
+_XP_COMPANY = lxml.etree.XPath(f"(.//*[{xpath_class('company-name')}]//a)[1]")
+_XP_SALARY = lxml.etree.XPath(f"(.//*[{xpath_class('salary')}])[1]")
+_XP_ADDR = lxml.etree.XPath(f"(.//*[{xpath_class('work-addr')}])[1]")
+_XP_REQUIRE = lxml.etree.XPath(f".//*[{xpath_class('job-require')}]//span")
+_XP_TIME = lxml.etree.XPath(f"(.//*[{xpath_class('job-time')}])[1]")
+_XP_COMPANY_INFO = lxml.etree.XPath(f"(.//*[{xpath_class('company-info')}])[1]")
 
+# 列表页前端请求的职位列表接口（extract_mode="api" 时在浏览器内拦截）
+POSITIONS_RESPONSE_PATTERN = r"/search/positions"
 
-# 临时定义ZhilianJob模型，如果models.py中没有的话
-try:
-    from app.models import ZhilianJob
-except ImportError:
-    from sqlalchemy import Column, DateTime, Integer, String, Text, func
-    from sqlalchemy.dialects.postgresql import JSONB
-    
-    class ZhilianJob(Base):
-        """智联招聘职位信息表"""
-        __tablename__ = "zhilian_jobs"
-        
-        id = Column(Integer, primary_key=True, autoincrement=True)
-        job_id = Column(String(64), unique=True, nullable=False, index=True)
-        job_title = Column(String(256), nullable=False)
-        company_name = Column(String(256), nullable=False)
-        company_size = Column(String(64))
-        company_type = Column(String(64))
-        salary = Column(String(64))
-        work_city = Column(String(64))
-        work_experience = Column(String(64))
-        education = Column(String(64))
-        job_type = Column(String(32))
-        job_description = Column(Text)
-        job_requirements = Column(Text)
-        welfare = Column(Text)
-        publish_time = Column(DateTime(timezone=True))
-        update_time = Column(DateTime(timezone=True))
-        job_url = Column(String(512))
-        raw_json = Column(JSONB)
-        created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+def _first_text(card, xpath) -> Optional[str]:
+    found = xpath(card)
+    return found[0].text_content().strip() if found else None
+
+
+def _job_id_from_url(job_url: Optional[str]) -> str:
+    return job_url.split('/')[-1].replace('.html', '') if job_url else ''
+
+
+def _label(value: Any) -> Optional[str]:
+    """接口字段可能是字符串，也可能是 {"name": ...} / {"display": ...} 结构"""
+    if isinstance(value, dict):
+        value = value.get('name') or value.get('display')
+    return str(value).strip() if value else None
 
 
 class ZhilianScraper:
     """智联招聘爬虫类"""
     
-    def __init__(self):
+    def __init__(self, extract_mode: str = "offline"):
+        """extract_mode: offline 一次取整页 HTML 离线解析；live 逐字段查询页面元素（旧方式）；
+        api 拦截页面请求的职位列表接口 JSON，拦截不到时退回 offline"""
+        self.extract_mode = extract_mode
         self.base_url = "https://www.zhaopin.com"
         self.search_url = "https://www.zhaopin.com/sou/"
         self.page: Optional[Any] = None
-        self.session: Optional[Session] = None
+        self.interceptor: Optional[ResponseInterceptor] = None
+        self.sink: Optional[JobSink] = None
+        self.politeness = PolitenessDelay(settings.politeness_interval, settings.politeness_jitter)
         
     def init_browser(self) -> bool:
         """初始化浏览器"""
@@ -74,12 +81,12 @@ class ZhilianScraper:
             return False
             
         try:
-            self.page = ChromiumPage()
-            # 设置用户代理
-            self.page.set.user_agent(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+            self.page = create_chromium_page(
+                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                           "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
             )
+            if self.extract_mode == "api":
+                self.interceptor = ResponseInterceptor(self.page, [POSITIONS_RESPONSE_PATTERN])
             print("浏览器初始化成功")
             return True
         except Exception as e:
@@ -89,7 +96,7 @@ class ZhilianScraper:
     def init_database(self) -> bool:
         """初始化数据库连接"""
         try:
-            self.session = get_db_session()
+            self.sink = zhilian_job_sink()
             print("数据库连接成功")
             return True
         except Exception as e:
@@ -116,14 +123,11 @@ class ZhilianScraper:
         if not self.page:
             return False
             
-        try:
-            # 等待职位列表加载
-            self.page.wait.ele_loaded('.joblist-item', timeout=timeout)
-            time.sleep(random.uniform(2, 4))
+        # 职位列表一出现即返回，访问节奏由 self.politeness 单独控制
+        if wait_for_selector(self.page, '.joblist-item', timeout=timeout):
             return True
-        except Exception as e:
-            print(f"页面加载超时: {e}")
-            return False
+        print(f"页面加载超时: {timeout}s 内未出现职位列表")
+        return False
     
     def extract_job_info(self, job_element: Any) -> Optional[Dict]:
         """从职位元素中提取信息"""
@@ -136,7 +140,7 @@ class ZhilianScraper:
                 job_info['job_title'] = title_ele.text.strip()
                 job_info['job_url'] = title_ele.attr('href')
                 # 从URL中提取job_id
-                job_info['job_id'] = job_info['job_url'].split('/')[-1].replace('.html', '') if job_info['job_url'] else ''
+                job_info['job_id'] = _job_id_from_url(job_info['job_url'])
             
             # 公司名称
             company_ele = job_element.ele('.company-name a', timeout=2)
@@ -175,6 +179,108 @@ class ZhilianScraper:
             print(f"提取职位信息失败: {e}")
             return None
     
+    def parse_job_cards(self, html: str, page_url: str = "") -> List[Dict]:
+        """离线解析整页 HTML 中的全部职位卡片，字段与 extract_job_info 相同。
+
+        缺失的字段直接跳过，不会像逐个查询元素那样每个等待超时；
+        返回列表与页面中的 .joblist-item 一一对应（解析不到任何字段的卡片为空 dict）。
+        """
+        try:
+            root = lxml.html.document_fromstring(html)
+        except lxml.etree.ParserError:
+            return []
+        base = page_url or self.base_url
+        jobs = []
+        for card in _XP_CARDS(root):
+            job_info = {}
+            title = _XP_TITLE(card)
+            if title:
+                href = title[0].get('href')
+                job_info['job_title'] = title[0].text_content().strip()
+                job_info['job_url'] = urljoin(base, href) if href else None
+                job_info['job_id'] = _job_id_from_url(job_info['job_url'])
+            
+            for key, xpath in (('company_name', _XP_COMPANY), ('salary', _XP_SALARY),
+                               ('work_city', _XP_ADDR), ('company_size', _XP_COMPANY_INFO)):
+                text = _first_text(card, xpath)
+                if text is not None:
+                    job_info[key] = text
+            
+            requirements = _XP_REQUIRE(card)
+            if len(requirements) >= 2:
+                job_info['work_experience'] = requirements[0].text_content().strip()
+                job_info['education'] = requirements[1].text_content().strip()
+            
+            time_text = _first_text(card, _XP_TIME)
+            if time_text is not None:
+                job_info['publish_time'] = self.parse_publish_time(time_text)
+            jobs.append(job_info)
+        return jobs
+    
+    def parse_positions(self, body: Any) -> List[Dict]:
+        """把职位列表接口的 JSON（data.list）转换为与 parse_job_cards 相同的字段"""
+        data = body.get('data') if isinstance(body, dict) else None
+        if not isinstance(data, dict):
+            return []
+        jobs = []
+        for item in data.get('list') or data.get('results') or []:
+            job_url = item.get('positionURL') or item.get('positionUrl')
+            job_info = {
+                'job_id': str(item.get('number') or item.get('jobId') or _job_id_from_url(job_url)),
+                'job_title': _label(item.get('name') or item.get('jobName')),
+                'job_url': job_url,
+                'company_name': _label(item.get('companyName') or item.get('company')),
+                'salary': _label(item.get('salary60') or item.get('salary')),
+                'work_city': _label(item.get('workCity') or item.get('city')),
+                'work_experience': _label(item.get('workingExp')),
+                'education': _label(item.get('education') or item.get('eduLevel')),
+                'company_size': _label(item.get('companySize')),
+            }
+            publish_time = _label(item.get('publishTime') or item.get('updateDate'))
+            if publish_time:
+                try:
+                    job_info['publish_time'] = datetime.strptime(publish_time[:19], "%Y-%m-%d %H:%M:%S")
+                except ValueError:
+                    job_info['publish_time'] = self.parse_publish_time(publish_time)
+            jobs.append({key: value for key, value in job_info.items() if value})
+        return jobs
+    
+    def fill_live_fields(self, job_info: Dict, job_element: Any) -> None:
+        """补齐只有运行时才能拿到的字段（链接由 JS 绑定、HTML 中没有 href 时）"""
+        try:
+            title_ele = job_element.ele('.job-title a', timeout=0)
+            if title_ele:
+                job_info['job_url'] = title_ele.link or title_ele.attr('href')
+                job_info['job_id'] = _job_id_from_url(job_info['job_url'])
+        except Exception as e:
+            print(f"补充职位链接失败: {e}")
+    
+    def extract_api_jobs(self) -> List[Dict]:
+        """取拦截到的职位列表接口响应；列表已渲染时响应通常已在缓冲中，只短暂等待"""
+        response = self.interceptor.wait_for(timeout=2)
+        job_infos = self.parse_positions(response.body) if response else []
+        if not job_infos:
+            print("未拦截到职位列表接口数据，改为解析页面 HTML")
+        return job_infos
+    
+    def extract_page_jobs(self) -> List[Dict]:
+        """解析当前列表页的全部职位"""
+        t0 = time.perf_counter()
+        job_infos = self.extract_api_jobs() if self.interceptor is not None else []
+        if not job_infos and self.extract_mode == "live":
+            job_infos = [info for info in map(self.extract_job_info, self.page.eles('.joblist-item')) if info]
+        elif not job_infos:
+            job_infos = self.parse_job_cards(self.page.html, self.page.url)
+            missing = [i for i, info in enumerate(job_infos) if info.get('job_title') and not info.get('job_url')]
+            if missing:
+                job_elements = self.page.eles('.joblist-item')
+                for i in missing:
+                    if i < len(job_elements):
+                        self.fill_live_fields(job_infos[i], job_elements[i])
+            job_infos = [info for info in job_infos if info]
+        print(f"解析到 {len(job_infos)} 个职位，用时 {time.perf_counter() - t0:.2f}s")
+        return job_infos
+    
     def parse_publish_time(self, time_str: str) -> Optional[datetime]:
         """解析发布时间"""
         try:
@@ -191,35 +297,36 @@ class ZhilianScraper:
         except:
             return None
     
-    def get_job_detail(self, job_url: str) -> Dict:
-        """获取职位详情"""
+    def get_job_detail(self, job_url: str, tab: Any = None) -> Dict:
+        """获取职位详情；tab 为详情标签页，默认使用主页面"""
         detail_info = {}
+        tab = tab or self.page
         
-        if not self.page:
+        if not tab:
             return detail_info
             
         try:
-            # 打开职位详情页
-            self.page.get(job_url)
-            self.wait_for_page_load()
+            # 打开职位详情页（详情页没有 .joblist-item，只等文档加载完成）
+            tab.get(job_url)
+            tab.wait.doc_loaded()
             
             # 职位描述
-            desc_ele = self.page.ele('.job-description', timeout=5)
+            desc_ele = tab.ele('.job-description', timeout=5)
             if desc_ele:
                 detail_info['job_description'] = desc_ele.text.strip()
             
             # 职位要求
-            requirement_ele = self.page.ele('.job-requirement', timeout=5)
+            requirement_ele = tab.ele('.job-requirement', timeout=5)
             if requirement_ele:
                 detail_info['job_requirements'] = requirement_ele.text.strip()
             
             # 福利待遇
-            welfare_ele = self.page.ele('.job-welfare', timeout=5)
+            welfare_ele = tab.ele('.job-welfare', timeout=5)
             if welfare_ele:
                 detail_info['welfare'] = welfare_ele.text.strip()
             
             # 公司详细信息
-            company_detail_ele = self.page.ele('.company-detail', timeout=5)
+            company_detail_ele = tab.ele('.company-detail', timeout=5)
             if company_detail_ele:
                 detail_info['company_type'] = company_detail_ele.text.strip()
             
@@ -228,54 +335,56 @@ class ZhilianScraper:
         
         return detail_info
     
+    def fetch_detail(self, tab: Any, job_info: Dict) -> Dict:
+        """详情流水线回调：在指定标签页中抓取详情"""
+        if not job_info.get('job_url'):
+            return {}
+        return self.get_job_detail(job_info['job_url'], tab)
+    
+    def open_detail_tabs(self, count: int) -> List[Any]:
+        """为详情抓取打开独立标签页，列表页始终停留在主标签页"""
+        tabs = []
+        for _ in range(count):
+            try:
+                tab = self.page.new_tab()
+                if settings.browser_profile == "fast":
+                    block_resources(tab)  # 屏蔽规则按标签页生效
+                tabs.append(tab)
+            except Exception as e:
+                print(f"打开详情标签页失败: {e}")
+        return tabs
+    
     def save_job_to_db(self, job_info: Dict) -> bool:
-        """保存职位信息到数据库"""
-        if not self.session:
-            return False
-            
-        try:
-            # 检查是否已存在
-            existing_job = self.session.query(ZhilianJob).filter_by(job_id=job_info['job_id']).first()
-            if existing_job:
-                print(f"职位 {job_info['job_id']} 已存在，跳过")
-                return False
-            
-            # 创建新记录
-            job = ZhilianJob(
-                job_id=job_info.get('job_id', ''),
-                job_title=job_info.get('job_title', ''),
-                company_name=job_info.get('company_name', ''),
-                company_size=job_info.get('company_size', ''),
-                company_type=job_info.get('company_type', ''),
-                salary=job_info.get('salary', ''),
-                work_city=job_info.get('work_city', ''),
-                work_experience=job_info.get('work_experience', ''),
-                education=job_info.get('education', ''),
-                job_type=job_info.get('job_type', '全职'),
-                job_description=job_info.get('job_description', ''),
-                job_requirements=job_info.get('job_requirements', ''),
-                welfare=job_info.get('welfare', ''),
-                publish_time=job_info.get('publish_time'),
-                job_url=job_info.get('job_url', ''),
-                raw_json=job_info
-            )
-            
-            self.session.add(job)
-            self.session.commit()
-            print(f"保存职位成功: {job_info['job_title']} - {job_info['company_name']}")
-            return True
-            
-        except IntegrityError:
-            self.session.rollback()
-            print(f"职位 {job_info['job_id']} 已存在，跳过")
+        """把职位加入批量写库缓冲（按 job_id 去重，满一批自动写入）
+        
+        返回 True 表示职位已进入缓冲，不代表是新职位：写库前不再逐条查重，
+        库中已存在的职位同样返回 True，在 flush 时计入「已存在」（旧版对已存在的职位返回 False）
+        """
+        if not self.sink:
             return False
-        except Exception as e:
-            self.session.rollback()
-            print(f"保存职位失败: {e}")
+        if not self.sink.add(job_info):
+            print("职位缺少 job_id，跳过")
             return False
+        return True
+
+    def flush_jobs(self) -> None:
+        """把缓冲中的职位写入数据库"""
+        if not self.sink:
+            return
+        stats = self.sink.flush()
+        if stats.total or stats.failed:
+            print(f"写入数据库: 新增 {stats.inserted} 条，已存在 {stats.skipped} 条，失败 {stats.failed} 条")
     
-    def scrape_jobs(self, keyword: str = "人工智能", city: str = "苏州", max_pages: int = 10) -> List[Dict]:
-        """爬取职位信息"""
+    def scrape_jobs(self, keyword: str = "人工智能", city: str = "苏州", max_pages: int = 10,
+                    full: bool = False, detail_workers: Optional[int] = None) -> List[Dict]:
+        """爬取职位信息
+        
+        两阶段：主标签页只负责翻列表页，新职位提交到详情流水线，由 detail_workers 个标签页并发抓取详情，
+        结果随即写入批量写库缓冲。
+        默认增量模式：已入库的职位不再打开详情页，某一页全部为已知职位时停止翻页；
+        full=True 时全量重抓
+        返回本次抓到的职位（含库中已存在的）；新增条数见写库日志
+        """
         all_jobs = []
         
         if not self.init_browser():
@@ -284,61 +393,65 @@ class ZhilianScraper:
         if not self.init_database():
             return all_jobs
         
+        def on_result(job_info: Dict) -> None:
+            if self.save_job_to_db(job_info):
+                all_jobs.append(job_info)
+        
         try:
-            for page in range(1, max_pages + 1):
-                print(f"正在爬取第 {page} 页...")
-                
-                # 构建搜索URL
-                search_url = self.build_search_url(keyword, city, page)
-                print(f"访问URL: {search_url}")
-                
-                # 访问搜索页面
-                self.page.get(search_url)
-                
-                # 等待页面加载
-                if not self.wait_for_page_load():
-                    print(f"第 {page} 页加载失败，跳过")
-                    continue
-                
-                # 滚动到页面底部，加载更多内容
-                self.page.scroll.to_bottom()
-                time.sleep(2)
-                
-                # 解析页面元素
-                job_elements = self.page.eles('.joblist-item')
-                
-                for job_element in job_elements:
-                    job_info = self.extract_job_info(job_element)
-                    if job_info:
-                        # 获取详细信息
-                        if job_info.get('job_url'):
-                            detail_info = self.get_job_detail(job_info['job_url'])
-                            job_info.update(detail_info)
-                        
-                        # 保存到数据库
-                        self.save_job_to_db(job_info)
-                        all_jobs.append(job_info)
+            tabs = self.open_detail_tabs(detail_workers or settings.zhilian_detail_workers)
+            if not tabs:
+                print("没有可用的详情标签页，停止爬取")
+                return all_jobs
+            with IncrementalCrawl("zhilian", keyword, city, lookup=zhilian_job_ids, full=full) as crawl, \
+                    DetailPipeline(tabs, self.fetch_detail, on_result) as pipeline:
+                for page in range(1, max_pages + 1):
+                    print(f"正在爬取第 {page} 页...")
                     
-                    # 随机延迟
-                    time.sleep(random.uniform(1, 3))
-                
-                # 检查是否有下一页
-                next_button = self.page.ele('.soupager a:last-of-type', timeout=5)
-                if next_button and "下一页" in next_button.text:
-                    next_button.click()
-                    time.sleep(random.uniform(3, 5))
-                else:
-                    print("没有更多页面了")
-                    break
-                
-                # 页面间随机延迟
-                time.sleep(random.uniform(5, 10))
+                    # 构建搜索URL
+                    search_url = self.build_search_url(keyword, city, page)
+                    print(f"访问URL: {search_url}")
+                    
+                    # 访问搜索页面（与上一页保持礼貌间隔）
+                    self.politeness.wait()
+                    if self.interceptor is not None:
+                        self.interceptor.clear()
+                    self.page.get(search_url)
+                    
+                    # 等待页面加载
+                    if not self.wait_for_page_load():
+                        print(f"第 {page} 页加载失败，跳过")
+                        continue
+                    
+                    # 滚动到页面底部，加载更多内容
+                    self.page.scroll.to_bottom()
+                    wait_for_dom_quiet(self.page, quiet=0.5, timeout=3)
+                    
+                    job_infos = self.extract_page_jobs()
+                    next_button = self.page.ele('.soupager a:last-of-type', timeout=5)
+                    has_next = bool(next_button and "下一页" in next_button.text)
+                    
+                    known = crawl.observe_page(
+                        [j.get('job_id') for j in job_infos],
+                        [j.get('publish_time') for j in job_infos],
+                    )
+                    
+                    # 新职位交给详情流水线，列表页不离开当前标签页
+                    for job_info in job_infos:
+                        if job_info.get('job_id') not in known:
+                            pipeline.submit(job_info)
+                    
+                    if crawl.should_stop:
+                        break
+                    
+                    # 检查是否有下一页（翻页通过 URL 中的页码完成）
+                    if not has_next:
+                        print("没有更多页面了")
+                        break
         
         finally:
             if self.page:
                 self.page.quit()
-            if self.session:
-                self.session.close()
+            self.flush_jobs()
         
         return all_jobs
     
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+浏览器后端性能测试
+对比 selenium（每个会话一个 Chrome 进程）与 playwright（一个 Chromium 进程，每个会话一个隔离上下文）
+在 N 个并发会话下的内存占用与吞吐
+
+用法:
+    python bench_browser_backends.py                          # 8 个会话，每个会话把默认页面各打开 2 遍
+    python bench_browser_backends.py --sessions 24 --repeat 3 --backend playwright
+    python bench_browser_backends.py --url https://we.51job.com/pc/search
+
+内存取本进程全部子进程（chromedriver / Chrome / Playwright 驱动 / Chromium）RSS 之和的峰值，需要 psutil；
+RSS 含共享内存页，多进程下会偏高，可用于两种后端的相对比较
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, '.')
+
+from loguru import logger
+
+from app.tasks.browser_factory import create_browser
+from bench_browser_profiles import DEFAULT_URLS
+
+try:
+    import psutil
+except ModuleNotFoundError:
+    psutil = None
+
+
+class RssSampler:
+    """后台线程周期采样子进程 RSS 之和，记录峰值"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self) -> int:
+        total = 0
+        for child in psutil.Process().children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.sample())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if psutil is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if psutil is not None:
+            self._thread.join()
+            self.peak = max(self.peak, self.sample())
+
+
+def run_session(backend: str, index: int, urls, repeat: int):
+    """一个会话：创建浏览器后依次打开页面，返回（成功页面数, 失败页面数）"""
+    driver = create_browser(backend=backend, account=f"bench-{index}", headless=True)
+    ok = failed = 0
+    try:
+        for _ in range(repeat):
+            for url in urls:
+                try:
+                    driver.get(url)
+                    driver.execute_script("return document.title;")
+                    ok += 1
+                except Exception as e:
+                    logger.warning("[{} #{}] 打开失败 {}: {}", backend, index, url, e)
+                    failed += 1
+    finally:
+        driver.quit()
+    return ok, failed
+
+
+def bench_backend(backend: str, sessions: int, urls, repeat: int):
+    t0 = time.perf_counter()
+    with RssSampler() as sampler, ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(lambda i: run_session(backend, i, urls, repeat), range(sessions)))
+        wall = time.perf_counter() - t0
+        if backend == "playwright":
+            # 共享浏览器在采样结束前关闭，避免计入后续测试
+            from app.tasks.playwright_backend import get_runtime
+            get_runtime().close()
+    ok = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    return wall, ok, failed, sampler.peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="浏览器后端性能测试")
+    parser.add_argument("--backend", action="append", choices=["selenium", "playwright"],
+                        help="只测指定后端，可重复指定；默认两种都测")
+    parser.add_argument("--sessions", type=int, default=8, help="并发会话数")
+    parser.add_argument("--repeat", type=int, default=2, help="每个会话把页面列表打开几遍")
+    parser.add_argument("--url", action="append", help="测试页面，可重复指定；默认 51Job / 智联 / 小红书")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    urls = args.url or DEFAULT_URLS
+    if psutil is None:
+        print("未安装 psutil，只统计吞吐（pip install psutil）")
+
+    for backend in args.backend or ("selenium", "playwright"):
+        wall, ok, failed, peak = bench_backend(backend, args.sessions, urls, args.repeat)
+        rss = f"峰值 RSS {peak / 2**20:>7.0f} MB，{peak / 2**20 / args.sessions:>6.1f} MB/会话" if peak else "RSS n/a"
+        print(f"[{backend:<10}] {args.sessions} 会话 | {ok} 页（失败 {failed}）用时 {wall:>6.1f}s | "
+              f"{ok / wall * 60:>6.1f} 页/分钟 | {rss}")
+
+
+if __name__ == "__main__":
+    main()
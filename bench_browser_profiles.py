@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+浏览器档位性能测试
+对比 full（加载全部资源）与 fast（屏蔽图片/字体/媒体/统计脚本 + eager 加载）两种档位下
+每个页面的加载耗时、请求数与传输字节数
+
+用法:
+    python bench_browser_profiles.py                       # 默认测试 51Job / 智联 / 小红书首页
+    python bench_browser_profiles.py --url https://we.51job.com/pc/search --repeat 5
+
+字节数取自 Chrome 性能日志中 Network.loadingFinished 的 encodedDataLength（含响应头，按网络实际传输计）
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from loguru import logger
+
+from app.tasks.browser_factory import create_chrome
+
+DEFAULT_URLS = [
+    "https://we.51job.com/pc/search?keyword=&jobArea=070306&pageNum=1",
+    "https://www.zhaopin.com/sou/jl538/kw=%E4%BA%BA%E5%B7%A5%E6%99%BA%E8%83%BD/p1",
+    "https://www.xiaohongshu.com/explore",
+]
+
+
+def network_totals(driver):
+    """汇总并清空性能日志：返回（完成的请求数, 传输字节数, 被屏蔽的请求数）"""
+    requests_done = bytes_total = blocked = 0
+    for entry in driver.get_log("performance"):
+        message = json.loads(entry["message"])["message"]
+        method = message.get("method")
+        if method == "Network.loadingFinished":
+            requests_done += 1
+            bytes_total += message["params"].get("encodedDataLength", 0)
+        elif method == "Network.loadingFailed" and message["params"].get("blockedReason"):
+            blocked += 1
+    return requests_done, bytes_total, blocked
+
+
+def bench_profile(profile: str, urls, repeat: int):
+    driver = create_chrome(profile, headless=True, performance_log=True)
+    rows = []
+    try:
+        driver.get("about:blank")
+        for _ in range(repeat):
+            for url in urls:
+                network_totals(driver)  # 清空之前的日志
+                t0 = time.perf_counter()
+                driver.get(url)
+                load = time.perf_counter() - t0
+                time.sleep(1)  # 等待 eager 返回后仍在进行的请求结束，便于统计字节数
+                done, nbytes, blocked = network_totals(driver)
+                rows.append((load, done, nbytes, blocked))
+                driver.delete_all_cookies()
+    finally:
+        driver.quit()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="浏览器档位性能测试")
+    parser.add_argument("--url", action="append", help="测试页面，可重复指定；默认 51Job / 智联 / 小红书")
+    parser.add_argument("--repeat", type=int, default=3, help="每个页面重复次数")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    urls = args.url or DEFAULT_URLS
+
+    results = {}
+    for profile in ("full", "fast"):
+        rows = bench_profile(profile, urls, args.repeat)
+        results[profile] = rows
+        load = statistics.median(r[0] for r in rows)
+        done = statistics.mean(r[1] for r in rows)
+        nbytes = statistics.mean(r[2] for r in rows)
+        blocked = statistics.mean(r[3] for r in rows)
+        print(f"[{profile:<4}] 加载中位数 {load:>6.2f}s | 请求 {done:>6.1f}/页 | "
+              f"传输 {nbytes / 1024:>8.1f} KB/页 | 屏蔽 {blocked:>5.1f}/页")
+
+    full_bytes = statistics.mean(r[2] for r in results["full"]) or 1
+    fast_bytes = statistics.mean(r[2] for r in results["fast"])
+    full_load = statistics.median(r[0] for r in results["full"]) or 1
+    fast_load = statistics.median(r[0] for r in results["fast"])
+    print(f"fast 档位：加载耗时 {fast_load / full_load:.0%}，传输字节 {fast_bytes / full_bytes:.0%}（相对 full）")
+
+
+if __name__ == "__main__":
+    main()
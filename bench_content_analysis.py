@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+企业信息分析性能测试
+对比 EnterpriseAnalyzer 逐条分析与 BatchEnterpriseAnalyzer 批量分析的耗时，并校验两者结果完全一致
+
+用法:
+    python bench_content_analysis.py                         # 100 万条模拟标题，逐条路径只测前 5 万条
+    python bench_content_analysis.py --notes 200000 --per-note 200000
+    python bench_content_analysis.py --from-db               # 使用数据库中的笔记标题
+"""
+
+import argparse
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, '.')
+
+import pandas as pd
+
+from content_analysis import (
+    CATEGORY_KEYWORDS,
+    ENTERPRISE_KEYWORD_GROUPS,
+    LOCATION_KEYWORDS,
+    BatchEnterpriseAnalyzer,
+    EnterpriseAnalyzer,
+)
+
+FILLER = ["的", "在", "了", "分享", "一下", "我", "真实", "经历", "终于", "！", "～", " ", "2024", "Ai", "ipo"]
+
+
+def synthetic_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    """生成模拟笔记：标题由关键词与填充词随机拼接，约一成标题重复"""
+    rng = random.Random(seed)
+    keywords = ([kw for group in ENTERPRISE_KEYWORD_GROUPS for kw in group] + LOCATION_KEYWORDS
+                + [kw for _, kws in CATEGORY_KEYWORDS for kw in kws])
+    titles = []
+    for i in range(n):
+        if titles and rng.random() < 0.1:
+            titles.append(rng.choice(titles))
+            continue
+        words = [rng.choice(keywords) if rng.random() < 0.3 else rng.choice(FILLER)
+                 for _ in range(rng.randint(3, 12))]
+        titles.append("".join(words))
+    likes = [rng.choice([0, 30, 120, 600, 1500]) for _ in range(n)]
+    return pd.DataFrame({"title": titles, "likes": likes})
+
+
+def db_frame() -> pd.DataFrame:
+    from app.config import SessionLocal
+    from app.models import XHSNote
+
+    with SessionLocal() as db:
+        rows = db.query(XHSNote.title, XHSNote.like_count).all()
+    return pd.DataFrame({"title": [r[0] for r in rows], "likes": [r[1] or 0 for r in rows]})
+
+
+def per_note(frame: pd.DataFrame):
+    analyzer = EnterpriseAnalyzer()
+    results = []
+    for i, (title, likes) in enumerate(zip(frame["title"], frame["likes"])):
+        note = SimpleNamespace(note_id=i, title=title, user_name=None, like_count=likes,
+                               collect_count=0, comment_count=0, url=None)
+        results.append(analyzer.extract_enterprise_info(note))
+    return results
+
+
+def check(results, batch: pd.DataFrame) -> int:
+    """逐条比较分类、置信度与关键词，返回不一致条数"""
+    mismatches = 0
+    for info, row in zip(results, batch.itertuples(index=False)):
+        if (info["category"], info["confidence"], info["enterprise_keywords"], info["location_keywords"]) != \
+                (row.category, row.confidence, row.enterprise_keywords, row.location_keywords):
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"  不一致: {info['title']!r} -> {info['category']}/{info['confidence']} "
+                      f"vs {row.category}/{row.confidence}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="企业信息分析性能测试")
+    parser.add_argument("--notes", type=int, default=1_000_000, help="模拟笔记条数")
+    parser.add_argument("--per-note", type=int, default=50_000, help="逐条路径测试 / 校验的条数")
+    parser.add_argument("--from-db", action="store_true", help="使用数据库中的笔记")
+    args = parser.parse_args()
+
+    frame = db_frame() if args.from_db else synthetic_frame(args.notes)
+    print(f"笔记 {len(frame)} 条，不同标题 {frame['title'].nunique()} 条")
+    batch = BatchEnterpriseAnalyzer()
+
+    t0 = time.perf_counter()
+    scored = batch.analyze_frame(frame)
+    elapsed = time.perf_counter() - t0
+    print(f"[batch   ] 评分 {len(frame)} 条用时 {elapsed:>6.2f}s（{len(frame) / elapsed:>9.0f} 条/秒）")
+
+    sample = frame.head(args.per_note)
+    t0 = time.perf_counter()
+    results = per_note(sample)
+    elapsed = time.perf_counter() - t0
+    print(f"[per-note] 分析 {len(sample)} 条用时 {elapsed:>6.2f}s（{len(sample) / elapsed:>9.0f} 条/秒）")
+
+    mismatches = check(results, batch.analyze_frame(sample, keywords=True))
+    print(f"结果校验: {len(sample)} 条中 {mismatches} 条不一致")
+    print(scored["category"].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
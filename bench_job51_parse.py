@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+51Job 列表页解析性能测试
+对比 bs4 / lxml / selectolax 各解析后端的耗时与峰值内存，并校验结果与 bs4 完全一致
+
+用法:
+    python bench_job51_parse.py                          # 使用 fixtures/job51/*.html，没有则生成模拟页面
+    python bench_job51_parse.py --record 5               # 先抓取 5 页真实列表页保存为 fixture
+    python bench_job51_parse.py --fixtures my_pages --repeat 20
+
+峰值内存在独立子进程中以 ru_maxrss 增量统计（lxml / selectolax 的树不在 Python 堆上，tracemalloc 统计不到）
+各后端与 bs4 结果一致由 tests/test_job51_parse.py 在 tests/fixtures/job51 的脱敏页面上校验
+"""
+
+import argparse
+import json
+import pathlib
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from loguru import logger
+
+from app.tasks import job51_scraper
+from app.tasks.job51_scraper import iter_list, list_parsers
+
+DEFAULT_FIXTURES = pathlib.Path("fixtures/job51")
+
+
+def record_fixtures(directory: pathlib.Path, pages: int):
+    """抓取真实列表页保存为 fixture（已按 GBK 解码，保存为 UTF-8）"""
+    directory.mkdir(parents=True, exist_ok=True)
+    with job51_scraper.make_session(1) as session:
+        for page in range(1, pages + 1):
+            resp = session.get(job51_scraper.build_url(page), timeout=15)
+            resp.encoding = "gbk"
+            (directory / f"page_{page:03d}.html").write_text(resp.text, encoding="utf-8")
+            print(f"已保存第 {page} 页 ({len(resp.text)} 字符)")
+            time.sleep(1)
+
+
+def synthetic_page(seed: int, rows: int = 50) -> str:
+    """模拟旧版列表页结构，混入缺字段、嵌套标签、实体、多余空白等情况"""
+    rnd = random.Random(seed)
+    parts = ['<html><head><meta charset="gbk"><title>51Job</title></head><body><div id="resultList">',
+             '<div class="el title"><span class="t1">职位名</span><span class="t2">公司名</span></div>']
+    for i in range(rows):
+        title = f"算法工程师&amp;研发 {seed}-{i}"
+        href = f"https://jobs.51job.com/suzhou/{seed:03d}{i:05d}.html?s=01&t=0"
+        company = f"苏州<b>某</b>科技有限公司{i}" if rnd.random() < 0.3 else f"苏州工业园区某公司 {i}"
+        spans = [f'<span class="t2"><a target="_blank" title="{company}" href="#">{company}</a></span>']
+        if rnd.random() < 0.9:
+            spans.append(f'<span class="t3">苏州-工业园区\n  </span>')
+        if rnd.random() < 0.8:
+            spans.append(f'<span class="t4"> {rnd.randint(5, 30)}-{rnd.randint(31, 60)}千/月 </span>')
+        spans.append(f'<span class="t5">10-{rnd.randint(1, 28):02d}</span>')
+        link = f'<p class="t1 "><input class="checkbox" type="checkbox"><span><a target="_blank" title="{title}" href="{href}">  {title}  </a></span></p>'
+        if rnd.random() < 0.05:
+            link = '<p class="t1">无链接</p>'
+        parts.append(f'<div class="el  ">\n{link}{"".join(spans)}</div>')
+    parts.append('<div class="dw_page"><a href="#">下一页</a></div></div></body></html>')
+    return "".join(parts)
+
+
+def load_pages(directory: pathlib.Path):
+    files = sorted(directory.glob("*.html")) if directory.exists() else []
+    if files:
+        return [f.read_text(encoding="utf-8") for f in files], f"{len(files)} 个 fixture（{directory}）"
+    return [synthetic_page(seed) for seed in range(20)], "20 个模拟页面（未找到 fixture）"
+
+
+def worker(backend: str, directory: pathlib.Path, repeat: int):
+    """子进程：只解析一种后端，输出耗时与 ru_maxrss 增量"""
+    pages, _ = load_pages(directory)
+    parser = list_parsers.get(backend)
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rows = 0
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            for _job in parser(html):
+                rows += 1
+    secs = time.perf_counter() - t0
+    rss1 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"secs": secs, "rows": rows, "peak_kb": rss1 - rss0}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="51Job 列表页解析性能测试")
+    parser.add_argument("--fixtures", type=pathlib.Path, default=DEFAULT_FIXTURES, help="fixture 目录（*.html）")
+    parser.add_argument("--record", type=int, default=0, help="先抓取 N 页真实列表页保存为 fixture")
+    parser.add_argument("--repeat", type=int, default=10, help="每个后端重复解析次数")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    if args.worker:
+        worker(args.worker, args.fixtures, args.repeat)
+        return
+    if args.record:
+        record_fixtures(args.fixtures, args.record)
+
+    pages, source = load_pages(args.fixtures)
+    print(f"数据: {source}，每个后端重复 {args.repeat} 次")
+
+    expected = [list(iter_list(html, "bs4")) for html in pages]
+    for backend in list_parsers.backends():
+        same = all(list(iter_list(html, backend)) == rows for html, rows in zip(pages, expected))
+        out = subprocess.run(
+            [sys.executable, __file__, "--worker", backend, "--fixtures", str(args.fixtures),
+             "--repeat", str(args.repeat)],
+            capture_output=True, text=True, check=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        per_page = r["secs"] / (len(pages) * args.repeat) * 1000
+        print(f"[{backend:<10}] {per_page:>7.2f} ms/页 | {r['rows'] / r['secs']:>9.0f} rows/s | "
+              f"峰值内存 +{r['peak_kb'] / 1024:>6.1f} MB | 结果{'一致' if same else '不一致！'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+招聘岗位写库性能测试
+对比 job_sink 批量 upsert 与旧的「先查后插 + 每行 commit」写法的吞吐（rows/sec）
+
+用法:
+    python bench_job_sink.py                  # 默认 5000 条，旧写法 500 条
+    python bench_job_sink.py --rows 20000 --legacy 1000
+    python bench_job_sink.py --bad-every 100      # 每 100 条混入一条坏数据
+
+测试数据的 job_id 以 bench_ 开头，结束后自动删除；
+坏数据为超长字段，用于验证单行出错不会拖累整批
+"""
+
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, '.')
+
+from loguru import logger
+
+from app.config import SessionLocal, init_db
+from app.models import ZhilianJob
+from app.tasks.job_sink import zhilian_job_row, zhilian_job_sink
+
+
+def make_jobs(n: int, prefix: str, bad_every: int = 0):
+    """生成 n 条模拟智联职位"""
+    for i in range(n):
+        bad = bad_every and i % bad_every == bad_every - 1
+        yield {
+            "job_id": f"{prefix}{i:08d}",
+            "job_title": "算法工程师" * (100 if bad else 1),  # 超过 String(256)
+            "company_name": f"苏州某科技有限公司{i % 300}",
+            "salary": "15-25K",
+            "work_city": "苏州",
+            "education": "本科",
+            "job_description": "负责机器学习模型研发 " * 10,
+            "publish_time": datetime.now(),
+            "job_url": f"https://jobs.zhaopin.com/{prefix}{i}.htm",
+        }
+
+
+def cleanup(prefix: str):
+    with SessionLocal() as db:
+        db.query(ZhilianJob).filter(ZhilianJob.job_id.like(f"{prefix}%")).delete(synchronize_session=False)
+        db.commit()
+
+
+def bench_sink(n: int, batch_size: int, bad_every: int = 0):
+    prefix = f"bench_{uuid.uuid4().hex[:8]}_"
+    t0 = time.perf_counter()
+    with zhilian_job_sink(batch_size=batch_size) as sink:
+        sink.extend(make_jobs(n, prefix, bad_every=bad_every))
+    secs = time.perf_counter() - t0
+    cleanup(prefix)
+    s = sink.stats
+    print(f"[sink   n={n:>7}] {n / secs:>10.0f} rows/s | 新增 {s.inserted} / 失败 {s.failed} / 批次 {s.batches}")
+
+
+def bench_legacy(n: int):
+    """旧方案：每条先 SELECT 判重，再 add + commit"""
+    prefix = f"bench_{uuid.uuid4().hex[:8]}_"
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        for job in make_jobs(n, prefix):
+            if db.query(ZhilianJob).filter_by(job_id=job["job_id"]).first():
+                continue
+            db.add(ZhilianJob(**zhilian_job_row(job)))
+            db.commit()
+    secs = time.perf_counter() - t0
+    cleanup(prefix)
+    print(f"[legacy n={n:>7}] {n / secs:>10.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="招聘岗位写库性能测试")
+    parser.add_argument("--rows", type=int, default=5000, help="批量写入测试行数")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批行数")
+    parser.add_argument("--bad-every", type=int, default=0, help="每 N 条混入一条坏数据，0 表示不混入")
+    parser.add_argument("--legacy", type=int, default=500, help="旧写法测试行数，0 表示跳过")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+    init_db()
+
+    bench_sink(args.rows, args.batch_size, args.bad_every)
+    if args.legacy:
+        bench_legacy(args.legacy)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+xhs_notes 批量 upsert 性能测试
+对比 INSERT ... ON CONFLICT 批量写入与旧的逐行 merge 写入的吞吐（rows/sec）
+
+用法:
+    python bench_xhs_upsert.py                    # 默认 10k 与 100k
+    python bench_xhs_upsert.py --sizes 10000 --legacy 2000
+
+测试数据的 note_id 以 bench_ 开头，结束后自动删除
+"""
+
+import argparse
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, '.')
+
+from loguru import logger
+
+from app.config import SessionLocal, init_db
+from app.models import XHSNote
+from app.tasks.xiaohongshu_scraper import upsert_note_rows
+
+
+def make_rows(n: int, prefix: str):
+    """生成 n 条模拟笔记"""
+    now = datetime.now()
+    for i in range(n):
+        note_id = f"{prefix}{i:08d}"
+        yield {
+            "note_id": note_id,
+            "title": f"苏州工业园区企业笔记 {i}",
+            "desc": "模拟正文 " * 20,
+            "url": f"https://www.xiaohongshu.com/explore/{note_id}",
+            "user_id": f"u{i % 1000}",
+            "user_name": f"用户{i % 1000}",
+            "like_count": random.randint(0, 5000),
+            "collect_count": random.randint(0, 2000),
+            "comment_count": random.randint(0, 500),
+            "publish_time": now,
+            "raw_json": {"id": note_id, "model_type": "note"},
+        }
+
+
+def bench_bulk(n: int, batch_size: int):
+    prefix = f"bench_{uuid.uuid4().hex[:8]}_"
+    with SessionLocal() as db:
+        t0 = time.perf_counter()
+        stats = upsert_note_rows(db, make_rows(n, prefix), batch_size=batch_size)
+        insert_secs = time.perf_counter() - t0
+
+        # 第二遍全部命中冲突，走 DO UPDATE 刷新互动数
+        t0 = time.perf_counter()
+        stats2 = upsert_note_rows(db, make_rows(n, prefix), batch_size=batch_size)
+        update_secs = time.perf_counter() - t0
+
+        db.query(XHSNote).filter(XHSNote.note_id.like(f"{prefix}%")).delete(synchronize_session=False)
+        db.commit()
+
+    print(f"[bulk   n={n:>7}] 插入: {stats.inserted} 行, {n / insert_secs:>10.0f} rows/s | "
+          f"更新: {stats2.updated} 行, {n / update_secs:>10.0f} rows/s")
+
+
+def bench_legacy(n: int):
+    """旧方案：逐行 merge，最后一次性 commit"""
+    prefix = f"bench_{uuid.uuid4().hex[:8]}_"
+    with SessionLocal() as db:
+        t0 = time.perf_counter()
+        for row in make_rows(n, prefix):
+            db.merge(XHSNote(**row))
+        db.commit()
+        secs = time.perf_counter() - t0
+
+        db.query(XHSNote).filter(XHSNote.note_id.like(f"{prefix}%")).delete(synchronize_session=False)
+        db.commit()
+
+    print(f"[merge  n={n:>7}] 插入: {n / secs:>10.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="xhs_notes 批量 upsert 性能测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="测试行数")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批行数")
+    parser.add_argument("--legacy", type=int, default=0, help="同时测试逐行 merge 的行数，0 表示跳过")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    init_db()
+
+    for n in args.sizes:
+        bench_bulk(n, args.batch_size)
+    if args.legacy:
+        bench_legacy(args.legacy)
+
+
+if __name__ == "__main__":
+    main()
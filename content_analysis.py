@@ -4,42 +4,82 @@
 即使没有正文内容，也能从标题和基本信息中提取有价值的企业信息
 """
 
+import heapq
 import sys
 import re
-from typing import List, Dict, Any
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
 
 sys.path.insert(0, '.')
 
 from app.config import SessionLocal
-from app.models import XHSNote
+from app.models import DocAnalysis, DocEntity, Document, XHSNote
 from loguru import logger
+from sqlalchemy import Integer, String, and_, case, cast, delete, false, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+# 企业关键词分组，每组对应一个 (.*?)(关键词1|关键词2|...) 模式
+ENTERPRISE_KEYWORD_GROUPS = [
+    ('公司', '企业', '集团', '科技', '有限公司', '股份', '实业'),
+    ('工业园区', '产业园', '科技园'),
+    ('招聘', '入职', '工作', '岗位', '职位'),
+    ('投资', '融资', '上市', 'IPO'),
+    ('AI', '人工智能', '大数据', '云计算', '区块链'),
+    ('生物医药', '医疗', '健康', '制药'),
+    ('新能源', '环保', '绿色'),
+    ('金融', '银行', '保险', '证券'),
+    ('制造', '生产', '工厂', '车间'),
+    ('研发', '技术', '创新', '专利'),
+]
+
+# 各企业关键词分组写入 doc_entities 时的 ent_type（与上面逐组对应），地区关键词为 LOCATION
+ENTERPRISE_ENTITY_TYPES = [
+    'ORG', 'PARK', 'JOB', 'INVESTMENT', 'TECH', 'BIOMED', 'ENERGY', 'FINANCE', 'MANUFACTURING', 'RND',
+]
+LOCATION_ENTITY_TYPE = 'LOCATION'
+
+# 地区关键词
+LOCATION_KEYWORDS = ['苏州工业园区', '苏州园区', '园区', '苏州', '江苏']
+
+# 分类关键词（匹配小写标题），按优先级排列，命中多个分类时取靠前的
+CATEGORY_KEYWORDS = [
+    ('recruitment', ('招聘', '入职', '工作', '岗位', '职位', '面试')),
+    ('company', ('公司', '企业', '集团', '科技')),
+    ('policy', ('政策', '补贴', '扶持', '优惠')),
+    ('investment', ('投资', '融资', '上市', 'ipo')),
+    ('technology', ('ai', '人工智能', '大数据', '云计算')),
+    ('tourism', ('旅游', '攻略', '景点', '游玩')),
+    ('lifestyle', ('生活', '居住', '房租', '租房')),
+]
+DEFAULT_CATEGORY = 'general'
+
+CATEGORY_WEIGHTS = {
+    'company': 0.8,
+    'recruitment': 0.7,
+    'technology': 0.6,
+    'investment': 0.6,
+    'policy': 0.5,
+    'tourism': 0.2,
+    'lifestyle': 0.1,
+    'general': 0.1
+}
 
 class EnterpriseAnalyzer:
-    """企业信息分析器"""
+    """企业信息分析器（逐条）"""
     
     def __init__(self):
         # 企业关键词模式
-        self.enterprise_patterns = [
-            r'(.*?)(公司|企业|集团|科技|有限公司|股份|实业)',
-            r'(.*?)(工业园区|产业园|科技园)',
-            r'(.*?)(招聘|入职|工作|岗位|职位)',
-            r'(.*?)(投资|融资|上市|IPO)',
-            r'(.*?)(AI|人工智能|大数据|云计算|区块链)',
-            r'(.*?)(生物医药|医疗|健康|制药)',
-            r'(.*?)(新能源|环保|绿色)',
-            r'(.*?)(金融|银行|保险|证券)',
-            r'(.*?)(制造|生产|工厂|车间)',
-            r'(.*?)(研发|技术|创新|专利)'
-        ]
+        self.enterprise_patterns = [r'(.*?)(%s)' % '|'.join(group) for group in ENTERPRISE_KEYWORD_GROUPS]
         
         # 地区关键词
-        self.location_patterns = [
-            r'苏州工业园区',
-            r'苏州园区',
-            r'园区',
-            r'苏州',
-            r'江苏'
-        ]
+        self.location_patterns = list(LOCATION_KEYWORDS)
+        
+        self._enterprise_res = [re.compile(p, re.IGNORECASE) for p in self.enterprise_patterns]
+        self._location_res = [re.compile(p, re.IGNORECASE) for p in self.location_patterns]
     
     def extract_enterprise_info(self, note: XHSNote) -> Dict[str, Any]:
         """从笔记中提取企业信息"""
@@ -59,14 +99,14 @@ class EnterpriseAnalyzer:
         }
         
         # 提取企业关键词
-        for pattern in self.enterprise_patterns:
-            matches = re.findall(pattern, title, re.IGNORECASE)
+        for regex in self._enterprise_res:
+            matches = regex.findall(title)
             if matches:
                 info['enterprise_keywords'].extend(matches)
         
         # 提取地区关键词
-        for pattern in self.location_patterns:
-            if re.search(pattern, title, re.IGNORECASE):
+        for pattern, regex in zip(self.location_patterns, self._location_res):
+            if regex.search(title):
                 info['location_keywords'].append(pattern)
         
         # 分类判断
@@ -81,22 +121,10 @@ class EnterpriseAnalyzer:
         """对笔记进行分类"""
         title_lower = title.lower()
         
-        if any(keyword in title_lower for keyword in ['招聘', '入职', '工作', '岗位', '职位', '面试']):
-            return 'recruitment'
-        elif any(keyword in title_lower for keyword in ['公司', '企业', '集团', '科技']):
-            return 'company'
-        elif any(keyword in title_lower for keyword in ['政策', '补贴', '扶持', '优惠']):
-            return 'policy'
-        elif any(keyword in title_lower for keyword in ['投资', '融资', '上市', 'ipo']):
-            return 'investment'
-        elif any(keyword in title_lower for keyword in ['ai', '人工智能', '大数据', '云计算']):
-            return 'technology'
-        elif any(keyword in title_lower for keyword in ['旅游', '攻略', '景点', '游玩']):
-            return 'tourism'
-        elif any(keyword in title_lower for keyword in ['生活', '居住', '房租', '租房']):
-            return 'lifestyle'
-        else:
-            return 'general'
+        for category, keywords in CATEGORY_KEYWORDS:
+            if any(keyword in title_lower for keyword in keywords):
+                return category
+        return DEFAULT_CATEGORY
     
     def _calculate_confidence(self, title: str, info: Dict[str, Any]) -> float:
         """计算企业相关性置信度"""
@@ -107,17 +135,7 @@ class EnterpriseAnalyzer:
         confidence += len(info['location_keywords']) * 0.2
         
         # 基于分类
-        category_weights = {
-            'company': 0.8,
-            'recruitment': 0.7,
-            'technology': 0.6,
-            'investment': 0.6,
-            'policy': 0.5,
-            'tourism': 0.2,
-            'lifestyle': 0.1,
-            'general': 0.1
-        }
-        confidence += category_weights.get(info['category'], 0.1)
+        confidence += CATEGORY_WEIGHTS.get(info['category'], 0.1)
         
         # 基于热度（高热度内容更可能有价值）
         likes = info['likes']
@@ -130,75 +148,464 @@ class EnterpriseAnalyzer:
         
         return min(confidence, 1.0)  # 限制在0-1之间
 
-def analyze_enterprise_notes():
-    """分析数据库中的企业笔记"""
-    analyzer = EnterpriseAnalyzer()
+class OverlappingMatcher:
+    """把关键词编译成一个可重叠匹配的交替模式
     
-    with SessionLocal() as db:
-        # 获取所有笔记
-        notes = db.query(XHSNote).order_by(XHSNote.like_count.desc()).all()
-        
-        logger.info("开始分析 {} 条笔记", len(notes))
-        
-        # 分析每条笔记
-        results = []
-        for note in notes:
-            info = analyzer.extract_enterprise_info(note)
-            results.append(info)
-        
-        # 按置信度排序
-        results.sort(key=lambda x: x['confidence'], reverse=True)
-        
-        # 输出高价值企业信息
-        print("\n🏢 高价值企业相关笔记 (置信度 > 0.5):")
-        print("=" * 80)
-        
-        high_value_count = 0
-        for info in results:
-            if info['confidence'] > 0.5:
-                high_value_count += 1
-                print(f"\n{high_value_count}. {info['title']}")
-                print(f"   分类: {info['category']} | 置信度: {info['confidence']:.2f}")
-                print(f"   作者: {info['author']} | 热度: 👍{info['likes']} 💾{info['collects']} 💬{info['comments']}")
-                print(f"   企业关键词: {info['enterprise_keywords']}")
-                print(f"   地区关键词: {info['location_keywords']}")
-                print(f"   链接: {info['url']}")
-        
-        # 统计分析
-        print(f"\n📊 统计分析:")
-        print(f"总笔记数: {len(results)}")
-        print(f"高价值笔记数: {high_value_count}")
-        
-        # 按分类统计
-        category_stats = {}
-        for info in results:
-            category = info['category']
-            category_stats[category] = category_stats.get(category, 0) + 1
-        
-        print(f"\n📈 分类统计:")
-        for category, count in sorted(category_stats.items(), key=lambda x: x[1], reverse=True):
-            print(f"  {category}: {count} 条")
-        
-        # 推荐关注的企业信息
-        print(f"\n🎯 推荐关注的企业信息:")
-        company_notes = [info for info in results if info['category'] == 'company' and info['confidence'] > 0.6]
-        recruitment_notes = [info for info in results if info['category'] == 'recruitment' and info['confidence'] > 0.6]
-        tech_notes = [info for info in results if info['category'] == 'technology' and info['confidence'] > 0.6]
-        
-        if company_notes:
-            print(f"  🏢 企业信息: {len(company_notes)} 条")
-            for info in company_notes[:3]:
-                print(f"    - {info['title']} (👍{info['likes']})")
+    关键词按长度倒序放进零宽前瞻，finditer 在每个位置报告命中的最长关键词，
+    如"苏州工业园区"同时报告"苏州工业园区""工业园区""园区"。同一位置的更短关键词只可能是最长者的前缀，
+    co_matches[k] 即最长命中为 keywords[k] 时该位置命中的全部关键词下标
+    """
+    
+    def __init__(self, keywords: List[str], flags: int = 0):
+        self.keywords = sorted(set(keywords), key=len, reverse=True)
+        # 先用首字符集合快速排除不可能命中的位置；只用一个捕获组，每个关键词一个组会让 re 慢好几倍
+        first_chars = ''.join(sorted({kw[0] for kw in self.keywords}))
+        self.regex = re.compile(
+            '(?=[%s])(?=(%s))' % (re.escape(first_chars), '|'.join(map(re.escape, self.keywords))), flags
+        )
+        self._single = [re.compile(re.escape(kw), flags) for kw in self.keywords]
+        self._index = {kw: k for k, kw in enumerate(self.keywords)}
+        self.co_matches = [
+            [j for j, other in enumerate(self.keywords) if len(other) <= len(kw) and self._single[j].match(kw)]
+            for kw in self.keywords
+        ]
+    
+    def keyword_index(self, matched: str) -> int:
+        """命中文本对应的关键词下标（与交替模式一样取第一个匹配的关键词）"""
+        k = self._index.get(matched)
+        if k is None:
+            # 忽略大小写时命中文本与关键词的大小写不同（如 "Ai"、"İPO"），逐个比对
+            k = next(k for k, regex in enumerate(self._single) if regex.fullmatch(matched))
+        return k
+    
+    def scan(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """把所有文本以 \\x00 连接后只跑一遍 finditer，返回命中的 (文本下标, 关键词下标, 文本内位置)"""
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+        hits = [(m.start(), m.group(1)) for m in self.regex.finditer('\x00'.join(texts))]
+        pos = np.fromiter((start for start, _ in hits), dtype=np.int64, count=len(hits))
+        index: Dict[str, int] = {}
+        for _, matched in hits:
+            if matched not in index:
+                index[matched] = self.keyword_index(matched)
+        keyword = np.fromiter((index[matched] for _, matched in hits), dtype=np.int64, count=len(hits))
+        text = np.searchsorted(starts, pos, side='right') - 1
+        return text, keyword, pos - starts[text]
+
+def count_non_overlapping(text: np.ndarray, pos: np.ndarray, length: np.ndarray, n_texts: int) -> np.ndarray:
+    """按 findall 的规则（从左到右、不重叠）统计每条文本的匹配数；输入按 (文本, 位置) 升序"""
+    keep = np.ones(len(pos), dtype=bool)
+    overlap = (text[1:] == text[:-1]) & (pos[1:] < (pos + length)[:-1])
+    if overlap.any():
+        # 少见：同一模式的关键词首尾重叠（如"有限公司"与其中的"公司"），只对这些文本逐条处理
+        last_text, last_end = -1, 0
+        for i in np.flatnonzero(np.isin(text, text[1:][overlap])):
+            if text[i] != last_text:
+                last_text, last_end = text[i], 0
+            if pos[i] >= last_end:
+                last_end = pos[i] + length[i]
+            else:
+                keep[i] = False
+    return np.bincount(text[keep], minlength=n_texts)
+
+class BatchEnterpriseAnalyzer:
+    """企业信息批量分析器
+    
+    结果与 EnterpriseAnalyzer 逐条分析完全一致，但：
+    - 相同文本只分析一次；
+    - 企业 / 地区关键词合并为一个忽略大小写的交替模式，分类关键词合并为另一个，
+      各自在全部文本连接成的一个字符串上只扫描一遍；
+    - 每个企业模式的 findall 计数、地区 / 分类命中、置信度都在 NumPy 数组上向量化计算
+    """
+    
+    def __init__(self):
+        self._analyzer = EnterpriseAnalyzer()
         
-        if recruitment_notes:
-            print(f"  👔 招聘信息: {len(recruitment_notes)} 条")
-            for info in recruitment_notes[:3]:
-                print(f"    - {info['title']} (👍{info['likes']})")
+        self._matcher = OverlappingMatcher(
+            [kw for group in ENTERPRISE_KEYWORD_GROUPS for kw in group] + LOCATION_KEYWORDS, re.IGNORECASE
+        )
+        keywords, co_matches = self._matcher.keywords, self._matcher.co_matches
+        # [最长命中关键词, 企业模式] -> 该模式在此位置匹配到的关键词长度（findall 取交替中靠前的），0 表示不匹配
+        self._group_match_len = np.zeros((len(keywords), len(ENTERPRISE_KEYWORD_GROUPS)), dtype=np.int64)
+        self._location_bits = np.zeros(len(keywords), dtype=np.int64)
+        for k, matched in enumerate(co_matches):
+            matched_kws = {keywords[j] for j in matched}
+            for g, group in enumerate(ENTERPRISE_KEYWORD_GROUPS):
+                first = next((kw for kw in group if kw in matched_kws), None)
+                if first is not None:
+                    self._group_match_len[k, g] = len(first)
+            for i, kw in enumerate(LOCATION_KEYWORDS):
+                if kw in matched_kws:
+                    self._location_bits[k] |= 1 << i
+        self._popcount = np.array([bin(m).count('1') for m in range(1 << len(LOCATION_KEYWORDS))])
+        
+        self._category_matcher = OverlappingMatcher([kw for _, kws in CATEGORY_KEYWORDS for kw in kws])
+        category_keywords, co_matches = self._category_matcher.keywords, self._category_matcher.co_matches
+        self._category_bits = np.zeros(len(category_keywords), dtype=np.int64)
+        for k, matched in enumerate(co_matches):
+            for j in matched:
+                for i, (_, kws) in enumerate(CATEGORY_KEYWORDS):
+                    if category_keywords[j] in kws:
+                        self._category_bits[k] |= 1 << i
+        # 分类位图 -> 分类序号：最低位的分类优先，无命中为 general
+        n_categories = len(CATEGORY_KEYWORDS)
+        self._first_category = np.array(
+            [(m & -m).bit_length() - 1 if m else n_categories for m in range(1 << n_categories)]
+        )
+        categories = [name for name, _ in CATEGORY_KEYWORDS] + [DEFAULT_CATEGORY]
+        self._categories = np.array(categories, dtype=object)
+        self._category_weights = np.array([CATEGORY_WEIGHTS.get(c, 0.1) for c in categories])
+    
+    def score_texts(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """返回每条文本的 (企业关键词数, 地区关键词数, 分类序号)"""
+        n = len(texts)
+        
+        text, keyword, pos = self._matcher.scan(texts)
+        n_enterprise = np.zeros(n, dtype=np.int64)
+        for g in range(self._group_match_len.shape[1]):
+            length = self._group_match_len[keyword, g]
+            hit = length > 0
+            n_enterprise += count_non_overlapping(text[hit], pos[hit], length[hit], n)
+        location_mask = np.zeros(n, dtype=np.int64)
+        np.bitwise_or.at(location_mask, text, self._location_bits[keyword])
+        
+        # 分类按小写文本匹配；逐条 lower() 以免长度变化（如 "İ"）错开位置
+        text, keyword, _ = self._category_matcher.scan([t.lower() for t in texts])
+        category_mask = np.zeros(n, dtype=np.int64)
+        np.bitwise_or.at(category_mask, text, self._category_bits[keyword])
+        
+        return n_enterprise, self._popcount[location_mask], self._first_category[category_mask]
+    
+    def analyze_frame(self, df: pd.DataFrame, text_column: str = 'title', likes_column: str = 'likes',
+                      keywords: bool = False) -> pd.DataFrame:
+        """批量分析，返回附加了 category / confidence 等列的新 DataFrame
+        
+        Args:
+            df: 每行一条笔记，需包含文本列和点赞数列
+            text_column: 被分析的文本列（标题或正文）
+            likes_column: 点赞数列，缺失值按 0 处理
+            keywords: 是否同时输出 enterprise_keywords / location_keywords 列表列（逐条正则，较慢）
+        """
+        texts = df[text_column]
+        texts = texts.where(texts.notna(), '').astype(str)
+        codes, uniques = pd.factorize(texts)
+        uniques = list(uniques)
+        
+        n_enterprise, n_location, category = self.score_texts(uniques)
+        likes = pd.to_numeric(df[likes_column], errors='coerce').fillna(0).to_numpy()
         
-        if tech_notes:
-            print(f"  💻 技术信息: {len(tech_notes)} 条")
-            for info in tech_notes[:3]:
+        result = df.copy()
+        result['enterprise_hits'] = n_enterprise[codes]
+        result['location_hits'] = n_location[codes]
+        result['category'] = self._categories[category[codes]]
+        result['confidence'] = self.confidence(n_enterprise[codes], n_location[codes], category[codes], likes)
+        if keywords:
+            extracted = [self.extract_keywords(text) for text in uniques]
+            result['enterprise_keywords'] = [list(extracted[c][0]) for c in codes]
+            result['location_keywords'] = [list(extracted[c][1]) for c in codes]
+        return result
+    
+    def extract_keywords(self, text: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """单条文本的企业关键词 (前缀, 关键词) 与地区关键词，与 extract_enterprise_info 相同"""
+        enterprise_keywords = []
+        for regex in self._analyzer._enterprise_res:
+            enterprise_keywords.extend(regex.findall(text))
+        location_keywords = [pattern for pattern, regex in
+                             zip(self._analyzer.location_patterns, self._analyzer._location_res)
+                             if regex.search(text)]
+        return enterprise_keywords, location_keywords
+    
+    def extract_entities(self, text: str) -> List[Dict[str, Any]]:
+        """文本中每个关键词出现的位置，行格式与 doc_entities 表一致（不含 doc_id）
+        
+        文档的分析文本为 标题 + 换行 + 正文，start / end 是在该文本中的偏移
+        """
+        entities = []
+        for ent_type, regex in zip(ENTERPRISE_ENTITY_TYPES, self._analyzer._enterprise_res):
+            for m in regex.finditer(text):
+                entities.append({'ent_type': ent_type, 'ent_text': m.group(2), 'start': m.start(2), 'end': m.end(2)})
+        for regex in self._analyzer._location_res:
+            for m in regex.finditer(text):
+                entities.append({'ent_type': LOCATION_ENTITY_TYPE, 'ent_text': m.group(), 'start': m.start(), 'end': m.end()})
+        return entities
+    
+    def confidence(self, n_enterprise: np.ndarray, n_location: np.ndarray, category: np.ndarray,
+                   likes: np.ndarray) -> np.ndarray:
+        """向量化的置信度计算，运算顺序与 EnterpriseAnalyzer._calculate_confidence 相同（浮点结果逐位一致）"""
+        confidence = np.zeros(len(n_enterprise))
+        confidence += n_enterprise * 0.3
+        confidence += n_location * 0.2
+        confidence += self._category_weights[category]
+        confidence += np.select([likes > 1000, likes > 500, likes > 100], [0.3, 0.2, 0.1], 0.0)
+        return np.minimum(confidence, 1.0)
+
+# 分析用到的列（不读 raw_json 等大字段），别名与 extract_enterprise_info 的结果键一致
+NOTE_COLUMNS = {
+    'note_id': XHSNote.note_id,
+    'title': XHSNote.title,
+    'author': XHSNote.user_name,
+    'likes': XHSNote.like_count,
+    'collects': XHSNote.collect_count,
+    'comments': XHSNote.comment_count,
+    'url': XHSNote.url,
+}
+
+# 推荐关注的分类（置信度 > 0.6）
+RECOMMEND_CATEGORIES = [('company', '🏢 企业信息'), ('recruitment', '👔 招聘信息'), ('technology', '💻 技术信息')]
+
+def notes_frame(rows) -> pd.DataFrame:
+    """NOTE_COLUMNS 顺序的行转为 DataFrame，空值处理与 extract_enterprise_info 一致"""
+    frame = pd.DataFrame.from_records(rows, columns=list(NOTE_COLUMNS))
+    frame['title'] = frame['title'].where(frame['title'].notna(), '').astype(str)
+    for column in ('likes', 'collects', 'comments'):
+        frame[column] = frame[column].fillna(0).astype('int64')
+    return frame
+
+def iter_note_frames(db, chunk_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """按点赞数倒序分块读取笔记，每块 chunk_size 行
+    
+    只查询 NOTE_COLUMNS，并用 yield_per 走服务端游标，内存占用与表大小无关
+    """
+    stmt = (
+        select(*(column.label(name) for name, column in NOTE_COLUMNS.items()))
+        .order_by(XHSNote.like_count.desc())
+        .execution_options(yield_per=chunk_size)
+    )
+    for rows in db.execute(stmt).partitions():
+        yield notes_frame(rows)
+
+class TopK:
+    """按置信度保留前 k 条（最小堆）；同分时先到的优先，与对全部结果做稳定排序的结果一致"""
+    
+    def __init__(self, k: int):
+        self.k = k
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = 0
+    
+    def push_frame(self, frame: pd.DataFrame) -> None:
+        if self.k <= 0 or frame.empty:
+            return
+        # 块内先取前 k 条（稳定排序保持到达顺序），避免逐行入堆
+        frame = frame.sort_values('confidence', ascending=False, kind='stable').head(self.k)
+        for record in frame.to_dict('records'):
+            self._seq += 1
+            item = (record['confidence'], -self._seq, record)
+            if len(self._heap) < self.k:
+                heapq.heappush(self._heap, item)
+            elif item[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, item)
+    
+    def items(self) -> List[Dict[str, Any]]:
+        return [record for _, _, record in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+
+@dataclass
+class AnalysisSummary:
+    """流式分析的汇总结果"""
+    total: int = 0
+    high_value: int = 0
+    category_counts: Counter = field(default_factory=Counter)
+    top: List[Dict[str, Any]] = field(default_factory=list)  # 置信度 > 0.5 的前 top_k 条
+    recommend_counts: Counter = field(default_factory=Counter)
+    recommend_top: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+
+def analyze_notes_streaming(db, top_k: int = 50, chunk_size: int = 5000,
+                            analyzer: BatchEnterpriseAnalyzer = None) -> AnalysisSummary:
+    """分块打分，只保留计数和前 top_k 条，内存占用与笔记总数无关"""
+    analyzer = analyzer or BatchEnterpriseAnalyzer()
+    summary = AnalysisSummary()
+    top = TopK(top_k)
+    recommend = {category: TopK(3) for category, _ in RECOMMEND_CATEGORIES}
+    
+    for frame in iter_note_frames(db, chunk_size):
+        scored = analyzer.analyze_frame(frame)
+        summary.total += len(scored)
+        summary.category_counts.update(scored['category'].value_counts().to_dict())
+        
+        high_value = scored[scored['confidence'] > 0.5]
+        summary.high_value += len(high_value)
+        top.push_frame(high_value)
+        
+        for category, heap in recommend.items():
+            selected = high_value[(high_value['category'] == category) & (high_value['confidence'] > 0.6)]
+            summary.recommend_counts[category] += len(selected)
+            heap.push_frame(selected)
+        logger.debug("已分析 {} 条笔记", summary.total)
+    
+    # 关键词列表只为最终输出的笔记计算
+    summary.top = top.items()
+    for info in summary.top:
+        info['enterprise_keywords'], info['location_keywords'] = analyzer.extract_keywords(info['title'])
+    summary.recommend_top = {category: heap.items() for category, heap in recommend.items()}
+    return summary
+
+def analyze_enterprise_notes(top_k: int = 50, chunk_size: int = 5000):
+    """分析数据库中的企业笔记（流式，只输出置信度最高的 top_k 条）"""
+    with SessionLocal() as db:
+        logger.info("开始流式分析笔记（每块 {} 条）", chunk_size)
+        summary = analyze_notes_streaming(db, top_k, chunk_size)
+    
+    # 输出高价值企业信息
+    print(f"\n🏢 高价值企业相关笔记 (置信度 > 0.5，前 {top_k} 条):")
+    print("=" * 80)
+    
+    for rank, info in enumerate(summary.top, 1):
+        print(f"\n{rank}. {info['title']}")
+        print(f"   分类: {info['category']} | 置信度: {info['confidence']:.2f}")
+        print(f"   作者: {info['author']} | 热度: 👍{info['likes']} 💾{info['collects']} 💬{info['comments']}")
+        print(f"   企业关键词: {info['enterprise_keywords']}")
+        print(f"   地区关键词: {info['location_keywords']}")
+        print(f"   链接: {info['url']}")
+    
+    # 统计分析
+    print(f"\n📊 统计分析:")
+    print(f"总笔记数: {summary.total}")
+    print(f"高价值笔记数: {summary.high_value}")
+    
+    # 按分类统计
+    print(f"\n📈 分类统计:")
+    for category, count in summary.category_counts.most_common():
+        print(f"  {category}: {count} 条")
+    
+    # 推荐关注的企业信息
+    print(f"\n🎯 推荐关注的企业信息:")
+    for category, label in RECOMMEND_CATEGORIES:
+        if summary.recommend_counts[category]:
+            print(f"  {label}: {summary.recommend_counts[category]} 条")
+            for info in summary.recommend_top[category]:
                 print(f"    - {info['title']} (👍{info['likes']})")
 
+# ------------------------------------------------------------
+# 分析结果落库（增量）
+# ------------------------------------------------------------
+
+def _likes_bucket(likes):
+    """置信度只关心点赞数落在哪个档位，档位不变时点赞数变化不需要重新打分"""
+    likes = func.coalesce(likes, 0)
+    return case((likes > 1000, 3), (likes > 500, 2), (likes > 100, 1), else_=0)
+
+# 小红书文档的 raw_json 是搜索接口的笔记项，点赞数可能是字符串（如「1.2万」），非纯数字按 0 处理
+_LIKED_COUNT = Document.raw_json[('note_card', 'interact_info', 'liked_count')].astext
+DOCUMENT_LIKES = case((_LIKED_COUNT.regexp_match(r'^\d{1,9}$'), cast(_LIKED_COUNT, Integer)), else_=0)
+
+# 分析输入（标题 + 正文 + 点赞档位）的哈希在数据库端计算，筛选时无需把内容读回 Python
+DOCUMENT_HASH = func.md5(
+    func.coalesce(Document.title, '') + '\n' + Document.content + '|' + cast(_likes_bucket(DOCUMENT_LIKES), String)
+)
+
+def _analysis_join(source_type: str, source_id):
+    return and_(DocAnalysis.source_type == source_type, DocAnalysis.source_id == source_id)
+
+@dataclass
+class PersistStats:
+    """一次增量分析的统计"""
+    scored: int = 0
+    unchanged: int = 0  # 被标记为待处理但内容哈希未变，只标记完成
+    entities: int = 0
+
+def _next_pending_document_ids(db, last_id: int, batch_size: int, verify_hashes: bool = False) -> List[int]:
+    """id 大于 last_id 的下一批待分析文档（按 id 键集分页）
+
+    默认只看 processed 为 false / NULL 的文档，走 processed 列索引，耗时与新增 / 变化的文档数成正比；
+    verify_hashes 时另外找出内容哈希与上次分析不同的文档（需逐行计算 md5，全表扫描）
+    """
+    condition = or_(Document.processed == false(), Document.processed.is_(None))
+    stmt = select(Document.id)
+    if verify_hashes:
+        stmt = stmt.outerjoin(DocAnalysis, _analysis_join('document', Document.id))
+        condition = or_(condition, DocAnalysis.content_hash.is_distinct_from(DOCUMENT_HASH))
+    return list(db.scalars(stmt.where(condition, Document.id > last_id).order_by(Document.id).limit(batch_size)))
+
+def _upsert_analyses(db, source_type: str, scored: pd.DataFrame) -> None:
+    stmt = insert(DocAnalysis)
+    stmt = stmt.on_conflict_do_update(
+        constraint='uq_doc_analysis',
+        set_={c: stmt.excluded[c] for c in
+              ('category', 'confidence', 'enterprise_keywords', 'location_keywords', 'content_hash')}
+        | {'analyzed_at': func.now()},
+    )
+    db.execute(stmt, [
+        {
+            'source_type': source_type,
+            'source_id': int(row.source_id),
+            'category': row.category,
+            'confidence': float(row.confidence),
+            'enterprise_keywords': [list(kw) for kw in row.enterprise_keywords],
+            'location_keywords': row.location_keywords,
+            'content_hash': row.content_hash,
+        }
+        for row in scored.itertuples(index=False)
+    ])
+
+def persist_document_analysis(db, analyzer: BatchEnterpriseAnalyzer, batch_size: int = 200,
+                              verify_hashes: bool = False) -> PersistStats:
+    """增量分析 documents（标题 + 正文），写入 doc_analyses 与 doc_entities，并分批标记 processed
+    
+    小红书笔记经 document_sink 投影为 source = 'xhs' 的文档，在这里一并分析（点赞数取自 raw_json），
+    不再单独扫描 xhs_notes
+    """
+    stats = PersistStats()
+    last_id = 0
+    while True:
+        ids = _next_pending_document_ids(db, last_id, batch_size, verify_hashes)
+        if not ids:
+            break
+        last_id = ids[-1]
+        rows = db.execute(
+            select(Document.id, Document.title, Document.content, DOCUMENT_LIKES.label('likes'),
+                   DOCUMENT_HASH.label('content_hash'), DocAnalysis.content_hash.label('previous_hash'))
+            .outerjoin(DocAnalysis, _analysis_join('document', Document.id))
+            .where(Document.id.in_(ids))
+        ).all()
+        # 重新入库但内容未变的文档直接标记完成
+        changed = [row for row in rows if row.content_hash != row.previous_hash]
+        stats.unchanged += len(rows) - len(changed)
+        if changed:
+            frame = pd.DataFrame({
+                'source_id': [row.id for row in changed],
+                'text': [(row.title or '') + '\n' + row.content for row in changed],
+                'likes': [row.likes for row in changed],
+                'content_hash': [row.content_hash for row in changed],
+            })
+            scored = analyzer.analyze_frame(frame, text_column='text', keywords=True)
+            _upsert_analyses(db, 'document', scored)
+            
+            changed_ids = [row.id for row in changed]
+            entity_types = ENTERPRISE_ENTITY_TYPES + [LOCATION_ENTITY_TYPE]
+            db.execute(delete(DocEntity).where(DocEntity.doc_id.in_(changed_ids), DocEntity.ent_type.in_(entity_types)))
+            entities = [
+                {'doc_id': doc_id, **entity}
+                for doc_id, text in zip(frame['source_id'], frame['text'])
+                for entity in analyzer.extract_entities(text)
+            ]
+            if entities:
+                db.execute(insert(DocEntity), entities)
+            stats.scored += len(changed)
+            stats.entities += len(entities)
+        # 分析结果、实体与 processed 标记在同一事务中提交
+        db.execute(update(Document).where(Document.id.in_(ids)).values(processed=True))
+        db.commit()
+    return stats
+
+def persist_analysis(verify_hashes: bool = False) -> None:
+    """分析流水线的落库阶段：只处理新增 / 变化的文档（含投影到 documents 的小红书笔记）"""
+    analyzer = BatchEnterpriseAnalyzer()
+    with SessionLocal() as db:
+        documents = persist_document_analysis(db, analyzer, verify_hashes=verify_hashes)
+    logger.success(
+        "分析完成：文档 {} 条（内容未变 {} 条），实体 {} 个",
+        documents.scored, documents.unchanged, documents.entities,
+    )
+
 if __name__ == "__main__":
-    analyze_enterprise_notes() 
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="小红书笔记企业信息分析")
+    parser.add_argument("--top", type=int, default=50, help="输出置信度最高的前 N 条高价值笔记")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="每次从数据库读取的行数")
+    parser.add_argument("--persist", action="store_true", help="增量分析新增 / 变化的文档（含小红书笔记）并写入 doc_analyses")
+    parser.add_argument("--verify-hashes", action="store_true", help="配合 --persist：全表比对文档内容哈希")
+    args = parser.parse_args()
+    if args.persist:
+        persist_analysis(args.verify_hashes)
+    else:
+        analyze_enterprise_notes(args.top, args.chunk_size)
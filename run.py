@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+"""
+采集服务入口：启动 APScheduler 调度器，按计划运行全部采集任务
+
+用法:
+    python run.py            # 前台常驻运行
+    python run.py --list     # 查看任务与下次执行时间
+"""
+
+import sys
+
+sys.path.insert(0, '.')
+
+from app.config import init_db
+from app.scheduler import main
+
+if __name__ == "__main__":
+    init_db()
+    main()
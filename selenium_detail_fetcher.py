@@ -5,144 +5,153 @@
 """
 
 import sys
-import time
-import random
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from loguru import logger
+from sqlalchemy import update
 
 sys.path.insert(0, '.')
 
+from app.tasks.browser_factory import create_browser
+from app.tasks.browser_pool import BrowserPool, cookie_primer, is_crash
+from app.tasks.browser_wait import wait_for_selector
+from app.tasks.cookie_pool import default_cookie_pool
+from app.tasks.document_sink import sync_after_write
+from app.tasks.rate_control import PolitenessDelay
+from app.tasks.xiaohongshu_scraper import load_cookies
+
+XHS_HOME = "https://www.xiaohongshu.com"
+NOTE_READY_SELECTOR = '.note-content, #detail-desc, .desc, [class*="desc"]'
+
+_politeness = PolitenessDelay(interval=3, jitter=3)
+
 def create_driver():
-    """创建Chrome驱动"""
-    options = Options()
-    options.add_argument('--headless')  # 无头模式
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1920,1080')
-    options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    
+    """创建浏览器驱动（无头，fast 档位屏蔽图片等资源；后端由 settings.browser_backend 决定）"""
     try:
-        driver = webdriver.Chrome(options=options)
-        return driver
+        return create_browser(
+            account="xhs",
+            headless=True,
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        )
     except Exception as e:
         logger.error("创建Chrome驱动失败: {}", e)
         return None
 
-def get_note_content_selenium(note_id: str, cookie: str) -> str:
+def extract_note_content(driver, note_id: str) -> str:
     """
-    使用Selenium获取笔记内容
+    用已注入Cookie的浏览器打开笔记页并提取正文
+    页面超时返回空串；会话失效类异常向上抛出，由浏览器池替换实例
     """
-    driver = create_driver()
-    if not driver:
-        return ""
+    url = f"{XHS_HOME}/explore/{note_id}"
+    logger.info("访问笔记页面: {}", url)
     
     try:
-        # 访问笔记页面
-        url = f"https://www.xiaohongshu.com/explore/{note_id}"
-        logger.info("访问笔记页面: {}", url)
-        
-        # 设置Cookie
-        driver.get("https://www.xiaohongshu.com")
-        
-        # 解析Cookie字符串并设置
-        cookie_pairs = cookie.split('; ')
-        for pair in cookie_pairs:
-            if '=' in pair:
-                name, value = pair.split('=', 1)
-                try:
-                    driver.add_cookie({
-                        'name': name.strip(),
-                        'value': value.strip(),
-                        'domain': '.xiaohongshu.com'
-                    })
-                except Exception as e:
-                    logger.debug("设置Cookie失败: {} - {}", name, e)
-        
-        # 访问目标页面
         driver.get(url)
-        
-        # 等待页面加载
-        wait = WebDriverWait(driver, 10)
-        
-        # 尝试多种选择器找到笔记内容
-        content_selectors = [
-            '.note-content',
-            '.content',
-            '.desc',
-            '[class*="desc"]',
-            '[class*="content"]',
-            '.note-text',
-            '.text-content',
-            'span[class*="text"]',
-            'div[class*="text"]'
-        ]
-        
-        content = ""
-        for selector in content_selectors:
-            try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    for element in elements:
-                        text = element.text.strip()
-                        if text and len(text) > 10:  # 过滤太短的文本
-                            content += text + "\n"
-                    if content:
-                        break
-            except Exception as e:
-                logger.debug("选择器 {} 失败: {}", selector, e)
-        
-        # 如果还没找到内容，尝试获取页面中的所有文本
-        if not content:
-            try:
-                # 获取页面标题作为备选
-                title_element = driver.find_element(By.TAG_NAME, "title")
-                if title_element:
-                    content = title_element.get_attribute("textContent") or ""
-            except:
-                pass
-        
-        if content:
-            logger.success("成功获取笔记内容: {} 字符", len(content))
-            return content.strip()
-        else:
-            logger.warning("未找到笔记内容")
-            return ""
-            
     except TimeoutException:
         logger.warning("页面加载超时")
         return ""
+    
+    # eager 加载下正文由前端渲染，等任一正文容器出现（最长 8 秒）
+    wait_for_selector(driver, NOTE_READY_SELECTOR, timeout=8)
+    
+    # 尝试多种选择器找到笔记内容
+    content_selectors = [
+        '.note-content',
+        '.content',
+        '.desc',
+        '[class*="desc"]',
+        '[class*="content"]',
+        '.note-text',
+        '.text-content',
+        'span[class*="text"]',
+        'div[class*="text"]'
+    ]
+    
+    content = ""
+    for selector in content_selectors:
+        try:
+            elements = driver.find_elements(By.CSS_SELECTOR, selector)
+            if elements:
+                for element in elements:
+                    text = element.text.strip()
+                    if text and len(text) > 10:  # 过滤太短的文本
+                        content += text + "\n"
+                if content:
+                    break
+        except WebDriverException as e:
+            if is_crash(e):
+                raise
+            logger.debug("选择器 {} 失败: {}", selector, e)
+    
+    # 如果还没找到内容，尝试获取页面中的所有文本
+    if not content:
+        try:
+            # 获取页面标题作为备选
+            title_element = driver.find_element(By.TAG_NAME, "title")
+            if title_element:
+                content = title_element.get_attribute("textContent") or ""
+        except WebDriverException as e:
+            if is_crash(e):
+                raise
+    
+    if content:
+        logger.success("成功获取笔记内容: {} 字符", len(content))
+        return content.strip()
+    logger.warning("未找到笔记内容")
+    return ""
+
+def create_xhs_pool(cookie: str, size: int = None) -> BrowserPool:
+    """创建已注入小红书Cookie的浏览器池（每个实例只打开一次首页、设置一次Cookie）"""
+    return BrowserPool(
+        create_driver,
+        size,
+        primer=cookie_primer(cookie, XHS_HOME, ".xiaohongshu.com"),
+    )
+
+def get_note_content_selenium(note_id: str, cookie: str) -> str:
+    """
+    使用Selenium获取单条笔记内容（临时启动一个浏览器，批量场景请用浏览器池）
+    """
+    pool = create_xhs_pool(cookie, size=1)
+    try:
+        with pool:
+            with pool.browser() as driver:
+                return extract_note_content(driver, note_id)
     except Exception as e:
         logger.error("获取笔记内容失败: {}", e)
         return ""
-    finally:
-        driver.quit()
 
-def update_note_content_batch():
+def _fetch_with_pool(pool: BrowserPool, note_id: str) -> str:
+    with pool.browser() as driver:
+        # 单个浏览器的请求间隔，避免被限制；只补足距该浏览器上次访问的剩余时间
+        _politeness.wait(id(driver))
+        return extract_note_content(driver, note_id)
+
+def update_note_content_batch(limit: int = 200, pool_size: int = None, commit_every: int = 20):
     """
     批量更新数据库中笔记的内容
+    N 个常驻浏览器并行处理，结果每 commit_every 条批量写回一次
     """
     from app.config import SessionLocal
     from app.models import XHSNote
     
-    # 读取Cookie
+    # 从账号池取当前最健康、未被隔离的账号
     try:
-        with open("app/tasks/cookies/xhs_cookies.txt", 'r') as f:
-            cookie = f.read().strip()
-    except:
+        cookie = default_cookie_pool(load_cookies()).acquire()
+    except (OSError, ValueError):
         logger.error("无法读取Cookie文件")
         return
+    if cookie is None:
+        logger.error("所有 Cookie 账号均在隔离中，稍后再试")
+        return
     
     with SessionLocal() as db:
         # 获取没有内容的笔记
-        notes_without_content = db.query(XHSNote).filter(
+        notes_without_content = db.query(XHSNote.id, XHSNote.note_id).filter(
             (XHSNote.desc.is_(None)) | (XHSNote.desc == "")
-        ).limit(5).all()  # 限制5条，避免过多请求
+        ).order_by(XHSNote.id).limit(limit).all()
         
         if not notes_without_content:
             logger.info("所有笔记都已有内容")
@@ -151,22 +160,45 @@ def update_note_content_batch():
         logger.info("找到 {} 条需要更新内容的笔记", len(notes_without_content))
         
         updated_count = 0
-        for note in notes_without_content:
-            logger.info("正在获取笔记 {} 的内容...", note.note_id)
-            
-            content = get_note_content_selenium(str(note.note_id), cookie)
-            
-            if content:
-                # 更新笔记内容
-                db.query(XHSNote).filter(XHSNote.note_id == note.note_id).update({"desc": content})
+        pending = []
+        pending_note_ids = []
+        
+        def flush():
+            nonlocal updated_count
+            if pending:
+                db.execute(update(XHSNote), pending)
                 db.commit()
-                updated_count += 1
-                logger.success("已更新笔记 {} 的内容", note.note_id)
-            else:
-                logger.warning("无法获取笔记 {} 的内容", note.note_id)
-            
-            # 添加延迟避免被限制
-            time.sleep(random.uniform(3, 6))
+                # 正文更新后同步到 documents
+                sync_after_write(db, "xhs", pending_note_ids)
+                updated_count += len(pending)
+                pending.clear()
+                pending_note_ids.clear()
+        
+        pool = create_xhs_pool(cookie, pool_size)
+        try:
+            with pool, ThreadPoolExecutor(max_workers=pool.size) as executor:
+                futures = {
+                    executor.submit(_fetch_with_pool, pool, str(note_id)): (pk, note_id)
+                    for pk, note_id in notes_without_content
+                }
+                for future in as_completed(futures):
+                    pk, note_id = futures[future]
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        logger.warning("获取笔记 {} 的内容失败: {}", note_id, e)
+                        continue
+                    if content:
+                        pending.append({"id": pk, "desc": content})
+                        pending_note_ids.append(note_id)
+                        logger.success("已获取笔记 {} 的内容", note_id)
+                    else:
+                        logger.warning("无法获取笔记 {} 的内容", note_id)
+                    if len(pending) >= commit_every:
+                        flush()
+        finally:
+            flush()
+            pool.log_metrics()
         
         logger.success("批量更新完成，共更新 {} 条笔记", updated_count)
 
@@ -205,13 +237,15 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="使用Selenium获取小红书笔记详情")
     parser.add_argument("--test", action="store_true", help="测试单个笔记")
     parser.add_argument("--batch", action="store_true", help="批量更新笔记内容")
+    parser.add_argument("--limit", type=int, default=200, help="批量模式最多处理的笔记数")
+    parser.add_argument("--pool-size", type=int, default=None, help="浏览器实例数，默认取配置 BROWSER_POOL_SIZE")
     
     args = parser.parse_args()
     
     if args.test:
         test_single_note()
     elif args.batch:
-        update_note_content_batch()
+        update_note_content_batch(limit=args.limit, pool_size=args.pool_size)
     else:
         logger.info("请使用 --test 测试单个笔记或 --batch 批量更新")
         logger.info("示例: python selenium_detail_fetcher.py --test") 
\ No newline at end of file
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 简化版小红书爬虫 - 苏州工业园区企业信息抓取
-使用已知的 search_id，只需要更新 Cookie 即可使用
+search_id 通过持久化缓存获取（见 app/tasks/search_id_cache.py），只需要更新 Cookie 即可使用
+Cookie 文件一行一个账号，请求从账号池（见 app/tasks/cookie_pool.py）取最健康的账号，461 / 406 时自动换号
 """
 
 import sys
@@ -9,23 +10,19 @@ import requests
 import json
 import time
 import random
-from datetime import datetime
 
 # 添加项目路径
 sys.path.insert(0, '.')
 
-from app.tasks.xiaohongshu_scraper import gen_sign, HEADERS_BASE, save_notes
+from app.tasks.xiaohongshu_scraper import (
+    gen_sign, get_search_id, invalidate_search_id, load_cookies, note_from_search_item, note_id_of, upsert_note_rows,
+    NewNoteFilter, HEADERS_BASE, DEFAULT_COOKIE_FILE
+)
+from app.tasks.cookie_pool import QUARANTINE_STATUSES, CookiePool, default_cookie_pool
 from app.config import SessionLocal
 from loguru import logger
 
-# 已知有效的 search_id (从 Selenium 获取)
-KNOWN_SEARCH_IDS = {
-    "苏州企业": "2f1qtm0ubz1h34wcpu61a",
-    "苏州工业园区": "2f1qto8pgfgzd6r2jq4oq", 
-    "苏州工业园区企业": "2f1qtp92hrr3ipjoraa07",
-}
-
-# 关键词映射 - 将相似关键词映射到已知的 search_id
+# 关键词映射 - 将相似关键词映射到同一个 search_id 缓存项
 KEYWORD_MAPPING = {
     "苏州工业园区人工智能": "苏州工业园区",
     "苏州工业园区AI": "苏州工业园区",
@@ -35,9 +32,10 @@ KEYWORD_MAPPING = {
     "苏州园区AI": "苏州工业园区",
 }
 
-def get_note_detail(note_id: str, cookie: str) -> dict:
+def get_note_detail(note_id: str, pool: CookiePool) -> dict:
     """
     获取笔记详情，包括正文内容
+    每次尝试从账号池取一个账号；406 / 461 时该账号被隔离，下一次尝试换号
     """
     detail_url = "https://edith.xiaohongshu.com/api/sns/web/v1/feed"
     
@@ -51,45 +49,46 @@ def get_note_detail(note_id: str, cookie: str) -> dict:
         # 添加随机延迟，避免请求过快
         time.sleep(random.uniform(2, 4))
         
-        sign_headers = gen_sign(detail_url, payload, cookie)
-        
-        # 确保所有 header 值都是字符串
-        for key, value in sign_headers.items():
-            if not isinstance(value, str):
-                sign_headers[key] = str(value)
-        
-        headers = {**HEADERS_BASE, **sign_headers, "cookie": cookie}
-        
         # 添加更多重试和延迟
         for attempt in range(3):  # 增加到3次重试
+            cookie = pool.acquire()
+            if cookie is None:
+                logger.warning("所有账号均在隔离中，跳过详情获取")
+                break
+            
+            sign_headers = gen_sign(detail_url, payload, cookie)
+            
+            # 确保所有 header 值都是字符串
+            for key, value in sign_headers.items():
+                if not isinstance(value, str):
+                    sign_headers[key] = str(value)
+            
+            headers = {**HEADERS_BASE, **sign_headers, "cookie": cookie}
+            
             try:
                 response = requests.post(detail_url, json=payload, headers=headers, timeout=20)
                 
                 if response.status_code == 200:
                     data = response.json()
+                    pool.report(cookie, 200, ok=bool(data.get("success", True)))
                     if data.get("success", True):
                         logger.info("成功获取笔记 {} 详情", note_id)
                         return data.get("data", {})
                     else:
                         logger.debug("获取笔记详情失败: {}", data.get("msg", "未知错误"))
-                elif response.status_code == 406:
-                    logger.warning("笔记详情API被限制，等待更长时间后重试...")
-                    if attempt < 2:  # 不是最后一次尝试
-                        time.sleep(random.uniform(5, 10))  # 等待5-10秒
-                        continue
-                    else:
-                        logger.warning("笔记详情API持续被限制，跳过详情获取")
-                        break
-                elif response.status_code == 461:
-                    logger.warning("签名验证失败，可能需要更新Cookie")
-                    break
                 else:
+                    pool.report(cookie, response.status_code)
+                    if response.status_code in (406, 461):
+                        # 账号已被隔离，立即换号重试
+                        logger.warning("笔记详情API返回 {}，换账号重试", response.status_code)
+                        continue
                     logger.debug("获取笔记详情HTTP错误: {}", response.status_code)
                     
                 if attempt < 2:  # 如果不是最后一次尝试
                     time.sleep(random.uniform(3, 6))  # 等待后重试
                     
             except requests.exceptions.RequestException as e:
+                pool.report(cookie, 0)
                 logger.debug("获取笔记详情请求异常: {}", str(e)[:100])
                 if attempt < 2:
                     time.sleep(random.uniform(3, 6))
@@ -99,30 +98,26 @@ def get_note_detail(note_id: str, cookie: str) -> dict:
     
     return {}
 
-def save_notes_safe(db, notes, cookie: str):
+def save_notes_safe(db, notes, pool: CookiePool, note_filter: NewNoteFilter = None):
     """
-    安全保存笔记到数据库，逐个处理避免批量失败
-    同时获取笔记详情内容
+    保存一页笔记到数据库，同时获取笔记详情内容
+    先用一次查询筛掉已入库的笔记，只为新笔记请求详情；已有笔记只刷新互动数
+    逐条解析（单条失败不影响其他笔记），整页一次批量 upsert 提交
     """
-    from app.models import XHSNote
+    if note_filter is None:
+        note_filter = NewNoteFilter(db)
+    new_notes, known_notes = note_filter.split(notes)
+    logger.info("本页 {} 条新笔记，{} 条已存在（跳过详情）", len(new_notes), len(known_notes))
     
-    saved_count = 0
-    for n in notes:
+    rows = [note_from_search_item(n) for n in known_notes]
+    for n in new_notes:
         try:
-            note_id = n.get("id") or n.get("note_id")
-            if not note_id:
-                continue
-                
-            # 检查是否已存在
-            existing_note = db.query(XHSNote).filter(XHSNote.note_id == note_id).first()
-            if existing_note:
-                logger.info("笔记 {} 已存在，跳过", note_id)
-                continue
+            note_id = note_id_of(n)
                 
             # 获取笔记详情（可选，如果失败则跳过）
             note_content = ""
             try:
-                detail_data = get_note_detail(note_id, cookie)
+                detail_data = get_note_detail(note_id, pool)
                 if detail_data.get("items"):
                     item = detail_data["items"][0]
                     note_detail = item.get("note_card", {})
@@ -131,80 +126,95 @@ def save_notes_safe(db, notes, cookie: str):
                 logger.warning("获取笔记 {} 详情失败，使用基本信息: {}", note_id, str(e)[:100])
             
             # 解析嵌套的JSON结构
-            note_card = n.get("note_card", {})
-            if not note_card:
+            row = note_from_search_item(n, note_content)
+            if not row:
                 continue
-                
-            # 提取标题
-            title = note_card.get("display_title", "")
-            
-            # 提取用户信息
-            user_info = note_card.get("user", {})
-            user_id = user_info.get("user_id", "")
-            user_name = user_info.get("nickname", "")
-            
-            # 提取互动信息
-            interact_info = note_card.get("interact_info", {})
-            
-            # 安全转换数字字段
-            def safe_int(value):
-                if isinstance(value, str):
-                    try:
-                        return int(value)
-                    except ValueError:
-                        return 0
-                return value if isinstance(value, int) else 0
-            
-            like_count = safe_int(interact_info.get("liked_count", 0))
-            collect_count = safe_int(interact_info.get("collected_count", 0))
-            comment_count = safe_int(interact_info.get("comment_count", 0))
-            
-            # 提取发布时间
-            publish_time = None
-            if n.get("publish_time"):
-                try:
-                    publish_time = datetime.fromtimestamp(n["publish_time"] / 1000)
-                except:
-                    pass
-            
-            # 构建笔记URL
-            url = f"https://www.xiaohongshu.com/explore/{note_id}"
-            
-            # 合并原始数据和详情数据
-            raw_json = n.copy()
-            
-            note = XHSNote(
-                note_id=note_id,
-                title=title,
-                desc=note_content,  # 使用从详情获取的正文内容
-                url=url,
-                user_id=user_id,
-                user_name=user_name,
-                like_count=like_count,
-                collect_count=collect_count,
-                comment_count=comment_count,
-                publish_time=publish_time,
-                raw_json=raw_json
-            )
-            
-            db.add(note)
-            db.commit()
-            saved_count += 1
+            rows.append(row)
             
             content_preview = note_content[:50] + "..." if len(note_content) > 50 else note_content
-            logger.info("保存笔记: {} - {} (点赞:{}, 收藏:{}, 评论:{}) 内容: {}", 
-                       note_id, title[:30], like_count, collect_count, comment_count, content_preview)
+            logger.info("解析笔记: {} - {} (点赞:{}, 收藏:{}, 评论:{}) 内容: {}", 
+                       note_id, row["title"][:30], row["like_count"], row["collect_count"],
+                       row["comment_count"], content_preview)
             
             # 添加延迟避免请求过快
             time.sleep(random.uniform(0.5, 1.0))
             
         except Exception as e:
-            logger.error("保存笔记失败: {}", str(e)[:200])
-            db.rollback()  # 回滚当前事务
+            logger.error("解析笔记失败: {}", str(e)[:200])
+            continue
+    
+    try:
+        stats = upsert_note_rows(db, rows)
+    except Exception as e:
+        logger.error("批量保存笔记失败: {}", str(e)[:200])
+        db.rollback()
+        return 0
+    
+    logger.success("成功保存 {} 条笔记（更新 {} 条）", stats.inserted, stats.updated)
+    return stats.inserted
+
+class AccountsUnavailable(Exception):
+    """账号池中所有账号都在隔离中"""
+
+
+class SearchRejected(Exception):
+    """搜索接口返回 success = false"""
+
+
+def search_page(api_url: str, payload: dict, pool: CookiePool, page: int):
+    """
+    请求一页搜索结果，成功时返回完整响应 JSON，失败返回 None
+    406 / 461 时该账号被隔离，换一个账号重试本页，最多尝试账号数次；
+    业务是否成功（success 字段）解析后再上报账号池，失败时抛出 SearchRejected
+    """
+    for _ in range(len(pool)):
+        cookie = pool.acquire(timeout=60)
+        if cookie is None:
+            raise AccountsUnavailable()
+        
+        # 生成签名
+        sign_headers = gen_sign(api_url, payload, cookie)
+        
+        # 确保所有 header 值都是字符串
+        for key, value in sign_headers.items():
+            if not isinstance(value, str):
+                sign_headers[key] = str(value)
+        
+        headers = {**HEADERS_BASE, **sign_headers, "cookie": cookie}
+        
+        try:
+            response = requests.post(api_url, json=payload, headers=headers, timeout=15)
+        except requests.exceptions.RequestException as e:
+            pool.report(cookie, 0)
+            logger.error("第 {} 页请求异常: {}", page, e)
+            return None
+        
+        if response.status_code in QUARANTINE_STATUSES:
+            # 账号已被隔离，换下一个健康账号重试本页
+            pool.report(cookie, response.status_code)
+            logger.warning("第 {} 页返回 {}，换账号重试", page, response.status_code)
             continue
+        
+        if response.status_code != 200:
+            pool.report(cookie, response.status_code)
+            logger.error("第 {} 页请求失败，状态码: {}", page, response.status_code)
+            return None
+        
+        try:
+            data = response.json()
+        except json.JSONDecodeError:
+            pool.report(cookie, 200, ok=False)
+            logger.error("第 {} 页响应不是有效JSON: {}", page, response.text[:200])
+            return None
+        
+        ok = bool(data.get("success", True))
+        pool.report(cookie, 200, ok=ok)
+        if not ok:
+            raise SearchRejected(data.get("msg", "未知错误"))
+        return data
     
-    logger.success("成功保存 {} 条笔记", saved_count)
-    return saved_count
+    logger.error("第 {} 页在 {} 个账号上均被拒绝，跳过", page, len(pool))
+    return None
 
 def scrape_xhs_notes(keyword: str, pages: int = 1, use_known_search_id: bool = True):
     """
@@ -213,15 +223,14 @@ def scrape_xhs_notes(keyword: str, pages: int = 1, use_known_search_id: bool = T
     Args:
         keyword: 搜索关键词
         pages: 抓取页数
-        use_known_search_id: 是否使用已知的 search_id
+        use_known_search_id: 是否携带 search_id（优先读取缓存）
     """
     
-    # 加载 Cookie
-    cookie_file = "app/tasks/cookies/xhs_cookies.txt"
+    # 加载 Cookie（一行一个账号）
+    cookie_file = DEFAULT_COOKIE_FILE
     try:
-        with open(cookie_file, 'r') as f:
-            cookie = f.read().strip()
-    except:
+        pool = default_cookie_pool(load_cookies(cookie_file))
+    except (OSError, ValueError):
         logger.error("无法读取 Cookie 文件: {}", cookie_file)
         logger.info("请按照 update_cookie_guide.md 更新 Cookie")
         return
@@ -229,12 +238,26 @@ def scrape_xhs_notes(keyword: str, pages: int = 1, use_known_search_id: bool = T
     logger.info("开始抓取小红书笔记")
     logger.info("关键词: {}", keyword)
     logger.info("页数: {}", pages)
-    logger.info("Cookie 长度: {}", len(cookie))
+    logger.info("Cookie 账号数: {}", len(pool))
     
     api_url = "https://edith.xiaohongshu.com/api/sns/web/v1/search/notes"
     total_notes = 0
     
+    # search_id 只解析一次：先查持久化缓存，未命中才会启动浏览器
+    search_id = None
+    search_keyword = KEYWORD_MAPPING.get(keyword, keyword)
+    if use_known_search_id:
+        if search_keyword != keyword:
+            logger.info("使用映射关键词 '{}' 的 search_id", search_keyword)
+        search_id = get_search_id(search_keyword, pool)
+        if search_id:
+            logger.info("使用 search_id: {}", search_id)
+        else:
+            logger.warning("关键词 '{}' 无法获取 search_id，将直接搜索", search_keyword)
+    
     with SessionLocal() as db:
+        # 跨页共享 seen-set，翻页结果重叠时不会重复请求详情
+        note_filter = NewNoteFilter(db)
         for page in range(1, pages + 1):
             logger.info("正在抓取第 {} 页...", page)
             
@@ -247,74 +270,51 @@ def scrape_xhs_notes(keyword: str, pages: int = 1, use_known_search_id: bool = T
                 "note_type": 0,  # 0=全部，1=视频，2=图文
             }
             
-            # 如果有已知的 search_id，使用它
-            search_keyword = keyword
-            if use_known_search_id:
-                # 首先检查是否有直接匹配的关键词
-                if keyword in KNOWN_SEARCH_IDS:
-                    payload["search_id"] = KNOWN_SEARCH_IDS[keyword]
-                    logger.info("使用已知 search_id: {}", KNOWN_SEARCH_IDS[keyword])
-                # 检查是否有映射的关键词
-                elif keyword in KEYWORD_MAPPING:
-                    mapped_keyword = KEYWORD_MAPPING[keyword]
-                    if mapped_keyword in KNOWN_SEARCH_IDS:
-                        payload["search_id"] = KNOWN_SEARCH_IDS[mapped_keyword]
-                        logger.info("使用映射关键词 '{}' 的 search_id: {}", mapped_keyword, KNOWN_SEARCH_IDS[mapped_keyword])
-                    else:
-                        logger.warning("映射关键词 '{}' 没有对应的 search_id", mapped_keyword)
-                else:
-                    logger.warning("关键词 '{}' 没有已知的 search_id，将尝试动态获取", keyword)
+            if search_id:
+                payload["search_id"] = search_id
             
-            # 生成签名
-            sign_headers = gen_sign(api_url, payload, cookie)
+            data = None
+            try:
+                # 带 search_id 被拒时去掉 search_id 重试本页一次
+                for _ in range(2):
+                    try:
+                        data = search_page(api_url, payload, pool, page)
+                        break
+                    except SearchRejected as e:
+                        logger.error("第 {} 页API返回错误: {}", page, e)
+                        if "search_id" not in payload:
+                            break
+                        # search_id 可能已失效：丢弃缓存，本页及后续页面直接搜索
+                        invalidate_search_id(search_keyword)
+                        search_id = None
+                        del payload["search_id"]
+                        logger.warning("第 {} 页去掉 search_id 重试", page)
+            except AccountsUnavailable:
+                logger.error("所有账号均在隔离中，停止抓取")
+                break
+            if data is None:
+                continue
             
-            # 确保所有 header 值都是字符串
-            for key, value in sign_headers.items():
-                if not isinstance(value, str):
-                    sign_headers[key] = str(value)
+            # 提取笔记列表
+            items = data.get("data", {}).get("items", [])
+            if not items:
+                logger.warning("第 {} 页无数据", page)
+                continue
             
-            headers = {**HEADERS_BASE, **sign_headers, "cookie": cookie}
+            logger.info("第 {} 页获取到 {} 条笔记", page, len(items))
             
-            # 发送请求
-            try:
-                response = requests.post(api_url, json=payload, headers=headers, timeout=15)
-                
-                if response.status_code != 200:
-                    logger.error("第 {} 页请求失败，状态码: {}", page, response.status_code)
-                    continue
-                
-                try:
-                    data = response.json()
-                except json.JSONDecodeError:
-                    logger.error("第 {} 页响应不是有效JSON: {}", page, response.text[:200])
-                    continue
-                
-                if not data.get("success", True):
-                    logger.error("第 {} 页API返回错误: {}", page, data.get("msg", "未知错误"))
-                    continue
-                
-                # 提取笔记列表
-                items = data.get("data", {}).get("items", [])
-                if not items:
-                    logger.warning("第 {} 页无数据", page)
-                    continue
-                
-                logger.info("第 {} 页获取到 {} 条笔记", page, len(items))
-                
-                # 保存笔记（包括获取详情内容）
-                saved_count = save_notes_safe(db, items, cookie)
-                total_notes += saved_count
-                
-                # 页面间延迟
-                if page < pages:
-                    delay = random.uniform(2, 4)
-                    logger.info("等待 {:.1f} 秒后继续...", delay)
-                    time.sleep(delay)
-                
-            except requests.exceptions.RequestException as e:
-                logger.error("第 {} 页请求异常: {}", page, e)
-                continue
+            # 保存笔记（包括获取详情内容）
+            saved_count = save_notes_safe(db, items, pool, note_filter)
+            total_notes += saved_count
+            
+            # 页面间延迟
+            if page < pages:
+                delay = random.uniform(2, 4)
+                logger.info("等待 {:.1f} 秒后继续...", delay)
+                time.sleep(delay)
     
+    pool.save()
+    pool.log_summary()
     logger.success("抓取完成！总共保存 {} 条笔记", total_notes)
 
 def main():
@@ -0,0 +1,38 @@
+"""embedding_worker：哈希编码器只在显式指定时使用，定时任务不会写入哈希向量。"""
+
+import sys
+
+sys.path.insert(0, '.')
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.scheduler import collector_jobs
+from app.tasks import embedding_worker
+from app.tasks.embedding_worker import HashingEncoder, create_encoder
+
+
+def test_hashing_encoder_is_deterministic_and_normalized():
+    vectors = HashingEncoder(dim=64).encode(["苏州工业园区", "苏州工业园区", ""])
+    assert np.allclose(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[2].any()
+
+
+def test_run_refuses_configured_hashing(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_model", "hashing")
+    with pytest.raises(RuntimeError, match="hashing"):
+        embedding_worker.run()
+
+
+def test_create_encoder_requires_model(monkeypatch):
+    monkeypatch.setattr(settings, "embedding_model", "")
+    with pytest.raises(RuntimeError, match="embedding_model"):
+        create_encoder()
+
+
+@pytest.mark.parametrize("model, scheduled", [("", False), ("hashing", False), ("some/model", True)])
+def test_embed_job_only_scheduled_with_real_model(monkeypatch, model, scheduled):
+    monkeypatch.setattr(settings, "embedding_model", model)
+    assert ("embed_documents" in {job.id for job in collector_jobs()}) is scheduled
@@ -0,0 +1,33 @@
+"""51Job 列表页：lxml / selectolax 后端的解析结果与 bs4 完全一致。"""
+
+import pathlib
+import sys
+
+sys.path.insert(0, '.')
+
+import pytest
+
+from app.tasks.job51_scraper import list_parsers, parse_list
+
+FIXTURES = sorted((pathlib.Path(__file__).parent / "fixtures" / "job51").glob("*.html"))
+FAST_BACKENDS = [b for b in list_parsers.backends() if b != "bs4"]
+
+
+def _read(path: pathlib.Path) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("fixture", FIXTURES, ids=lambda p: p.stem)
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+def test_backend_matches_bs4(fixture, backend):
+    html = _read(fixture)
+    assert parse_list(html, backend) == parse_list(html, "bs4")
+
+
+def test_fixture_rows():
+    jobs = parse_list(_read(FIXTURES[0].with_name("list_page.html")), "bs4")
+    assert len(jobs) == 6
+    assert jobs[1]["title"] == "计算机视觉工程师&研究员"
+    assert jobs[1]["company"] == "某某信息技术有限公司"
+    assert jobs[2]["location"] is None
+    assert jobs[3]["company"] is None and jobs[3]["post_date"] is None
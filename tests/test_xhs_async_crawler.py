@@ -0,0 +1,97 @@
+"""XHSAsyncCrawler：签名失败时请求计为失败，抓取正常结束；排序与 fetch_notes 一致，可按条件提前停止翻页。"""
+
+import asyncio
+import sys
+
+sys.path.insert(0, '.')
+
+from aiohttp import web
+
+from app.tasks.xhs_async_crawler import DETAIL_PATH, SEARCH_PATH, XHSAsyncCrawler
+from app.tasks.xhs_signer import SignWorkerError, StubSigner
+from app.tasks.xiaohongshu_scraper import SEARCH_SORT
+
+
+class FailingSigner(StubSigner):
+    """详情请求（或全部请求）签名时抛出 SignWorkerError。"""
+
+    def __init__(self, fail_paths=None):
+        self.fail_paths = fail_paths
+        self.calls = 0
+
+    def sign(self, url, payload, cookie):
+        self.calls += 1
+        if self.fail_paths is None or any(url.endswith(p) for p in self.fail_paths):
+            raise SignWorkerError("签名进程启动失败: stub")
+        return super().sign(url, payload, cookie)
+
+
+def stub_app(pages: int = 2, page_size: int = 10, requests=None) -> web.Application:
+    async def search(request):
+        body = await request.json()
+        if requests is not None:
+            requests.append(body)
+        page = body["page"]
+        items = [{"id": f"n{page}-{i}", "note_card": {"display_title": "t"}} for i in range(page_size)]
+        return web.json_response({"success": True, "data": {"items": items, "has_more": page < pages}})
+
+    async def feed(request):
+        return web.json_response({"success": True, "data": {"items": [{"note_card": {"desc": "d"}}]}})
+
+    app = web.Application()
+    app.router.add_post(SEARCH_PATH, search)
+    app.router.add_post(DETAIL_PATH, feed)
+    return app
+
+
+async def _crawl(signer, app=None, crawl_kwargs=None, **kwargs):
+    runner = web.AppRunner(app or stub_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        crawler = XHSAsyncCrawler(
+            ["a=1", "a=2"], base_url=f"http://127.0.0.1:{port}", signer=signer,
+            per_account_rate=1000, detail_workers=1, **kwargs,
+        )
+        return crawler, await asyncio.wait_for(crawler.crawl("kw", **(crawl_kwargs or {})), timeout=10)
+    finally:
+        await runner.cleanup()
+
+
+def test_request_fails_when_signer_raises():
+    crawler = XHSAsyncCrawler(["a=1"], signer=FailingSigner())
+
+    async def run():
+        crawler._init_slots()
+        return await crawler._request(None, "POST", SEARCH_PATH, {"keyword": "kw"})
+
+    assert asyncio.run(run()) == (0, None)
+    assert crawler.slots[0].failures == 1
+    assert crawler.slots[0].in_flight == 0
+
+
+def test_crawl_finishes_when_detail_signing_fails():
+    # 详情 worker 只有一个、队列有界：worker 若因签名异常退出，翻页任务会阻塞在 queue.put 上
+    crawler, result = asyncio.run(_crawl(FailingSigner(fail_paths=[DETAIL_PATH])))
+    assert result.pages == 2
+    assert len(result.notes) == 20
+    assert result.details_ok == 0
+    assert result.details_failed == 20
+
+
+def test_crawl_stops_when_search_signing_fails():
+    crawler, result = asyncio.run(_crawl(FailingSigner()))
+    assert result.pages == 0
+    assert result.notes == []
+    assert sum(slot.failures for slot in crawler.slots) >= 1
+
+
+def test_crawl_uses_fetch_notes_sort_and_stops_on_request():
+    requests = []
+    app = stub_app(pages=5, requests=requests)
+    crawler, result = asyncio.run(_crawl(StubSigner(), app=app, crawl_kwargs={"should_stop": lambda: True}))
+    assert result.pages == 1
+    assert len(result.notes) == 10
+    assert {body["sort"] for body in requests} == {SEARCH_SORT}
@@ -0,0 +1,56 @@
+"""FallbackSigner：主签名脚本结果为空或出错的条目改由备用脚本签名。"""
+
+import sys
+
+sys.path.insert(0, '.')
+
+import pytest
+
+from app.tasks.xhs_signer import FallbackSigner, Signer, SignWorkerError, StubSigner
+
+URL = "https://edith.xiaohongshu.com/api/sns/web/v1/search/notes"
+
+
+class PartialSigner(Signer):
+    """第 ``empty`` 条返回空签名头，其余返回固定签名；``error`` 不为空时整批抛出。"""
+
+    def __init__(self, empty=(), error=None):
+        self.empty = set(empty)
+        self.error = error
+        self.batches = []
+
+    def sign_batch(self, items):
+        self.batches.append(list(items))
+        if self.error:
+            raise self.error
+        return [{} if i in self.empty else {"x-s": "primary"} for i in range(len(items))]
+
+
+def _items(n):
+    return [(URL, {"page": i}, "a1=1") for i in range(n)]
+
+
+def test_only_empty_items_go_to_secondary():
+    secondary = PartialSigner()
+    signer = FallbackSigner(PartialSigner(empty={1}), secondary)
+    results = signer.sign_batch(_items(3))
+    assert [r["x-s"] for r in results] == ["primary", "primary", "primary"]
+    assert secondary.batches == [[_items(3)[1]]]
+
+
+def test_secondary_not_called_when_primary_succeeds():
+    secondary = PartialSigner()
+    FallbackSigner(PartialSigner(), secondary).sign_batch(_items(2))
+    assert secondary.batches == []
+
+
+def test_primary_error_falls_back_for_whole_batch():
+    signer = FallbackSigner(PartialSigner(error=SignWorkerError("xhsvm.js 执行失败")), StubSigner())
+    results = signer.sign_batch(_items(2))
+    assert all(r["x-s"].startswith("XYS_stub_") for r in results)
+
+
+def test_secondary_error_propagates():
+    signer = FallbackSigner(PartialSigner(empty={0}), PartialSigner(error=SignWorkerError("boom")))
+    with pytest.raises(SignWorkerError):
+        signer.sign(URL, {"page": 1}, "a1=1")
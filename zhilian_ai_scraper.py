@@ -6,9 +6,6 @@
 """
 
 import csv
-import json
-import time
-import random
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from urllib.parse import urlencode, quote
@@ -18,12 +15,14 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 
-from app.config import get_db_session
-from init_zhilian_db import ZhilianJob, init_zhilian_db
+from app.config import settings
+from app.tasks.browser_factory import create_browser
+from app.tasks.browser_wait import wait_for_dom_quiet
+from app.tasks.detail_pipeline import DetailPipeline
+from app.tasks.job_sink import JobSink, zhilian_job_sink
+from app.tasks.rate_control import PolitenessDelay
+from init_zhilian_db import init_zhilian_db
 
 
 class ZhilianAIScraper:
@@ -32,24 +31,25 @@ class ZhilianAIScraper:
     def __init__(self):
         self.base_url = "https://www.zhaopin.com"
         self.driver = None
-        self.session = None
+        self.sink: Optional[JobSink] = None
         self.wait = None
+        self.politeness = PolitenessDelay(settings.politeness_interval, settings.politeness_jitter)
         
+    def create_driver(self, headless: Optional[bool] = None) -> webdriver.Chrome:
+        """创建一个浏览器会话（列表页与每个详情 worker 各用一个；playwright 后端下共享同一个浏览器进程）
+        
+        headless 为 None 时按 settings.zhilian_list_headless（列表页浏览器）
+        """
+        return create_browser(
+            account="zhilian",
+            headless=settings.zhilian_list_headless if headless is None else headless,
+            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        )
+    
     def init_driver(self) -> bool:
         """初始化浏览器驱动"""
         try:
-            chrome_options = Options()
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-            
-            # 如果不需要显示浏览器界面，可以取消注释下面这行
-            # chrome_options.add_argument('--headless')
-            
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            self.driver = self.create_driver()
             self.wait = WebDriverWait(self.driver, 10)
             
             print("浏览器驱动初始化成功")
@@ -65,8 +65,8 @@ class ZhilianAIScraper:
             # 先初始化数据库表
             init_zhilian_db()
             
-            # 获取数据库会话
-            self.session = get_db_session()
+            # 批量写库缓冲
+            self.sink = zhilian_job_sink()
             print("数据库连接成功")
             return True
         except Exception as e:
@@ -85,11 +85,10 @@ class ZhilianAIScraper:
     def wait_for_page_load(self, timeout: int = 10) -> bool:
         """等待页面加载完成"""
         try:
-            # 等待职位列表加载
-            self.wait.until(
+            # 职位列表一出现即返回，访问节奏由 self.politeness 单独控制
+            WebDriverWait(self.driver, timeout).until(
                 EC.presence_of_element_located((By.CLASS_NAME, "joblist-item"))
             )
-            time.sleep(random.uniform(2, 4))
             return True
         except Exception as e:
             print(f"页面加载超时: {e}")
@@ -177,18 +176,18 @@ class ZhilianAIScraper:
         except:
             return None
     
-    def get_job_detail(self, job_url: str) -> Dict:
-        """获取职位详情"""
+    def get_job_detail(self, job_url: str, driver=None) -> Dict:
+        """获取职位详情；driver 为详情 worker 的浏览器，默认使用主浏览器"""
         detail_info = {}
+        driver = driver or self.driver
         
         try:
-            # 打开职位详情页
-            self.driver.get(job_url)
-            time.sleep(random.uniform(2, 4))
+            # 打开职位详情页（下面等待描述元素出现，无需固定休眠）
+            driver.get(job_url)
             
             # 职位描述
             try:
-                desc_element = self.wait.until(
+                desc_element = WebDriverWait(driver, 10).until(
                     EC.presence_of_element_located((By.CLASS_NAME, "job-detail-content"))
                 )
                 detail_info['job_description'] = desc_element.text.strip()
@@ -197,21 +196,21 @@ class ZhilianAIScraper:
             
             # 职位要求
             try:
-                requirement_element = self.driver.find_element(By.CSS_SELECTOR, ".job-requirement")
+                requirement_element = driver.find_element(By.CSS_SELECTOR, ".job-requirement")
                 detail_info['job_requirements'] = requirement_element.text.strip()
             except:
                 pass
             
             # 福利待遇
             try:
-                welfare_element = self.driver.find_element(By.CSS_SELECTOR, ".job-welfare")
+                welfare_element = driver.find_element(By.CSS_SELECTOR, ".job-welfare")
                 detail_info['welfare'] = welfare_element.text.strip()
             except:
                 pass
             
             # 公司详细信息
             try:
-                company_detail_element = self.driver.find_element(By.CSS_SELECTOR, ".company-detail")
+                company_detail_element = driver.find_element(By.CSS_SELECTOR, ".company-detail")
                 detail_info['company_type'] = company_detail_element.text.strip()
             except:
                 pass
@@ -221,55 +220,54 @@ class ZhilianAIScraper:
         
         return detail_info
     
+    def fetch_detail(self, driver, job_info: Dict) -> Dict:
+        """详情流水线回调：在指定浏览器中抓取详情"""
+        if not job_info.get('job_url'):
+            return {}
+        return self.get_job_detail(job_info['job_url'], driver)
+    
+    def open_detail_drivers(self, count: int) -> List:
+        """为详情抓取启动独立浏览器（同一个 webdriver 不能并发操作多个窗口）
+        
+        详情浏览器始终无头：selenium 后端下每个都是独立 Chrome 进程，有界面时内存开销大且无显示器的服务器上无法启动；
+        playwright 后端下它们只是共享浏览器中的隔离上下文
+        """
+        drivers = []
+        for _ in range(count):
+            try:
+                drivers.append(self.create_driver(headless=True))
+            except Exception as e:
+                print(f"详情浏览器启动失败: {e}")
+        return drivers
+    
     def save_job_to_db(self, job_info: Dict) -> bool:
-        """保存职位信息到数据库"""
-        if not self.session:
+        """把职位加入批量写库缓冲（按 job_id 去重，满一批自动写入）
+        
+        返回 True 表示职位已进入缓冲，不代表是新职位：写库前不再逐条查重，
+        库中已存在的职位同样返回 True，在 flush 时计入「已存在」（旧版对已存在的职位返回 False）
+        """
+        if not self.sink:
             return False
-            
-        try:
-            # 检查是否已存在
-            job_id = job_info.get('job_id', '')
-            if not job_id:
-                return False
-                
-            existing_job = self.session.query(ZhilianJob).filter_by(job_id=job_id).first()
-            if existing_job:
-                print(f"职位 {job_id} 已存在，跳过")
-                return False
-            
-            # 创建新记录
-            job = ZhilianJob(
-                job_id=job_id,
-                job_title=job_info.get('job_title', ''),
-                company_name=job_info.get('company_name', ''),
-                company_size=job_info.get('company_size', ''),
-                company_type=job_info.get('company_type', ''),
-                salary=job_info.get('salary', ''),
-                work_city=job_info.get('work_city', ''),
-                work_experience=job_info.get('work_experience', ''),
-                education=job_info.get('education', ''),
-                job_type=job_info.get('job_type', '全职'),
-                job_description=job_info.get('job_description', ''),
-                job_requirements=job_info.get('job_requirements', ''),
-                welfare=job_info.get('welfare', ''),
-                publish_time=job_info.get('publish_time'),
-                job_url=job_info.get('job_url', ''),
-                raw_json=job_info
-            )
-            
-            self.session.add(job)
-            self.session.commit()
-            print(f"保存职位成功: {job_info.get('job_title', '')} - {job_info.get('company_name', '')}")
-            return True
-            
-        except Exception as e:
-            if self.session:
-                self.session.rollback()
-            print(f"保存职位失败: {e}")
+        if not self.sink.add(job_info):
+            print("职位缺少 job_id，跳过")
             return False
+        return True
+
+    def flush_jobs(self) -> None:
+        """把缓冲中的职位写入数据库"""
+        if not self.sink:
+            return
+        stats = self.sink.flush()
+        if stats.total or stats.failed:
+            print(f"写入数据库: 新增 {stats.inserted} 条，已存在 {stats.skipped} 条，失败 {stats.failed} 条")
     
-    def scrape_jobs(self, keyword: str = "人工智能", city: str = "苏州", max_pages: int = 5) -> List[Dict]:
-        """爬取职位信息"""
+    def scrape_jobs(self, keyword: str = "人工智能", city: str = "苏州", max_pages: int = 5,
+                    detail_workers: Optional[int] = None) -> List[Dict]:
+        """爬取职位信息
+        
+        主浏览器只翻列表页（按 URL 页码翻页），详情由 detail_workers 个浏览器并发抓取，结果随即写入批量写库缓冲
+        返回本次抓到的职位（含库中已存在的）；新增条数见写库日志
+        """
         all_jobs = []
         
         if not self.init_driver():
@@ -278,74 +276,67 @@ class ZhilianAIScraper:
         if not self.init_database():
             return all_jobs
         
+        def on_result(job_info: Dict) -> None:
+            if self.save_job_to_db(job_info):
+                all_jobs.append(job_info)
+        
+        detail_drivers = []
         try:
-            for page in range(1, max_pages + 1):
-                print(f"正在爬取第 {page} 页...")
-                
-                # 构建搜索URL
-                search_url = self.build_search_url(keyword, city, page)
-                print(f"访问URL: {search_url}")
-                
-                # 访问搜索页面
-                self.driver.get(search_url)
-                
-                # 等待页面加载
-                if not self.wait_for_page_load():
-                    print(f"第 {page} 页加载失败，跳过")
-                    continue
-                
-                # 滚动到页面底部，加载更多内容
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                
-                # 查找职位元素
-                try:
-                    job_elements = self.driver.find_elements(By.CLASS_NAME, "joblist-item")
-                    print(f"找到 {len(job_elements)} 个职位")
+            detail_drivers = self.open_detail_drivers(detail_workers or settings.zhilian_detail_workers)
+            if not detail_drivers:
+                print("没有可用的详情浏览器，停止爬取")
+                return all_jobs
+            
+            with DetailPipeline(detail_drivers, self.fetch_detail, on_result) as pipeline:
+                for page in range(1, max_pages + 1):
+                    print(f"正在爬取第 {page} 页...")
+                    
+                    # 构建搜索URL
+                    search_url = self.build_search_url(keyword, city, page)
+                    print(f"访问URL: {search_url}")
+                    
+                    # 访问搜索页面（与上一页保持礼貌间隔）
+                    self.politeness.wait()
+                    self.driver.get(search_url)
+                    
+                    # 等待页面加载
+                    if not self.wait_for_page_load():
+                        print(f"第 {page} 页加载失败，跳过")
+                        continue
                     
-                    for job_element in job_elements:
-                        job_info = self.extract_job_info(job_element)
-                        if job_info and job_info.get('job_title'):
-                            # 获取详细信息
-                            if job_info.get('job_url'):
-                                detail_info = self.get_job_detail(job_info['job_url'])
-                                job_info.update(detail_info)
-                                
-                                # 返回列表页面
-                                self.driver.get(search_url)
-                                time.sleep(2)
-                            
-                            # 保存到数据库
-                            if self.save_job_to_db(job_info):
-                                all_jobs.append(job_info)
+                    # 滚动到页面底部，加载更多内容
+                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                    wait_for_dom_quiet(self.driver, quiet=0.5, timeout=3)
+                    
+                    # 查找职位元素，新职位交给详情流水线
+                    try:
+                        job_elements = self.driver.find_elements(By.CLASS_NAME, "joblist-item")
+                        print(f"找到 {len(job_elements)} 个职位")
+                        
+                        for job_element in job_elements:
+                            job_info = self.extract_job_info(job_element)
+                            if job_info and job_info.get('job_title'):
+                                pipeline.submit(job_info)
                         
-                        # 随机延迟
-                        time.sleep(random.uniform(1, 3))
+                    except Exception as e:
+                        print(f"解析职位元素失败: {e}")
                     
-                except Exception as e:
-                    print(f"解析职位元素失败: {e}")
-                
-                # 检查是否有下一页
-                try:
-                    next_button = self.driver.find_element(By.CSS_SELECTOR, ".soupager .next")
-                    if next_button.is_enabled():
-                        next_button.click()
-                        time.sleep(random.uniform(3, 5))
-                    else:
-                        print("没有更多页面了")
+                    # 检查是否有下一页（列表页始终停留在当前标签页，按钮状态可靠；翻页通过 URL 页码完成）
+                    try:
+                        next_button = self.driver.find_element(By.CSS_SELECTOR, ".soupager .next")
+                        if not next_button.is_enabled():
+                            print("没有更多页面了")
+                            break
+                    except Exception:
+                        print("没有找到下一页按钮")
                         break
-                except:
-                    print("没有找到下一页按钮")
-                    break
-                
-                # 页面间随机延迟
-                time.sleep(random.uniform(5, 10))
         
         finally:
+            for driver in detail_drivers:
+                driver.quit()
             if self.driver:
                 self.driver.quit()
-            if self.session:
-                self.session.close()
+            self.flush_jobs()
         
         return all_jobs
     